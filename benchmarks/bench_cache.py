@@ -0,0 +1,85 @@
+"""
+Benchmark: batch get/set latency of the cache backends.
+
+Runs the same estimate-sized workload against the memory, SQLite and Redis
+backends. The Redis backend talks to the local RESP stand-in
+(benchmarks.resp_server), started on a background thread, so no Redis
+install is needed; the numbers include a real TCP round trip.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks import resp_server
+from utils.cache_backends import MemoryBackend, RedisBackend, SQLiteBackend
+from utils.fare_calculator import FareCalculator
+from utils.location_input import LocationInput
+from utils.responses import dumps
+
+STAND_IN_PORT = 6391
+
+
+def start_stand_in() -> None:
+    ready = threading.Event()
+
+    def run():
+        async def serve():
+            server = await resp_server.serve(port=STAND_IN_PORT)
+            ready.set()
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(5)
+
+
+def measure(backend, value: bytes, batch: int, rounds: int = 2000) -> tuple:
+    """Average µs per set_many and per get_many of `batch` keys."""
+    keys = [f"estimate:bench:{i}" for i in range(batch)]
+    items = {key: value for key in keys}
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        backend.set_many(items, ttl=60)
+    set_us = (time.perf_counter() - started) / rounds * 1e6
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        found = backend.get_many(keys)
+    get_us = (time.perf_counter() - started) / rounds * 1e6
+    assert len(found) == batch
+    return set_us, get_us
+
+
+def main() -> None:
+    start = LocationInput.START_LOCATION
+    dest = LocationInput.DESTINATION_LOCATION
+    value = dumps([time.time(), FareCalculator.get_price_estimates(
+        start.latitude, start.longitude, dest.latitude, dest.longitude
+    )])
+
+    start_stand_in()
+    sqlite_path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    backends = {
+        "memory": MemoryBackend(),
+        "sqlite": SQLiteBackend(sqlite_path),
+        "redis (stand-in)": RedisBackend(f"redis://127.0.0.1:{STAND_IN_PORT}/0", timeout=2.0),
+    }
+
+    print(f"Value size: {len(value)} bytes")
+    print("-" * 64)
+    print(f"{'backend':<18} {'batch':>5} {'set_many µs':>14} {'get_many µs':>14}")
+    for name, backend in backends.items():
+        for batch in (1, 2, 32):
+            set_us, get_us = measure(backend, value, batch)
+            print(f"{name:<18} {batch:>5} {set_us:>14.1f} {get_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
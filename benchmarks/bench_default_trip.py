@@ -0,0 +1,114 @@
+"""
+Benchmark: per-request cost of the default trip, rendered per hit vs prerendered.
+
+Estimates come from a warm estimate cache, as they do once the prefetcher
+has run. "per hit" repeats what the handlers did before utils.default_trip:
+links, view, terminal output, page/JSON/Omi rendering and the ETag on every
+request. "prerendered" is what they do now: read the estimates and reuse the
+stored render while they are unchanged. Terminal output goes to /dev/null.
+
+Run from the repository root:
+    python -m benchmarks.bench_default_trip
+"""
+import argparse
+import contextlib
+import os
+import timeit
+
+from utils.default_trip import DefaultTrip
+from utils.display import TripView, UberDisplay
+from utils.estimate_cache import estimate_key
+from utils.fare_calculator import FareCalculator
+from utils.http_cache import trip_etag
+from utils.location_input import LocationInput
+from utils.responses import dumps
+from utils.uber_client import UberClient
+
+
+def warm_client() -> UberClient:
+    """A client whose cache holds the default trip's estimates, as Uber would return them."""
+    client = UberClient()
+    client.server_token = "bench"
+    start, destination = LocationInput.default_trip()
+    prices = FareCalculator.get_price_estimates(
+        start.latitude, start.longitude, destination.latitude, destination.longitude
+    )
+    times = FareCalculator.get_time_estimates(start.latitude, start.longitude)
+    client.cache.put_many({
+        estimate_key("price", start.latitude, start.longitude, destination.latitude, destination.longitude):
+            [estimate.to_dict() for estimate in prices],
+        estimate_key("time", start.latitude, start.longitude): [estimate.to_dict() for estimate in times]
+    })
+    return client
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Default trip: rendered per hit vs prerendered")
+    parser.add_argument("--number", type=int, default=2000, help="requests per timing")
+    args = parser.parse_args()
+
+    client = warm_client()
+    default_trip = DefaultTrip(client)
+    start, destination = default_trip.start, default_trip.destination
+
+    def links():
+        deep_link = client.generate_deep_link(
+            start.latitude, start.longitude, destination.latitude, destination.longitude,
+            start.name, destination.name, start.address, destination.address
+        )
+        web_link = client.generate_mobile_web_link(
+            start.latitude, start.longitude, destination.latitude, destination.longitude
+        )
+        return deep_link, web_link
+
+    def ride_per_hit():
+        LocationInput.get_trip_locations()
+        prices, times = default_trip.estimates()
+        view = TripView.build(start, destination, prices, times, *links())
+        print(UberDisplay.render_terminal(view), flush=True)
+        trip_etag("ride.html", start, destination, prices, times)
+        UberDisplay.render_html(view).encode("utf-8")
+
+    def ride_info_per_hit():
+        LocationInput.get_trip_locations()
+        prices, times = default_trip.estimates()
+        deep_link, web_link = links()
+        trip_etag("ride-info.json", start, destination, prices, times)
+        dumps({
+            "start_location": start.to_dict(), "destination": destination.to_dict(),
+            "price_estimates": prices, "time_estimates": times,
+            "deep_link": deep_link, "web_link": web_link
+        })
+
+    def omi_per_hit():
+        LocationInput.get_trip_locations()
+        prices, times = default_trip.estimates()
+        deep_link, _ = links()
+        text = UberDisplay.render_omi(TripView.build(start, destination, prices, times, deep_link))
+        print(f"✅ Response: {text}", flush=True)
+        dumps({"message": text})
+
+    def prerendered():
+        default_trip.render(*default_trip.estimates())
+
+    cases = [
+        ("/ride", ride_per_hit),
+        ("/api/ride-info", ride_info_per_hit),
+        ("/webhook/omi", omi_per_hit),
+    ]
+    rows = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        default_trip.refresh()
+        stored = min(timeit.repeat(prerendered, number=args.number, repeat=5)) / args.number * 1e6
+        for name, per_hit in cases:
+            seconds = min(timeit.repeat(per_hit, number=args.number, repeat=5))
+            rows.append((name, seconds / args.number * 1e6))
+
+    print(f"{'endpoint':<16} {'per hit µs':>11} {'prerendered µs':>15} {'speedup':>8}")
+    print("-" * 53)
+    for name, per_hit in rows:
+        print(f"{name:<16} {per_hit:>11.1f} {stored:>15.1f} {per_hit / stored:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
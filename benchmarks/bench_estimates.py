@@ -0,0 +1,163 @@
+"""
+Benchmark: time and allocations per request for estimates.
+
+Compares the previous dict-based estimates (nine-key dicts built by the fare
+calculator and re-read with .get by every view), kept here as a reference,
+with the typed estimates: cold (computed for a new trip) and memoized (a
+repeated trip). Each request builds price and pickup estimates, the views,
+the Omi reply and the /api/ride-info JSON body, like the webhook and API do.
+
+Allocation figures come from tracemalloc: bytes still held by one request's
+estimates, and the peak traced memory while serving one request.
+
+Run from the repository root:
+    python -m benchmarks.bench_estimates
+"""
+import contextlib
+import os
+import timeit
+import tracemalloc
+from typing import Dict, List, NamedTuple
+
+from utils.display import PickupView, PriceView, TripView, UberDisplay
+from utils.fare_calculator import FareCalculator, _price_estimates
+from utils.location_input import LocationInput
+from utils.responses import dumps
+
+_new_tuple = tuple.__new__
+
+
+def legacy_price_estimates(start_lat: float, start_lon: float, end_lat: float, end_lon: float) -> List[Dict]:
+    """Previous FareCalculator.get_price_estimates."""
+    distance_miles = FareCalculator.haversine_distance(start_lat, start_lon, end_lat, end_lon)
+    duration_minutes = FareCalculator.estimate_duration(distance_miles)
+    estimates = []
+    for ride_type, rates in FareCalculator.RATE_CARDS.items():
+        low_fare = FareCalculator.calculate_fare(distance_miles, duration_minutes, ride_type)
+        high_fare = round(low_fare * 1.15, 2)
+        estimates.append({
+            "localized_display_name": rates["display_name"],
+            "estimate": f"${low_fare:.0f}-${high_fare:.0f}",
+            "low_estimate": low_fare,
+            "high_estimate": high_fare,
+            "duration": int(duration_minutes * 60),
+            "distance": round(distance_miles, 2),
+            "display_name": rates["display_name"],
+            "product_id": ride_type.lower().replace(" ", "_"),
+            "currency_code": "USD"
+        })
+    return estimates
+
+
+def legacy_time_estimates() -> List[Dict]:
+    """Previous FareCalculator.get_time_estimates."""
+    estimates = []
+    for ride_type, rates in FareCalculator.RATE_CARDS.items():
+        if "Black" in ride_type:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME + 2
+        elif "XL" in ride_type or "Comfort" in ride_type:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME + 1
+        else:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME
+        estimates.append({
+            "localized_display_name": rates["display_name"],
+            "estimate": pickup_time * 60,
+            "display_name": rates["display_name"],
+            "product_id": ride_type.lower().replace(" ", "_")
+        })
+    return estimates
+
+
+def legacy_price_view(estimate: Dict) -> PriceView:
+    """Previous PriceView.from_estimate."""
+    get = estimate.get
+    return _new_tuple(PriceView, (
+        get("localized_display_name", "Unknown"),
+        get("estimate", "N/A"),
+        get("duration", 0) // 60,
+        round(get("distance", 0), 1)
+    ))
+
+
+def legacy_pickup_view(estimate: Dict) -> PickupView:
+    """Previous PickupView.from_estimate."""
+    get = estimate.get
+    return _new_tuple(PickupView, (get("localized_display_name", "Unknown"), get("estimate", 0) // 60))
+
+
+def serve(start, destination, prices, times, prices_view, pickups_view) -> None:
+    view = _new_tuple(TripView, (start, destination, prices_view, pickups_view, "uber://", ""))
+    UberDisplay.render_omi(view)
+    dumps({
+        "start_location": start.to_dict(),
+        "destination": destination.to_dict(),
+        "price_estimates": prices,
+        "time_estimates": times
+    })
+
+
+class Case(NamedTuple):
+    name: str
+    estimates: object
+    request: object
+
+
+def main(number: int = 20000) -> None:
+    start = LocationInput.START_LOCATION
+    destination = LocationInput.DESTINATION_LOCATION
+    coords = (start.latitude, start.longitude, destination.latitude, destination.longitude)
+
+    def legacy_estimates():
+        return legacy_price_estimates(*coords), legacy_time_estimates()
+
+    def legacy_request():
+        prices, times = legacy_estimates()
+        serve(start, destination, prices, times,
+              tuple(map(legacy_price_view, prices)),
+              tuple(map(legacy_pickup_view, times[:3])))
+
+    def typed_cold_estimates():
+        _price_estimates.cache_clear()
+        return FareCalculator.get_price_estimates(*coords), FareCalculator.get_time_estimates(*coords[:2])
+
+    def typed_estimates():
+        return FareCalculator.get_price_estimates(*coords), FareCalculator.get_time_estimates(*coords[:2])
+
+    def typed_request(estimates=typed_estimates):
+        prices, times = estimates()
+        serve(start, destination, prices, times, PriceView.from_estimates(prices), PickupView.from_estimates(times))
+
+    cases = [
+        Case("dicts (previous)", legacy_estimates, legacy_request),
+        Case("typed, new trip", typed_cold_estimates, lambda: typed_request(typed_cold_estimates)),
+        Case("typed, repeated trip", typed_estimates, typed_request),
+    ]
+
+    print(f"{'case':<22} {'estimates µs':>13} {'request µs':>11} {'held bytes':>11} {'peak bytes':>11}")
+    print("-" * 72)
+    # The calculator logs every computation; keep that out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rows = []
+        for case in cases:
+            estimates_us = min(timeit.repeat(case.estimates, number=number, repeat=5)) / number * 1e6
+            request_us = min(timeit.repeat(case.request, number=number, repeat=5)) / number * 1e6
+
+            case.request()  # warm caches so only per-request memory is traced
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            held = case.estimates()
+            held_bytes = tracemalloc.get_traced_memory()[0] - before
+            del held
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            case.request()
+            peak_bytes = tracemalloc.get_traced_memory()[1] - before
+            tracemalloc.stop()
+            rows.append((case.name, estimates_us, request_us, held_bytes, peak_bytes))
+
+    for name, estimates_us, request_us, held_bytes, peak_bytes in rows:
+        print(f"{name:<22} {estimates_us:>13.2f} {request_us:>11.2f} {held_bytes:>11} {peak_bytes:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: pricing one pickup against many candidate destinations.
+
+Compares N scalar FareCalculator.get_price_estimates calls (what N separate
+/api/ride-info requests compute, with a cold estimate cache) with one
+fare_matrix pass, both as a plain loop and vectorized with numpy. The cost
+of importing numpy is reported separately, since it is paid once per worker.
+
+Run from the repository root:
+    python -m benchmarks.bench_fare_matrix --sizes 8 32 128 1024
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+import timeit
+
+from utils import fare_matrix
+from utils.fare_calculator import FareCalculator, _price_estimates
+from utils.location_input import LocationInput
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batched fare computation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128, 1024])
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    numpy = fare_matrix._load_numpy()
+    if numpy is None:
+        print("numpy not installed - vectorized case skipped")
+    else:
+        print(f"numpy import: {(time.perf_counter() - started) * 1000:.0f} ms (once per worker)")
+
+    pickup = LocationInput.START_LOCATION
+    random.seed(0)
+    rows = []
+    # The calculator logs every computation; keep that out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for size in args.sizes:
+            starts = ([pickup.latitude] * size, [pickup.longitude] * size)
+            ends = (
+                [37.70 + random.random() * 0.12 for _ in range(size)],
+                [-122.51 + random.random() * 0.14 for _ in range(size)]
+            )
+            coords = list(zip(*starts, *ends))
+
+            def scalar():
+                _price_estimates.cache_clear()
+                for trip in coords:
+                    FareCalculator.get_price_estimates(*trip)
+
+            cases = [scalar, lambda: fare_matrix._looped(*starts, *ends)]
+            if numpy is not None:
+                cases.append(lambda: fare_matrix._vectorized(numpy, *starts, *ends))
+            number = max(1, args.number * 32 // size)
+            timings = [min(timeit.repeat(case, number=number, repeat=5)) / number * 1e6 for case in cases]
+            rows.append((size, timings))
+
+    print(f"{'trips':>6}  {'scalar µs':>10} {'loop µs':>10} {'numpy µs':>10}")
+    print("-" * 42)
+    for size, timings in rows:
+        print(f"{size:>6}  " + " ".join(f"{timing:>10.1f}" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: serialization cost of the /api/ride-info body.
+
+Compares FastAPI's default path for a returned dict (jsonable_encoder +
+JSONResponse) with FastJSONResponse.
+
+Run from the repository root:
+    python -m benchmarks.bench_json
+"""
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.fare_calculator import FareCalculator
+from utils.location_input import LocationInput
+from utils.responses import FastJSONResponse, orjson
+from utils.uber_client import UberClient
+
+
+def build_payload() -> dict:
+    """Build a representative /api/ride-info body."""
+    start = LocationInput.START_LOCATION
+    dest = LocationInput.DESTINATION_LOCATION
+    return {
+        "start_location": start.to_dict(),
+        "destination": dest.to_dict(),
+        # In Uber API dict shape, which jsonable_encoder needs
+        "price_estimates": [estimate.to_dict() for estimate in FareCalculator.get_price_estimates(
+            start.latitude, start.longitude, dest.latitude, dest.longitude
+        )],
+        "time_estimates": [
+            estimate.to_dict() for estimate in FareCalculator.get_time_estimates(start.latitude, start.longitude)
+        ],
+        "deep_link": UberClient.generate_deep_link(
+            start.latitude, start.longitude, dest.latitude, dest.longitude,
+            start.name, dest.name, start.address, dest.address
+        ),
+        "web_link": UberClient.generate_mobile_web_link(
+            start.latitude, start.longitude, dest.latitude, dest.longitude
+        )
+    }
+
+
+def main(number: int = 20000) -> None:
+    payload = build_payload()
+
+    cases = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(content=jsonable_encoder(payload)),
+        "FastJSONResponse": lambda: FastJSONResponse(content=payload),
+    }
+
+    print(f"Encoder: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    print(f"Body size: {len(FastJSONResponse(content=payload).body)} bytes")
+    print("-" * 60)
+    results = {}
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=number, repeat=5))
+        results[name] = seconds / number * 1e6
+        print(f"{name:<36} {results[name]:8.2f} µs/request")
+    baseline, fast = results.values()
+    print("-" * 60)
+    print(f"Speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
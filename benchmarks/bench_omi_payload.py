@@ -0,0 +1,123 @@
+"""
+Benchmark: extracting the user transcript from large Omi payloads.
+
+Compares the previous webhook path (read the whole body, json-decode it,
+format it for the log and join the user segments) with both modes of
+utils.omi_payload: buffered (small declared bodies, or no ijson) and
+streamed. Bodies arrive in 64 KiB chunks, as from the ASGI server.
+
+Reported per payload size: time per payload and peak memory traced by
+tracemalloc above what the test body itself takes. The streamed peak grows
+only with the extracted user text, not with the rest of the payload.
+
+Run from the repository root:
+    python -m benchmarks.bench_omi_payload --sizes 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import AsyncIterator, Callable, List
+
+from utils import omi_payload
+from utils.omi_payload import read_omi_payload
+
+CHUNK_SIZE = 64 * 1024
+
+
+def build_body(megabytes: float) -> bytes:
+    """A memory object with a long transcript, roughly `megabytes` in size."""
+    segment_count = int(megabytes * 1024 * 1024 / 200)
+    transcript = [
+        {
+            "text": f"segment {i}: so I was thinking we could grab dinner downtown later tonight",
+            "speaker": f"SPEAKER_0{i % 2}",
+            "speakerId": i % 2,
+            "is_user": i % 2 == 0,
+            "start": i * 2.5,
+            "end": i * 2.5 + 2.4
+        }
+        for i in range(segment_count)
+    ]
+    return json.dumps({
+        "id": "memory_bench",
+        "created_at": "2025-10-22T10:30:00Z",
+        "transcript": transcript,
+        "title": "Long conversation",
+        "category": "personal"
+    }).encode()
+
+
+def chunks_of(body: bytes) -> List[bytes]:
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+
+async def stream(chunks: List[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def previous(chunks: List[bytes]) -> str:
+    """The webhook before streaming: request.body() + request.json() + log + join."""
+    body = b"".join(chunks)
+    payload = json.loads(body)
+    f"📦 Payload: {payload}"
+    transcript = payload.get("transcript", [])
+    return " ".join([seg.get("text", "") for seg in transcript if seg.get("is_user", False)])
+
+
+async def streaming(chunks: List[bytes]) -> str:
+    # No declared size, as for a chunked upload, so the body is always streamed
+    payload = await read_omi_payload(stream(chunks), max_bytes=1 << 40, max_segments=1 << 30)
+    return payload.transcript_text
+
+
+async def buffered(chunks: List[bytes]) -> str:
+    payload = await read_omi_payload(
+        stream(chunks), declared_size=0, max_bytes=1 << 40, max_segments=1 << 30
+    )
+    return payload.transcript_text
+
+
+def measure(fn: Callable, chunks: List[bytes], rounds: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        text = asyncio.run(fn(chunks))
+    elapsed_ms = (time.perf_counter() - started) / rounds * 1000
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    asyncio.run(fn(chunks))
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return elapsed_ms, peak / (1024 * 1024), len(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Omi payload extraction cost")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="payload sizes in MiB")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = {"previous (json + log + join)": previous, "buffered (orjson)": buffered}
+    if omi_payload.ijson is not None:
+        cases["streaming (ijson)"] = streaming
+    else:
+        print("ijson not installed - streaming case skipped")
+
+    print(f"{'payload':>9}  {'path':<30} {'ms':>9} {'peak MiB':>9}")
+    print("-" * 62)
+    for megabytes in args.sizes:
+        chunks = chunks_of(build_body(megabytes))
+        size = sum(map(len, chunks)) / (1024 * 1024)
+        lengths = set()
+        for name, fn in cases.items():
+            elapsed_ms, peak, length = measure(fn, chunks, args.rounds)
+            lengths.add(length)
+            print(f"{size:>7.1f}Mi  {name:<30} {elapsed_ms:>9.1f} {peak:>9.2f}")
+        assert len(lengths) == 1, "paths extracted different transcripts"
+
+
+if __name__ == "__main__":
+    main()
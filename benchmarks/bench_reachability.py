@@ -0,0 +1,83 @@
+"""
+Benchmark: "where can I get for $budget within N minutes?" over many places.
+
+Compares a full scan (the scalar calculator priced against every place) with
+PlaceIndex.reachable, which prices only the places inside the rate-card reach
+radius. Places are spread uniformly over the Bay Area around the default
+pickup; both paths must return the same places.
+
+Run from the repository root:
+    python -m benchmarks.bench_reachability --places 10000 50000
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+from typing import Dict, List
+
+from utils import fare_matrix
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location, LocationInput
+from utils.places import MIN_TRIP_MILES, PlaceIndex, pickup_minutes
+
+QUERIES = [(12, 10), (20, 15), (35, 25), (60, 40)]
+
+
+def full_scan(places: List[Location], lat: float, lon: float, budget: float, minutes: float, limit: int) -> Dict:
+    waits = pickup_minutes(lat, lon)
+    results = {}
+    for ride_type in FareCalculator.RATE_CARDS:
+        matches = []
+        for place in places:
+            distance = FareCalculator.haversine_distance(lat, lon, place.latitude, place.longitude)
+            duration = FareCalculator.estimate_duration(distance)
+            high_fare = round(FareCalculator.calculate_fare(distance, duration, ride_type) * 1.15, 2)
+            if high_fare <= budget and duration + waits[ride_type] <= minutes and distance >= MIN_TRIP_MILES:
+                matches.append((high_fare, distance, place.name))
+        results[ride_type] = [name for _, _, name in sorted(matches)[:limit]]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reachability query cost")
+    parser.add_argument("--places", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    pickup = LocationInput.START_LOCATION
+    random.seed(0)
+    fare_matrix._load_numpy()  # imported once per worker, not per query
+    rows = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for count in args.places:
+            places = [
+                Location(f"place {i}", "", round(37.3 + random.random() * 0.9, 6), round(-122.8 + random.random() * 0.9, 6))
+                for i in range(count)
+            ]
+            started = time.perf_counter()
+            index = PlaceIndex()
+            index.extend(places)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            for budget, minutes in QUERIES:
+                started = time.perf_counter()
+                expected = full_scan(places, pickup.latitude, pickup.longitude, budget, minutes, args.limit)
+                scan_ms = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                reach = index.reachable(pickup.latitude, pickup.longitude, budget, minutes, args.limit)
+                index_ms = (time.perf_counter() - started) * 1000
+
+                found = {ride_type: [match.place.name for match in matches] for ride_type, matches in reach.results.items()}
+                assert found == expected, "index and full scan disagree"
+                rows.append((count, build_ms, f"${budget}/{minutes}min", reach.candidates, scan_ms, index_ms))
+
+    print(f"{'places':>7} {'build ms':>9}  {'query':<11} {'priced':>7} {'scan ms':>9} {'index ms':>9}")
+    print("-" * 58)
+    for count, build_ms, query, priced, scan_ms, index_ms in rows:
+        print(f"{count:>7} {build_ms:>9.1f}  {query:<11} {priced:>7} {scan_ms:>9.1f} {index_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark: cost of rendering the ride outputs.
+
+Compares the compiled templates in utils.display with the previous
+implementation (f-strings and string += per estimate, one pass over the
+estimate dicts per output format), kept here as a reference. The templates
+HTML-escape every dynamic value, so the legacy HTML is also timed with
+html.escape applied.
+
+Run from the repository root:
+    python -m benchmarks.bench_render
+"""
+import timeit
+from html import escape
+from typing import Callable, Dict, List, Optional
+
+from utils.assets import StaticAssets
+from utils.display import TripView, UberDisplay
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location, LocationInput
+
+
+def _identity(value):
+    return value
+
+
+def legacy_html(start: Location, destination: Location, price_estimates: Optional[List[Dict]],
+                time_estimates: Optional[List[Dict]], deep_link: str, web_link: str,
+                esc: Callable[[str], str] = _identity) -> str:
+    """
+    Previous UberDisplay.generate_html_output (page markup trimmed to the same shell).
+
+    The previous version did not escape dynamic values; pass esc=html.escape
+    for a like-for-like comparison with the autoescaping templates.
+    """
+    price_html = ""
+    if price_estimates:
+        for est in price_estimates:
+            display_name = est.get("localized_display_name", "Unknown")
+            estimate_str = est.get("estimate", "N/A")
+            duration_min = est.get("duration", 0) // 60
+            distance_miles = round(est.get("distance", 0), 1)
+            price_html += f"""
+                <div class="estimate-card">
+                    <div class="ride-type">{esc(display_name)}</div>
+                    <div class="price">{esc(estimate_str)}</div>
+                    <div class="details">{duration_min} min • {distance_miles} mi</div>
+                </div>
+                """
+    else:
+        price_html = '<p class="no-data">Price estimates not available</p>'
+
+    time_html = ""
+    if time_estimates:
+        for est in time_estimates[:3]:
+            display_name = est.get("localized_display_name", "Unknown")
+            eta_minutes = est.get("estimate", 0) // 60
+            time_html += f"""
+                <div class="time-estimate">
+                    <span class="ride-type">{esc(display_name)}</span>
+                    <span class="eta">{eta_minutes} min</span>
+                </div>
+                """
+    else:
+        time_html = '<p class="no-data">Pickup time estimates not available</p>'
+
+    return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta name="viewport" content="width=device-width, initial-scale=1">
+            <title>Uber Ride - Omi</title>
+            <link rel="stylesheet" href="{StaticAssets.url('app.css')}">
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <div class="icon">🚗</div>
+                    <h1>Your Uber Ride</h1>
+                    <p>Ready to book</p>
+                </div>
+                <div class="card">
+                    <div class="location">
+                        <div class="location-label">📍 From</div>
+                        <div class="location-name">{esc(start.name)}</div>
+                        <div class="location-address">{esc(start.address)}</div>
+                    </div>
+                    <div class="location">
+                        <div class="location-label">📍 To</div>
+                        <div class="location-name">{esc(destination.name)}</div>
+                        <div class="location-address">{esc(destination.address)}</div>
+                    </div>
+                </div>
+                <div class="card">
+                    <div class="section-title">⏱️ Pickup Time</div>
+                    {time_html}
+                </div>
+                <div class="card">
+                    <div class="section-title">💰 Price Estimates</div>
+                    {price_html}
+                </div>
+                <div class="card">
+                    <div class="section-title">🔗 Book Your Ride</div>
+                    <a href="{esc(deep_link)}" class="btn btn-primary">Open in Uber App</a>
+                    <a href="{esc(web_link)}" class="btn">Open in Browser</a>
+                </div>
+                <div class="footer">
+                    <p>Powered by <strong>Omi</strong></p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+
+def legacy_terminal(start: Location, destination: Location, price_estimates: Optional[List[Dict]],
+                    time_estimates: Optional[List[Dict]], deep_link: str, web_link: str) -> str:
+    """Previous UberDisplay.generate_terminal_output."""
+    lines = ["=" * 60, "🚗 UBER RIDE INFORMATION", "=" * 60, ""]
+    lines.append(f"📍 FROM: {start.name}")
+    lines.append(f"   {start.address}")
+    lines.append(f"   ({start.latitude}, {start.longitude})")
+    lines.append("")
+    lines.append(f"📍 TO: {destination.name}")
+    lines.append(f"   {destination.address}")
+    lines.append(f"   ({destination.latitude}, {destination.longitude})")
+    lines.append("")
+    if time_estimates:
+        lines.append("⏱️  PICKUP TIME ESTIMATES:")
+        for est in time_estimates[:3]:
+            lines.append(f"   • {est.get('localized_display_name', 'Unknown')}: {est.get('estimate', 0) // 60} min pickup")
+        lines.append("")
+    if price_estimates:
+        lines.append("💰 PRICE ESTIMATES:")
+        for est in price_estimates:
+            lines.append(
+                f"   • {est.get('localized_display_name', 'Unknown')}: {est.get('estimate', 'N/A')} "
+                f"(~{est.get('duration', 0) // 60} min, {round(est.get('distance', 0), 1)} mi)"
+            )
+        lines.append("")
+    lines.append("🔗 DEEP LINKS:")
+    lines.append(f"   App Link: {deep_link}")
+    lines.append(f"   Web Link: {web_link}")
+    lines.append("")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def main(number: int = 20000) -> None:
+    start = LocationInput.START_LOCATION
+    destination = LocationInput.DESTINATION_LOCATION
+    prices = FareCalculator.get_price_estimates(
+        start.latitude, start.longitude, destination.latitude, destination.longitude
+    )
+    times = FareCalculator.get_time_estimates(start.latitude, start.longitude)
+    deep_link = "uber://?action=setPickup&pickup[latitude]=37.7989&dropoff[latitude]=37.7699"
+    web_link = "https://m.uber.com/ul/?pickup[latitude]=37.7989&dropoff[latitude]=37.7699"
+    args = (start, destination, prices, times, deep_link, web_link)
+    # The legacy renderers read Uber API dicts
+    legacy_args = (
+        start, destination,
+        [estimate.to_dict() for estimate in prices], [estimate.to_dict() for estimate in times],
+        deep_link, web_link
+    )
+
+    def templated_ride():
+        view = TripView.build(*args)
+        UberDisplay.render_terminal(view)
+        UberDisplay.render_html(view)
+
+    cases = [
+        ("html: legacy f-string", lambda: legacy_html(*legacy_args)),
+        ("html: legacy f-string + html.escape", lambda: legacy_html(*legacy_args, esc=escape)),
+        ("html: compiled template", lambda: UberDisplay.render_html(TripView.build(*args))),
+        ("terminal: legacy", lambda: legacy_terminal(*legacy_args)),
+        ("terminal: compiled template", lambda: UberDisplay.render_terminal(TripView.build(*args))),
+        ("/ride (terminal + html): legacy", lambda: (legacy_terminal(*legacy_args), legacy_html(*legacy_args, esc=escape))),
+        ("/ride (terminal + html): templates", templated_ride),
+    ]
+
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:<42} {seconds / number * 1e6:8.2f} µs/render")
+
+
+if __name__ == "__main__":
+    main()
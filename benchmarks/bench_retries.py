@@ -0,0 +1,107 @@
+"""
+Benchmark: retries and hedged requests against a flaky, slow-tailed Uber API.
+
+Runs the local Uber stand-in in-process and fetches price estimates for
+random trips (no estimate cache) at interactive priority:
+
+  * errors: a share of requests fail with 503. Reports how many fetches still
+    got Uber's answer rather than falling back, without and with retries.
+  * tail: a share of requests are slow. Reports fetch latency percentiles
+    without and with hedging, and how many extra requests hedging sent.
+
+Run from the repository root:
+    python -m benchmarks.bench_retries --fetches 300
+"""
+import argparse
+import contextlib
+import os
+import random
+import statistics
+import threading
+import time
+
+# The stand-in has no rate limit; keep the quota out of the measurement
+os.environ.setdefault("UBER_QUOTA_PER_HOUR", "100000000")
+os.environ.setdefault("UBER_QUOTA_BURST", "1000000")
+
+from benchmarks import uber_server  # noqa: E402
+from benchmarks.bench_workers import free_port  # noqa: E402
+from utils import uber_client  # noqa: E402
+from utils.metrics import metrics  # noqa: E402
+from utils.quota import INTERACTIVE, outbound_priority  # noqa: E402
+
+
+def run(client: uber_client.UberClient, fetches: int) -> tuple:
+    """(latencies in ms, fetches answered by Uber)."""
+    latencies, answered = [], 0
+    for _ in range(fetches):
+        trip = (37.78 + random.random() * 0.02, -122.41 + random.random() * 0.02,
+                37.76 + random.random() * 0.02, -122.42 + random.random() * 0.02)
+        started = time.perf_counter()
+        with outbound_priority(INTERACTIVE):
+            data, _ = client._fetch_price_estimates(*trip)
+        latencies.append((time.perf_counter() - started) * 1000)
+        answered += data is not None
+    return latencies, answered
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Uber client retries and hedging")
+    parser.add_argument("--fetches", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--tail-rate", type=float, default=0.02)
+    parser.add_argument("--tail-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = uber_server.serve("127.0.0.1", port, args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = uber_client.UberClient()
+    client.server_token = "bench"
+    client.base_url = f"http://127.0.0.1:{port}/v1.2"
+
+    random.seed(0)
+    error_rows, tail_rows = [], []
+    # Every estimate and attempt is logged; keep that out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run(client, 20)  # warm up connections and imports
+
+        uber_server.UberHandler.error_rate = args.error_rate
+        for retries in (0, 2):
+            uber_client.UBER_MAX_RETRIES = retries
+            before = metrics.count("uber.retries")
+            latencies, answered = run(client, args.fetches)
+            error_rows.append((retries, answered, metrics.count("uber.retries") - before, statistics.median(latencies)))
+        uber_server.UberHandler.error_rate = 0.0
+
+        uber_server.UberHandler.tail_rate = args.tail_rate
+        uber_server.UberHandler.tail_latency = args.tail_ms / 1000
+        for hedge in (False, True):
+            uber_client.UBER_HEDGE = hedge
+            before = metrics.count("uber.hedges"), metrics.count("uber.hedge_wins")
+            latencies, _ = run(client, args.fetches)
+            hedges = metrics.count("uber.hedges") - before[0]
+            wins = metrics.count("uber.hedge_wins") - before[1]
+            tail_rows.append((hedge, percentile(latencies, 0.5), percentile(latencies, 0.95),
+                              percentile(latencies, 0.99), hedges, wins))
+    server.shutdown()
+
+    print(f"{args.error_rate:.0%} of requests fail with 503 ({args.fetches} fetches)")
+    print(f"{'retries':>8} {'answered':>9} {'retried':>8} {'p50 ms':>8}")
+    for retries, answered, retried, median in error_rows:
+        print(f"{retries:>8} {answered / args.fetches:>9.1%} {retried:>8} {median:>8.1f}")
+    print()
+    print(f"{args.tail_rate:.0%} of requests take an extra {args.tail_ms:.0f} ms ({args.fetches} fetches)")
+    print(f"{'hedging':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedges':>7} {'won':>5}")
+    for hedge, p50, p95, p99, hedges, wins in tail_rows:
+        print(f"{'on' if hedge else 'off':>8} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {hedges:>7} {wins:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: cold start.
+
+Two measurements:
+  * import profile - `python -X importtime -c "import main"`, summarised as
+    the modules with the largest cumulative import cost, so a regression
+    (a heavy dependency pulled in at import time) shows up by name;
+  * time to first response - from spawning the server process until
+    /health first answers 200, median over several runs.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from benchmarks.bench_workers import free_port
+
+
+def import_profile() -> List[Tuple[int, int, str]]:
+    """(cumulative µs, self µs, module) for every module imported by `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    """Poll /health every 10ms (bench_workers' 200ms poll is too coarse here)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def time_to_first_response(command: List[str]) -> float:
+    """Seconds from process spawn until /health returns 200 ("{port}" in command is filled in)."""
+    port = free_port()
+    command = [part.format(port=port) for part in command]
+    env = dict(os.environ, PORT=str(port), APP_PORT=str(port), APP_HOST="127.0.0.1",
+               WEB_CONCURRENCY="1", UBER_SERVER_TOKEN="", TRACE_EXPORTER="off", CACHE_SNAPSHOT_PATH="")
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        return time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start profile")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="modules shown in the import profile")
+    args = parser.parse_args()
+
+    rows = import_profile()
+    total = max(cumulative for cumulative, _, _ in rows)
+    print(f"import main: {total / 1000:.0f} ms")
+    print("-" * 64)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+    commands = {
+        "uvicorn": [sys.executable, "-m", "uvicorn", "main:app", "--port", "{port}"],
+        "serve.py": [sys.executable, "serve.py"],
+    }
+    print()
+    print(f"{'entry point':<12} {'median s':>10} {'min s':>8} {'max s':>8}  (spawn -> first /health)")
+    for name, command in commands.items():
+        timings = [time_to_first_response(command) for _ in range(args.runs)]
+        print(f"{name:<12} {statistics.median(timings):>10.3f} {min(timings):>8.3f} {max(timings):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
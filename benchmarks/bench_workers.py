@@ -0,0 +1,135 @@
+"""
+Benchmark: throughput of serve.py as the number of worker processes grows.
+
+For each worker count, starts `python serve.py` on a free port, waits for
+/health, then drives it with keep-alive HTTP clients (several processes so the
+load generator is not the single-core bottleneck) and reports requests/s and
+latency percentiles. The Uber token is unset so the fare calculator answers
+and the numbers measure this app, not the upstream API.
+
+The load generator shares the machine with the server, so on a host with
+fewer cores than workers + clients the curve flattens early.
+
+Run from the repository root:
+    python -m benchmarks.bench_workers --workers 1 2 4 --path /api/ride-info
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def client_process(port: int, path: str, threads: int, seconds: float, results) -> None:
+    """Run `threads` keep-alive clients for `seconds`; report (count, errors, latencies)."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def run():
+        local: List[float] = []
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise OSError(response.status)
+                local.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((len(latencies), errors[0], latencies))
+
+
+def measure(workers: int, path: str, clients: int, threads: int, seconds: float) -> Tuple[float, float, float, int]:
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), APP_HOST="127.0.0.1",
+               UBER_SERVER_TOKEN="", TRACE_EXPORTER="off", CACHE_SNAPSHOT_PATH="")
+    server = subprocess.Popen([sys.executable, "serve.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        # Warm every worker's caches before measuring
+        client_process(port, path, threads=workers * 2, seconds=1.0, results=multiprocessing.Queue())
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client_process, args=(port, path, threads, seconds, results))
+            for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    count = sum(c for c, _, _ in collected)
+    errors = sum(e for _, e, _ in collected)
+    latencies = sorted(latency for _, _, batch in collected for latency in batch)
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    return count / seconds, p50, p99, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput vs. worker count for serve.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/api/ride-info")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--threads", type=int, default=16, help="keep-alive connections per client process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"Path: {args.path}  cores: {os.cpu_count()}  connections: {args.clients * args.threads}")
+    print("-" * 64)
+    print(f"{'workers':>7} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8} {'scaling':>9}")
+    baseline = None
+    for workers in args.workers:
+        throughput, p50, p99, errors = measure(workers, args.path, args.clients, args.threads, args.seconds)
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:>10.0f} {p50:>10.1f} {p99:>10.1f} {errors:>8} {throughput / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Replay a request recording against a build and check outputs and latency.
+
+Takes a log written with RECORD_PATH (utils/recording.py), starts the build
+under test (one uvicorn worker, fresh caches) with its Uber API pointed at a
+local server that answers from the recorded Uber responses, and sends the
+recorded requests in order. It then reports:
+
+  * output changes: status codes or response bodies that differ from the
+    recording, with the first differing JSON keys or text offset;
+  * latency per path (p50/p95). With --baseline, a second build is replayed
+    the same way and compared with it; the run fails when the candidate is
+    more than --max-slowdown times slower on any path. Without one, the
+    recorded server-side latencies are shown for reference only, since they
+    include the real Uber API.
+
+Uber calls that aren't in the recording (for example because the recorded
+worker already had them cached) are answered with 503, so the build falls
+back to the calculator; they are counted, as they usually explain changes.
+A recording without any Uber calls is replayed without an Uber token, the
+way it was recorded. Record from a freshly started worker for the most
+faithful replays.
+
+Webhook replies link to a quote with a random ID (when PUBLIC_BASE_URL is
+set), so that link is left out of the comparison.
+
+Run from the repository root:
+    RECORD_PATH=recording.jsonl.gz python main.py      # record, then stop the server
+    python -m benchmarks.replay recording.jsonl.gz
+    git worktree add /tmp/baseline main
+    python -m benchmarks.replay recording.jsonl.gz --baseline /tmp/baseline --rounds 3
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.bench_workers import free_port, wait_ready
+from utils.recording import read_records
+
+# The "📄 Details:" quote link in Omi replies; quote IDs are random per request
+DETAILS_LINK = re.compile(r"\n📄 Details: \S+")
+
+
+def upstream_key(endpoint: str, params: Dict[str, str]) -> Tuple:
+    return endpoint.strip("/"), tuple(sorted(params.items()))
+
+
+class RecordedUber(BaseHTTPRequestHandler):
+    """Answers Uber API calls with the recorded responses, in recorded order per call."""
+
+    protocol_version = "HTTP/1.1"
+    responses: Dict[Tuple, Deque[Tuple[int, str]]] = {}
+    last: Dict[Tuple, Tuple[int, str]] = {}
+    unmatched = 0
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        endpoint = url.path.split("/v1.2/", 1)[-1]
+        key = upstream_key(endpoint, dict(parse_qsl(url.query)))
+        queue = self.responses.get(key)
+        if queue:
+            status, body = self.last[key] = queue.popleft()
+        elif key in self.last:
+            status, body = self.last[key]
+        else:
+            type(self).unmatched += 1
+            status, body = 503, '{"message": "not in recording"}'
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    @classmethod
+    def load(cls, records: List[Dict]) -> None:
+        responses: Dict[Tuple, Deque[Tuple[int, str]]] = defaultdict(deque)
+        for record in records:
+            for call in record.get("upstream", ()):
+                responses[upstream_key(call["endpoint"], call["params"])].append((call["status"], call["body"]))
+        cls.responses, cls.last, cls.unmatched = dict(responses), {}, 0
+
+
+def replayable(record: Dict) -> bool:
+    return record.get("body") is not None and record.get("response") is not None
+
+
+def comparable(record: Dict, body: str) -> str:
+    """A response body as compared: webhook replies without their quote link."""
+    if record["path"] != "/webhook/omi":
+        return body
+    try:
+        reply = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(reply, dict) and isinstance(reply.get("message"), str):
+        reply["message"] = DETAILS_LINK.sub("", reply["message"])
+        return json.dumps(reply, ensure_ascii=False, sort_keys=True)
+    return body
+
+
+def changed(record: Dict, result: Dict) -> bool:
+    if result["status"] != record["status"]:
+        return True
+    return comparable(record, record["response"]) != comparable(record, result["body"].decode("utf-8", "replace"))
+
+
+def replay_build(
+    build: str,
+    records: List[Dict],
+    upstream: List[Dict],
+    rounds: int
+) -> Tuple[List[Dict], Dict[str, List[float]], int]:
+    """
+    Replay `records` against one build, serving Uber calls from `upstream`
+    (without an Uber token if there are none, as when they were recorded).
+
+    Returns the first round's results, latencies per path and the number of
+    Uber calls that weren't in the recording.
+    """
+    RecordedUber.load(upstream)
+    with_uber = bool(RecordedUber.responses)
+    uber_port, app_port = free_port(), free_port()
+    uber = ThreadingHTTPServer(("127.0.0.1", uber_port), RecordedUber)
+    uber.daemon_threads = True
+    threading.Thread(target=uber.serve_forever, daemon=True).start()
+
+    env = dict(
+        os.environ,
+        UBER_SERVER_TOKEN="replay" if with_uber else "",
+        UBER_API_BASE_URL=f"http://127.0.0.1:{uber_port}/v1.2",
+        CACHE_SNAPSHOT_PATH="",
+        RECORD_PATH="",
+        PUBLIC_BASE_URL="",
+        UBER_HEDGE="false",
+        UBER_QUOTA_PER_HOUR="100000000",
+        UBER_QUOTA_BURST="1000000",
+        PYTHONPATH=os.path.abspath(build)
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=build, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    results: List[Dict] = []
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    try:
+        wait_ready(app_port)
+        connection = http.client.HTTPConnection("127.0.0.1", app_port, timeout=30)
+        for round_number in range(rounds):
+            for record in records:
+                target = record["path"] + (f"?{record['query']}" if record["query"] else "")
+                body = record["body"].encode() if record["body"] else None
+                started = time.perf_counter()
+                connection.request(record["method"], target, body=body, headers=record["headers"])
+                response = connection.getresponse()
+                content = response.read()
+                latencies[record["path"]].append((time.perf_counter() - started) * 1000)
+                if round_number == 0:
+                    results.append({"status": response.status, "body": content})
+        connection.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        uber.shutdown()
+    return results, latencies, RecordedUber.unmatched
+
+
+def describe_change(record: Dict, result: Dict) -> str:
+    if result["status"] != record["status"]:
+        return f"status {record['status']} -> {result['status']}"
+    recorded = comparable(record, record["response"])
+    replayed = comparable(record, result["body"].decode("utf-8", "replace"))
+    if record["content_type"].startswith("application/json"):
+        try:
+            before, after = json.loads(recorded), json.loads(replayed)
+            if isinstance(before, dict) and isinstance(after, dict):
+                keys = sorted(key for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+                return f"JSON keys differ: {', '.join(keys[:5])}"
+        except ValueError:
+            pass
+    offset = next((i for i, (a, b) in enumerate(zip(recorded, replayed)) if a != b), min(len(recorded), len(replayed)))
+    return f"body differs at char {offset}: {recorded[offset:offset + 40]!r} -> {replayed[offset:offset + 40]!r}"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a request recording against a build")
+    parser.add_argument("recording", help="log written with RECORD_PATH")
+    parser.add_argument("--build", default=".", help="checkout to test (default: this one)")
+    parser.add_argument("--baseline", help="checkout to compare latencies with")
+    parser.add_argument("--rounds", type=int, default=1, help="times the recording is played for latencies")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="allowed candidate/baseline p50 ratio")
+    parser.add_argument("--show", type=int, default=10, help="output changes to list")
+    args = parser.parse_args()
+
+    all_records = read_records(args.recording)
+    requests = [record for record in all_records if "path" in record]
+    records = [record for record in requests if replayable(record)]
+    print(f"{len(records)} of {len(requests)} recorded requests are replayable")
+    if not records:
+        sys.exit(1)
+
+    results, latencies, unmatched = replay_build(args.build, records, all_records, args.rounds)
+    changes = [(record, result) for record, result in zip(records, results) if changed(record, result)]
+    baseline: Optional[Dict[str, List[float]]] = None
+    if args.baseline:
+        _, baseline, _ = replay_build(args.baseline, records, all_records, args.rounds)
+
+    print(f"Output changes: {len(changes)}; Uber calls not in the recording: {unmatched}")
+    for record, result in changes[:args.show]:
+        print(f"  {record['method']} {record['path']}?{record['query'][:60]}: {describe_change(record, result)}")
+    print()
+
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    for record in records:
+        recorded[record["path"]].append(record["ms"])
+    reference = "baseline" if baseline else "recorded"
+    print(f"{'path':<16} {'requests':>8} {reference + ' p50':>13} {'p95':>8} {'replay p50':>11} {'p95':>8}")
+    print("-" * 70)
+    slower = []
+    for path, values in sorted(latencies.items()):
+        before = baseline[path] if baseline else recorded[path]
+        ratio = percentile(values, 0.5) / max(percentile(before, 0.5), 1e-6)
+        if baseline and ratio > args.max_slowdown:
+            slower.append(f"{path} ({ratio:.2f}x)")
+        print(f"{path:<16} {len(values):>8} {percentile(before, 0.5):>13.2f} {percentile(before, 0.95):>8.2f} "
+              f"{percentile(values, 0.5):>11.2f} {percentile(values, 0.95):>8.2f}")
+
+    failed = False
+    if changes:
+        print(f"\nFAIL: {len(changes)} responses differ from the recording")
+        failed = True
+    if slower:
+        print(f"\nFAIL: slower than the baseline by more than {args.max_slowdown:g}x: {', '.join(slower)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nPASS: outputs match the recording" + (" and latency is within bounds" if baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for a Redis server, for exercising CACHE_BACKEND=redis.
+
+Speaks enough of the Redis protocol (RESP2) for RedisBackend: PING, AUTH,
+SELECT, GET, SET (with EX/PX), MGET and DEL. Data lives in memory only.
+
+Run from the repository root:
+    python -m benchmarks.resp_server --port 6380
+    CACHE_BACKEND=redis REDIS_URL=redis://localhost:6380/0 python main.py
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+_store: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _lookup(key: bytes) -> Optional[bytes]:
+    entry = _store.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if expires_at is not None and expires_at <= time.monotonic():
+        del _store[key]
+        return None
+    return value
+
+
+def execute(command: List[bytes]) -> bytes:
+    name = command[0].upper()
+    arguments = command[1:]
+
+    if name == b"PING":
+        return b"+PONG\r\n"
+    if name in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    if name == b"GET":
+        return _bulk(_lookup(arguments[0]))
+    if name == b"MGET":
+        return b"*%d\r\n" % len(arguments) + b"".join(_bulk(_lookup(key)) for key in arguments)
+    if name == b"SET":
+        key, value, options = arguments[0], arguments[1], [option.upper() for option in arguments[2:]]
+        expires_at = None
+        if b"PX" in options:
+            expires_at = time.monotonic() + int(arguments[2 + options.index(b"PX") + 1]) / 1000
+        elif b"EX" in options:
+            expires_at = time.monotonic() + int(arguments[2 + options.index(b"EX") + 1])
+        _store[key] = (value, expires_at)
+        return b"+OK\r\n"
+    if name == b"DEL":
+        removed = sum(_store.pop(key, None) is not None for key in arguments)
+        return b":%d\r\n" % removed
+    return b"-ERR unknown command '%s'\r\n" % name
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, e.g. typed into telnet
+        return line.split()
+    command = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            command = await read_command(reader)
+            if not command:
+                break
+            writer.write(execute(command))
+            # Pipelined commands are answered in one write
+            if not reader._buffer:
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6380) -> asyncio.AbstractServer:
+    return await asyncio.start_server(handle, host, port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    async def run():
+        server = await serve(args.host, args.port)
+        print(f"🧪 RESP stand-in listening on {args.host}:{args.port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Soak test: long-running load with memory-growth detection.
+
+Starts the local Uber stand-in (benchmarks/uber_server.py) and one uvicorn
+worker with tracemalloc on, then drives /webhook/omi, /ride and
+/api/ride-info from keep-alive clients for --duration seconds. Requests use
+a pool of --trips distinct trips and a new memory ID per webhook call, so
+every cache, the idempotency store and the quote store fill up the way they
+would in production.
+
+After --warmup seconds the server's baseline snapshot is taken. Then every
+--interval seconds /debug/memory is sampled for RSS, traced memory and the
+top growth sites. Each sample window gets a growth per request. Bounded
+state levels off, so the run fails (exit status 1) only if the last
+--windows windows all grew by more than --max-bytes-per-request.
+
+Run from the repository root (hours for a real soak, minutes for a smoke run):
+    python -m benchmarks.soak --duration 14400 --interval 300
+    python -m benchmarks.soak --duration 120 --warmup 20 --interval 20
+
+Against a server that is already running (MEMORY_TRACE_FRAMES and
+TRACE_DEBUG_TOKEN set there):
+    python -m benchmarks.soak --url http://127.0.0.1:8000 --token $TRACE_DEBUG_TOKEN
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.bench_workers import free_port, wait_ready
+from utils.location_input import LocationInput
+
+MIB = 1024 * 1024
+
+
+class Sample(NamedTuple):
+    elapsed: float
+    requests: int
+    errors: int
+    rss_bytes: int
+    traced_bytes: Optional[int]
+
+
+class Load:
+    """Keep-alive clients cycling through the soaked endpoints."""
+
+    def __init__(self, host: str, port: int, trips: int, users: int):
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._memory_ids = itertools.count()
+        self._users = users
+        # Random trips around the default locations, reused like popular trips are
+        random.seed(0)
+        start, destination = LocationInput.START_LOCATION, LocationInput.DESTINATION_LOCATION
+        self._trips = [
+            (
+                round(start.latitude + random.uniform(-0.03, 0.03), 6),
+                round(start.longitude + random.uniform(-0.03, 0.03), 6),
+                round(destination.latitude + random.uniform(-0.03, 0.03), 6),
+                round(destination.longitude + random.uniform(-0.03, 0.03), 6)
+            )
+            for _ in range(trips)
+        ]
+
+    def _trip_query(self) -> str:
+        start_lat, start_lon, dest_lat, dest_lon = random.choice(self._trips)
+        return urlencode({"start_lat": start_lat, "start_lon": start_lon, "dest_lat": dest_lat, "dest_lon": dest_lon})
+
+    def _webhook(self, connection: http.client.HTTPConnection) -> int:
+        memory_id = next(self._memory_ids)
+        body = json.dumps({
+            "id": f"memory_soak_{memory_id}",
+            "created_at": "2025-10-22T10:30:00Z",
+            "transcript": [
+                {"text": "I need a ride to Mission Street", "speaker": "SPEAKER_00", "speakerId": 0,
+                 "is_user": True, "start": 0.0, "end": 2.5},
+                {"text": f"Sure, conversation {memory_id}", "speaker": "SPEAKER_01", "speakerId": 1,
+                 "is_user": False, "start": 2.5, "end": 4.0}
+            ]
+        })
+        uid = f"soak-user-{memory_id % self._users}"
+        connection.request("POST", f"/webhook/omi?uid={uid}", body=body, headers={"Content-Type": "application/json"})
+        return self._read(connection)
+
+    def _ride(self, connection: http.client.HTTPConnection) -> int:
+        connection.request("GET", f"/ride?{self._trip_query()}&stream=false")
+        return self._read(connection)
+
+    def _ride_info(self, connection: http.client.HTTPConnection) -> int:
+        connection.request("GET", f"/api/ride-info?{self._trip_query()}")
+        return self._read(connection)
+
+    @staticmethod
+    def _read(connection: http.client.HTTPConnection) -> int:
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def _run(self) -> None:
+        calls = itertools.cycle((self._webhook, self._ride, self._ride_info))
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        while not self._stop.is_set():
+            try:
+                failed = next(calls)(connection) >= 500
+            except (OSError, http.client.HTTPException):
+                failed = True
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            with self._lock:
+                self.requests += 1
+                self.errors += failed
+        connection.close()
+
+    def start(self, concurrency: int) -> List[threading.Thread]:
+        threads = [threading.Thread(target=self._run, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def stop(self, threads: List[threading.Thread]) -> None:
+        self._stop.set()
+        for thread in threads:
+            thread.join(timeout=35)
+
+
+def read_memory(host: str, port: int, token: str, reset: bool = False, limit: int = 10) -> Dict:
+    connection = http.client.HTTPConnection(host, port, timeout=120)
+    try:
+        query = urlencode({"reset": str(reset).lower(), "limit": limit})
+        connection.request("GET", f"/debug/memory?{query}", headers={"X-Trace-Token": token})
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"/debug/memory answered {response.status} - is TRACE_DEBUG_TOKEN set on the server?")
+        return json.loads(body)
+    finally:
+        connection.close()
+
+
+def start_servers(args: argparse.Namespace, token: str) -> tuple:
+    """Start the Uber stand-in and one app worker; returns (processes, port)."""
+    uber_port, app_port = free_port(), free_port()
+    uber = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.uber_server", "--port", str(uber_port), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    env = dict(
+        os.environ,
+        UBER_SERVER_TOKEN="soak",
+        UBER_API_BASE_URL=f"http://127.0.0.1:{uber_port}/v1.2",
+        MEMORY_TRACE_FRAMES=str(args.frames),
+        TRACE_DEBUG_TOKEN=token,
+        CACHE_SNAPSHOT_PATH="",
+        # The stand-in has no rate limit, so neither should the app's quota
+        UBER_QUOTA_PER_HOUR="100000000",
+        UBER_QUOTA_BURST="1000000"
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return [app, uber], app_port
+
+
+def window_growth(samples: List[Sample]) -> List[float]:
+    """Growth in bytes per request of each window between consecutive samples."""
+    growth = []
+    for before, after in zip(samples, samples[1:]):
+        requests = max(1, after.requests - before.requests)
+        if after.traced_bytes is not None and before.traced_bytes is not None:
+            growth.append((after.traced_bytes - before.traced_bytes) / requests)
+        else:
+            growth.append((after.rss_bytes - before.rss_bytes) / requests)
+    return growth
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soak test with memory-growth detection")
+    parser.add_argument("--duration", type=float, default=3600, help="seconds of load after warmup")
+    parser.add_argument("--warmup", type=float, default=120, help="seconds of load before the baseline")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between memory samples")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--trips", type=int, default=2000, help="distinct trips requested")
+    parser.add_argument("--users", type=int, default=200, help="distinct Omi user IDs")
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated Uber API latency")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc frames per allocation")
+    parser.add_argument("--max-bytes-per-request", type=float, default=64.0,
+                        help="growth per request above which a window counts as growing")
+    parser.add_argument("--windows", type=int, default=3, help="consecutive growing windows that fail the run")
+    parser.add_argument("--top", type=int, default=10, help="growth sites to report")
+    parser.add_argument("--url", help="soak an already running server instead of starting one")
+    parser.add_argument("--token", help="the server's TRACE_DEBUG_TOKEN (with --url)")
+    args = parser.parse_args()
+
+    processes = []
+    if args.url:
+        if not args.token:
+            parser.error("--url needs --token")
+        target = urlsplit(args.url)
+        host, port, token = target.hostname, target.port or 80, args.token
+    else:
+        token = secrets.token_hex(16)
+        processes, port = start_servers(args, token)
+        host = "127.0.0.1"
+
+    try:
+        if processes:
+            wait_ready(port)
+        load = Load(host, port, args.trips, args.users)
+        threads = load.start(args.concurrency)
+        print(f"Warming up for {args.warmup:.0f}s with {args.concurrency} clients...", flush=True)
+        time.sleep(args.warmup)
+
+        baseline = read_memory(host, port, token, reset=True)
+        if not baseline.get("tracing"):
+            print("Server is not tracing (MEMORY_TRACE_FRAMES=0) - judging by RSS only", flush=True)
+        started = time.monotonic()
+        samples = [Sample(0.0, load.requests, load.errors, baseline["rss_bytes"], baseline.get("traced_bytes"))]
+
+        print(f"{'elapsed':>8} {'requests':>9} {'req/s':>7} {'errors':>7} {'RSS MiB':>8} {'traced MiB':>10} {'B/request':>10}")
+        print("-" * 66)
+        report = baseline
+        while time.monotonic() - started < args.duration:
+            time.sleep(min(args.interval, max(0.0, args.duration - (time.monotonic() - started))))
+            report = read_memory(host, port, token, limit=args.top)
+            sample = Sample(time.monotonic() - started, load.requests, load.errors,
+                            report["rss_bytes"], report.get("traced_bytes"))
+            previous = samples[-1]
+            samples.append(sample)
+            rate = (sample.requests - previous.requests) / max(1e-9, sample.elapsed - previous.elapsed)
+            traced = f"{sample.traced_bytes / MIB:>10.1f}" if sample.traced_bytes is not None else f"{'-':>10}"
+            print(f"{sample.elapsed:>7.0f}s {sample.requests:>9} {rate:>7.0f} {sample.errors:>7} "
+                  f"{sample.rss_bytes / MIB:>8.1f} {traced} {window_growth(samples)[-1]:>10.1f}", flush=True)
+
+        load.stop(threads)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=30)
+
+    growth = window_growth(samples)
+    print()
+    if report.get("top_growth"):
+        print(f"Top growth since baseline ({samples[-1].requests - samples[0].requests} requests):")
+        for site in report["top_growth"]:
+            print(f"  {site['size_diff'] / 1024:>9.1f} KiB {site['count_diff']:>+8} blocks  {site['site']}")
+        print()
+
+    total = samples[-1].requests - samples[0].requests
+    memory = "traced" if samples[-1].traced_bytes is not None else "RSS"
+    overall = (
+        ((samples[-1].traced_bytes or 0) - (samples[0].traced_bytes or 0)) if memory == "traced"
+        else samples[-1].rss_bytes - samples[0].rss_bytes
+    ) / max(1, total)
+    print(f"{total} requests, {samples[-1].errors} errors; {memory} memory grew {overall:.1f} B/request overall")
+
+    recent = growth[-args.windows:]
+    if len(recent) < args.windows:
+        print(f"Only {len(recent)} sample windows - run longer than {args.windows} intervals for a verdict")
+        return
+    if all(value > args.max_bytes_per_request for value in recent):
+        print(f"FAIL: memory grew more than {args.max_bytes_per_request:g} B/request in each of the last "
+              f"{args.windows} windows ({', '.join(f'{value:.1f}' for value in recent)})")
+        sys.exit(1)
+    print("PASS: memory per request levelled off")
+
+
+if __name__ == "__main__":
+    main()
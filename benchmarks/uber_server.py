@@ -0,0 +1,122 @@
+"""
+Local stand-in for the Uber estimates API, for load and soak tests.
+
+Answers GET <prefix>/estimates/price and <prefix>/estimates/time in the Uber
+API format, from the fare calculator with a little random surge, after an
+optional simulated latency. A share of requests can be made slow (tail
+latency) or fail with 503. Any `Authorization: Token ...` is accepted.
+
+Run from the repository root:
+    python -m benchmarks.uber_server --port 8101 --latency-ms 40
+    UBER_SERVER_TOKEN=local UBER_API_BASE_URL=http://127.0.0.1:8101/v1.2 python main.py
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.fare_calculator import FareCalculator
+
+
+class UberHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    error_rate = 0.0
+    tail_rate = 0.0
+    tail_latency = 0.0
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if not self.headers.get("Authorization", "").startswith("Token "):
+            return self._send(401, {"message": "Unauthorized"})
+        if self.latency:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.tail_rate:
+            time.sleep(self.tail_latency)
+        if random.random() < self.error_rate:
+            return self._send(503, {"message": "Service unavailable"})
+
+        try:
+            if url.path.endswith("/estimates/price"):
+                body = {"prices": self._prices(params)}
+            elif url.path.endswith("/estimates/time"):
+                body = {"times": self._times(params)}
+            else:
+                return self._send(404, {"message": "Not found"})
+        except (KeyError, ValueError):
+            return self._send(422, {"message": "Invalid coordinates"})
+        self._send(200, body)
+
+    @staticmethod
+    def _prices(params: dict) -> list:
+        estimates = FareCalculator.get_price_estimates(
+            float(params["start_latitude"]), float(params["start_longitude"]),
+            float(params["end_latitude"]), float(params["end_longitude"])
+        )
+        surge = random.choice((1.0, 1.0, 1.0, 1.2))
+        prices = []
+        for estimate in estimates:
+            price = dict(estimate.to_dict())
+            price["low_estimate"] = round(estimate.low_estimate * surge, 2)
+            price["high_estimate"] = round(estimate.high_estimate * surge, 2)
+            price["estimate"] = f"${price['low_estimate']:.0f}-${price['high_estimate']:.0f}"
+            prices.append(price)
+        return prices
+
+    @staticmethod
+    def _times(params: dict) -> list:
+        estimates = FareCalculator.get_time_estimates(float(params["start_latitude"]), float(params["start_longitude"]))
+        return [dict(estimate.to_dict(), estimate=estimate.estimate + random.randint(-60, 60)) for estimate in estimates]
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def serve(
+    host: str,
+    port: int,
+    latency_ms: float = 0.0,
+    error_rate: float = 0.0,
+    tail_rate: float = 0.0,
+    tail_ms: float = 0.0
+) -> ThreadingHTTPServer:
+    UberHandler.latency = latency_ms / 1000
+    UberHandler.error_rate = error_rate
+    UberHandler.tail_rate = tail_rate
+    UberHandler.tail_latency = tail_ms / 1000
+    server = ThreadingHTTPServer((host, port), UberHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Uber estimates API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean simulated response time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="share of requests delayed by --tail-ms")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="extra latency of slow requests")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.error_rate, args.tail_rate, args.tail_ms)
+    print(f"Uber stand-in listening on http://{args.host}:{args.port}/v1.2", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
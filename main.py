@@ -1,27 +1,141 @@
-from fastapi import FastAPI, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+import asyncio
 import os
 import sys
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
 
 # Force unbuffered output for instant logs
 sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, 'reconfigure') else None
 
-from utils.location_input import LocationInput, Location
-from utils.uber_client import UberClient
-from utils.display import UberDisplay
+# Only what every request needs is imported up front. The Uber client, the
+# renderers and live updates are imported and built on first use, so a cold
+# instance can answer /health as soon as FastAPI itself is loaded.
+from utils.location_input import LocationInput, Location, quantize_coordinate
+from utils.assets import StaticAssets, IMMUTABLE_CACHE_CONTROL
+from utils.responses import FastJSONResponse, dumps
+from utils.http_cache import cached_response, make_etag, trip_etag
+from utils.schemas import CompareRequest, RideInfoResponse, StopSchema
+from utils.profiling import ProfilingMiddleware, profiling_enabled
+from utils.recording import RecordingMiddleware, record_log, recording_enabled
+from utils.tracing import TracingMiddleware, debug_token_matches, exporter, span
+from utils.admission import AdmissionMiddleware, admission
+from utils.metrics import metrics
+from utils.quota import BATCH, INTERACTIVE, WEBHOOK, outbound_priority
+from utils.cache_backends import cache_backend
+from utils.idempotency import webhook_replies
+from utils.quotes import Quote, quotes_enabled
+from utils.omi_payload import OMI_MAX_BODY_BYTES, OMI_MAX_SEGMENTS, read_omi_payload
+from utils.realtime import realtime_sessions
+from utils.memory import memory_tracker
+
+if TYPE_CHECKING:
+    from utils.default_trip import DefaultTrip
+    from utils.estimates import PriceEstimate, TimeEstimate
+    from utils.live_updates import LiveUpdateHub
+    from utils.places import PlaceIndex
+    from utils.prefetch import TripPrefetcher
+    from utils.quotes import QuoteStore
+    from utils.uber_client import UberClient
 
 load_dotenv()
 
-app = FastAPI(
-    title="OMI Uber Integration",
-    description="Generate Uber deep links with price and time estimates",
-    version="1.0.0"
-)
+router = APIRouter()
+
+
+@lru_cache(maxsize=None)
+def get_uber_client() -> "UberClient":
+    """The shared Uber client, created on first use."""
+    from utils.uber_client import UberClient
+    return UberClient()
+
+
+@lru_cache(maxsize=None)
+def get_live_updates() -> "LiveUpdateHub":
+    """The shared live-update hub, created when the first page subscribes."""
+    from utils.live_updates import LiveUpdateHub
+    return LiveUpdateHub(get_uber_client())
+
+
+@lru_cache(maxsize=None)
+def get_quotes() -> "QuoteStore":
+    """The shared quote store, created when quotes are first issued or served."""
+    from utils.quotes import QuoteStore
+    return QuoteStore()
+
+
+@lru_cache(maxsize=None)
+def get_trip_prefetcher() -> "TripPrefetcher":
+    """Keeps the default trip and the most requested ones warm in the estimate cache."""
+    from utils.prefetch import TripPrefetcher
+    prefetcher = TripPrefetcher(get_uber_client())
+    prefetcher.pin(LocationInput.START_LOCATION, LocationInput.DESTINATION_LOCATION)
+    # Re-render the default trip once its estimates are warm, so it's ready for the first request
+    prefetcher.add_listener(lambda: get_default_trip().refresh())
+    return prefetcher
+
+
+@lru_cache(maxsize=None)
+def get_default_trip() -> "DefaultTrip":
+    """Prerendered responses for the default trip, rendered after the first prefetch pass."""
+    from utils.default_trip import DefaultTrip
+    return DefaultTrip(get_uber_client())
+
+
+@lru_cache(maxsize=None)
+def get_place_index() -> "PlaceIndex":
+    """Grid index of the known places, loaded on the first reachability query."""
+    from utils.places import build_place_index
+    return build_place_index()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background monitors with the server and stop them on shutdown."""
+    from utils.cache_snapshot import CacheSnapshotter
+
+    # Warm restarts: the in-process cache is restored from and saved to a local snapshot
+    cache_snapshots = CacheSnapshotter(cache_backend)
+    memory_tracker.start()
+    admission.start()
+    cache_snapshots.start()
+    get_trip_prefetcher().start()
+    yield
+    await get_trip_prefetcher().stop()
+    await cache_snapshots.stop()
+    await admission.stop()
+    memory_tracker.stop()
+    record_log.close()
+
+
+def create_app() -> FastAPI:
+    """Build the application: routes, middleware and lifespan."""
+    application = FastAPI(
+        title="OMI Uber Integration",
+        description="Generate Uber deep links with price and time estimates",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    application.include_router(router)
+
+    # Per-request profiling is only wired in when a trigger is configured
+    if profiling_enabled():
+        application.add_middleware(ProfilingMiddleware)
+    # Request/response recording for replay checks, only when RECORD_PATH is set
+    if recording_enabled():
+        application.add_middleware(RecordingMiddleware)
+    application.add_middleware(TracingMiddleware)
+    # Outermost, so overload rejections cost as little as possible
+    application.add_middleware(AdmissionMiddleware)
+    return application
 
-# Initialize services
-uber_client = UberClient()
+
+# Off by default: /ride is streamed card by card only with RIDE_STREAMING=true or ?stream=true
+# (and ?stream=false turns it off again when RIDE_STREAMING=true)
+RIDE_STREAMING = os.getenv("RIDE_STREAMING", "false").lower() == "true"
 
 
 def get_input_form_html():
@@ -35,133 +149,7 @@ def get_input_form_html():
     <head>
         <meta name="viewport" content="width=device-width, initial-scale=1">
         <title>Uber Ride - Omi</title>
-        <style>
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', sans-serif;
-                background: linear-gradient(135deg, #000000 0%, #1a1a1a 100%);
-                color: #ffffff;
-                padding: 20px;
-                min-height: 100vh;
-            }}
-
-            .container {{
-                max-width: 600px;
-                margin: 0 auto;
-            }}
-
-            .header {{
-                text-align: center;
-                margin-bottom: 30px;
-            }}
-
-            .header h1 {{
-                font-size: 32px;
-                margin-bottom: 10px;
-            }}
-
-            .header .icon {{
-                font-size: 48px;
-                margin-bottom: 10px;
-            }}
-
-            .card {{
-                background: #1e1e1e;
-                border-radius: 12px;
-                padding: 20px;
-                margin-bottom: 20px;
-                border: 1px solid #333;
-            }}
-
-            .form-group {{
-                margin-bottom: 20px;
-            }}
-
-            label {{
-                display: block;
-                font-size: 14px;
-                color: #aaa;
-                margin-bottom: 8px;
-                font-weight: 600;
-            }}
-
-            input[type="text"],
-            input[type="number"] {{
-                width: 100%;
-                padding: 12px;
-                background: #2a2a2a;
-                border: 1px solid #444;
-                border-radius: 8px;
-                color: #ffffff;
-                font-size: 14px;
-            }}
-
-            input[type="text"]:focus,
-            input[type="number"]:focus {{
-                outline: none;
-                border-color: #ffffff;
-            }}
-
-            .btn {{
-                display: block;
-                width: 100%;
-                padding: 16px;
-                background: #ffffff;
-                color: #000000;
-                text-decoration: none;
-                border-radius: 8px;
-                font-size: 16px;
-                font-weight: 600;
-                text-align: center;
-                margin-bottom: 10px;
-                border: 2px solid #ffffff;
-                transition: all 0.2s;
-                cursor: pointer;
-            }}
-
-            .btn:hover {{
-                background: #000000;
-                color: #ffffff;
-            }}
-
-            .coords-row {{
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 10px;
-            }}
-
-            .note {{
-                font-size: 12px;
-                color: #666;
-                margin-top: 5px;
-            }}
-
-            .footer {{
-                text-align: center;
-                margin-top: 40px;
-                color: #666;
-                font-size: 14px;
-            }}
-
-            @media (max-width: 480px) {{
-                body {{
-                    padding: 12px;
-                }}
-
-                .header h1 {{
-                    font-size: 24px;
-                }}
-
-                .card {{
-                    padding: 15px;
-                }}
-            }}
-        </style>
+        <link rel="stylesheet" href="{StaticAssets.url('app.css')}">
     </head>
     <body>
         <div class="container">
@@ -173,7 +161,7 @@ def get_input_form_html():
 
             <form id="locationForm">
                 <div class="card">
-                    <h2 style="margin-bottom: 20px; font-size: 18px;">📍 Pickup Location</h2>
+                    <h2 class="card-title">📍 Pickup Location</h2>
 
                     <div class="form-group">
                         <label>Location Name</label>
@@ -198,7 +186,7 @@ def get_input_form_html():
                 </div>
 
                 <div class="card">
-                    <h2 style="margin-bottom: 20px; font-size: 18px;">📍 Destination</h2>
+                    <h2 class="card-title">📍 Destination</h2>
 
                     <div class="form-group">
                         <label>Location Name</label>
@@ -222,7 +210,7 @@ def get_input_form_html():
                     </div>
                 </div>
 
-                <button type="submit" class="btn">Get Uber Ride Info</button>
+                <button type="submit" class="btn btn-primary">Get Uber Ride Info</button>
             </form>
 
             <div class="footer">
@@ -253,14 +241,142 @@ def get_input_form_html():
     """
 
 
-@app.get("/")
-async def root():
+@lru_cache(maxsize=None)
+def get_input_form() -> Tuple[bytes, str]:
+    """The input form only depends on the default locations, so it is rendered once, on first request."""
+    body = get_input_form_html().encode("utf-8")
+    return body, make_etag(body)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def root(request: Request):
     """Root endpoint - shows input form."""
-    return HTMLResponse(content=get_input_form_html())
+    body, etag = get_input_form()
+    return cached_response(
+        request,
+        render=lambda: body,
+        media_type="text/html",
+        etag=etag
+    )
+
+
+@router.get("/static/{filename}", include_in_schema=False)
+async def static_asset(filename: str):
+    """Serve content-hashed static files with immutable cache headers."""
+    asset = StaticAssets.get(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return Response(
+        content=asset.body,
+        media_type=asset.media_type,
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": asset.etag}
+    )
+
+
+def _resolve_trip(
+    start_lat: Optional[float],
+    start_lon: Optional[float],
+    dest_lat: Optional[float],
+    dest_lon: Optional[float],
+    start_name: Optional[str] = None,
+    start_address: Optional[str] = None,
+    dest_name: Optional[str] = None,
+    dest_address: Optional[str] = None,
+    record: bool = True
+) -> Tuple[Location, Location]:
+    """
+    Build the trip from query parameters, or use the default locations.
+
+    The trip counts as a request for the prefetcher's popularity ranking
+    unless record=False.
+    """
+    with span("locations.resolve"):
+        start, destination = _build_trip(
+            start_lat, start_lon, dest_lat, dest_lon,
+            start_name, start_address, dest_name, dest_address
+        )
+    if record:
+        get_trip_prefetcher().record(start, destination)
+    return start, destination
+
+
+def _build_trip(
+    start_lat: Optional[float],
+    start_lon: Optional[float],
+    dest_lat: Optional[float],
+    dest_lon: Optional[float],
+    start_name: Optional[str],
+    start_address: Optional[str],
+    dest_name: Optional[str],
+    dest_address: Optional[str]
+) -> Tuple[Location, Location]:
+    if not all([start_lat, start_lon, dest_lat, dest_lon]):
+        return LocationInput.default_trip()
+
+    start = Location(
+        name=start_name or "Pickup",
+        address=start_address or "Unknown",
+        latitude=quantize_coordinate(start_lat),
+        longitude=quantize_coordinate(start_lon)
+    )
+    destination = Location(
+        name=dest_name or "Destination",
+        address=dest_address or "Unknown",
+        latitude=quantize_coordinate(dest_lat),
+        longitude=quantize_coordinate(dest_lon)
+    )
+    print(f"📍 Start: {start.name} ({start.address})", flush=True)
+    print(f"📍 Destination: {destination.name} ({destination.address})", flush=True)
+    return start, destination
+
+
+async def _trip_estimates(
+    start: Location,
+    destination: Location
+) -> Tuple[Optional[List["PriceEstimate"]], Optional[List["TimeEstimate"]]]:
+    """
+    Fetch a trip's price and time estimates concurrently.
+
+    The client blocks while it waits for a quota token, retries or hedges, so
+    it runs on worker threads (which copy the caller's priority and deadline)
+    rather than on the event loop.
+    """
+    return await asyncio.gather(
+        asyncio.to_thread(
+            get_uber_client().get_price_estimates,
+            start.latitude, start.longitude,
+            destination.latitude, destination.longitude
+        ),
+        asyncio.to_thread(get_uber_client().get_time_estimates, start.latitude, start.longitude)
+    )
 
 
-@app.get("/ride")
+def _generate_links(start: Location, destination: Location) -> Tuple[str, str]:
+    """Generate the Uber app deep link and mobile web link for a trip."""
+    with span("links.generate"):
+        deep_link = get_uber_client().generate_deep_link(
+            pickup_latitude=start.latitude,
+            pickup_longitude=start.longitude,
+            dropoff_latitude=destination.latitude,
+            dropoff_longitude=destination.longitude,
+            pickup_nickname=start.name,
+            dropoff_nickname=destination.name,
+            pickup_address=start.address,
+            dropoff_address=destination.address
+        )
+        web_link = get_uber_client().generate_mobile_web_link(
+            pickup_latitude=start.latitude,
+            pickup_longitude=start.longitude,
+            dropoff_latitude=destination.latitude,
+            dropoff_longitude=destination.longitude
+        )
+    return deep_link, web_link
+
+
+@router.get("/ride", response_class=HTMLResponse)
 async def get_ride(
+    request: Request,
     start_name: str = Query(None),
     start_address: str = Query(None),
     start_lat: float = Query(None),
@@ -268,93 +384,174 @@ async def get_ride(
     dest_name: str = Query(None),
     dest_address: str = Query(None),
     dest_lat: float = Query(None),
-    dest_lon: float = Query(None)
+    dest_lon: float = Query(None),
+    stream: Optional[bool] = Query(None),
+    quote: Optional[str] = Query(None)
 ):
     """
     Display ride information with user-provided or default locations.
+    With stream=true the page is flushed card by card as estimates arrive.
+    With quote=<id> (linked from the Omi reply) the stored quote is rendered
+    as-is; an expired or invalid quote falls back to fresh estimates.
     """
+    if quote and quotes_enabled():
+        with span("quote.load"):
+            stored = get_quotes().get(quote)
+        if stored is not None:
+            return _render_quote(request, stored)
+        print("⌛ Quote expired or invalid - fetching fresh estimates", flush=True)
+
     print("🚀 Generating Uber ride information...", flush=True)
 
-    # Use provided values or defaults
-    if not all([start_lat, start_lon, dest_lat, dest_lon]):
-        start, destination = LocationInput.get_trip_locations()
-    else:
-        start = Location(
-            name=start_name or "Pickup",
-            address=start_address or "Unknown",
-            latitude=start_lat,
-            longitude=start_lon
-        )
-        destination = Location(
-            name=dest_name or "Destination",
-            address=dest_address or "Unknown",
-            latitude=dest_lat,
-            longitude=dest_lon
-        )
-        print(f"📍 Start: {start.name} ({start.address})", flush=True)
-        print(f"📍 Destination: {destination.name} ({destination.address})", flush=True)
-
-    # Fetch price estimates from Uber API
-    print("💰 Fetching price estimates...", flush=True)
-    price_estimates = uber_client.get_price_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude,
-        end_latitude=destination.latitude,
-        end_longitude=destination.longitude
+    start, destination = _resolve_trip(
+        start_lat, start_lon, dest_lat, dest_lon,
+        start_name, start_address, dest_name, dest_address
     )
 
-    # Fetch time estimates from Uber API
-    print("⏱️  Fetching time estimates...", flush=True)
-    time_estimates = uber_client.get_time_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude
-    )
+    if stream if stream is not None else RIDE_STREAMING:
+        return StreamingResponse(_stream_ride_page(start, destination), media_type="text/html")
+
+    default_trip = get_default_trip()
+    if default_trip.matches(start, destination):
+        # Same page for every request without coordinates: serve the render for the current estimates
+        with outbound_priority(INTERACTIVE):
+            estimates = await _trip_estimates(start, destination)
+        rendered = default_trip.render(*estimates)
+        return cached_response(
+            request, render=lambda: rendered.ride_html, media_type="text/html", etag=rendered.ride_etag
+        )
+
+    # Fetch price and time estimates from Uber API at interactive priority
+    print("💰 Fetching price and time estimates...", flush=True)
+    with outbound_priority(INTERACTIVE):
+        price_estimates, time_estimates = await _trip_estimates(start, destination)
 
     # Generate deep links with user-selected locations
-    deep_link = UberClient.generate_deep_link(
-        pickup_latitude=start.latitude,
-        pickup_longitude=start.longitude,
-        dropoff_latitude=destination.latitude,
-        dropoff_longitude=destination.longitude,
-        pickup_nickname=start.name,
-        dropoff_nickname=destination.name,
-        pickup_address=start.address,
-        dropoff_address=destination.address
-    )
+    deep_link, web_link = _generate_links(start, destination)
 
-    web_link = UberClient.generate_mobile_web_link(
-        pickup_latitude=start.latitude,
-        pickup_longitude=start.longitude,
-        dropoff_latitude=destination.latitude,
-        dropoff_longitude=destination.longitude
-    )
+    from utils.display import TripView, UberDisplay
 
-    # Print terminal output
-    terminal_output = UberDisplay.generate_terminal_output(
-        start=start,
-        destination=destination,
-        price_estimates=price_estimates,
-        time_estimates=time_estimates,
-        deep_link=deep_link,
-        web_link=web_link
+    # Build the display view once and share it between terminal and HTML output
+    view = TripView.build(start, destination, price_estimates, time_estimates, deep_link, web_link)
+    with span("render.terminal"):
+        print(UberDisplay.render_terminal(view), flush=True)
+
+    # Return HTML, or 304 if the client already has this exact page
+    etag = trip_etag("ride.html", start, destination, price_estimates, time_estimates)
+
+    def render() -> bytes:
+        with span("render.html"):
+            return UberDisplay.render_html(view).encode("utf-8")
+
+    return cached_response(request, render=render, media_type="text/html", etag=etag)
+
+
+def _render_quote(request: Request, quote: Quote) -> Response:
+    """
+    Render a stored quote - no Uber calls, no recomputed links.
+
+    The page shows the quote as it was given, so it doesn't subscribe to
+    live updates (/ride/live would follow the default trip instead).
+    """
+    from utils.display import TripView, UberDisplay
+
+    view = TripView.build(
+        quote.start, quote.destination,
+        quote.price_estimates, quote.time_estimates,
+        quote.deep_link, quote.web_link
     )
-    print(terminal_output, flush=True)
-
-    # Return HTML
-    html_output = UberDisplay.generate_html_output(
-        start=start,
-        destination=destination,
-        price_estimates=price_estimates,
-        time_estimates=time_estimates,
-        deep_link=deep_link,
-        web_link=web_link
+    etag = trip_etag(
+        "quote.html", quote.start, quote.destination, quote.price_estimates, quote.time_estimates
     )
 
-    return HTMLResponse(content=html_output)
+    def render() -> bytes:
+        with span("render.html"):
+            return UberDisplay.render_html(view, live=False).encode("utf-8")
+
+    return cached_response(request, render=render, media_type="text/html", etag=etag)
 
 
-@app.get("/api/ride-info")
+async def _stream_ride_page(start: Location, destination: Location) -> AsyncIterator[str]:
+    """
+    Yield the ride page progressively.
+
+    The shell, location card and booking links go out before any Uber call
+    returns; the pickup-time and price cards follow as each estimate arrives.
+    """
+    from utils.display import PickupView, PriceView, TripView, UberDisplay
+
+    deep_link, web_link = _generate_links(start, destination)
+
+    # Start both Uber calls before the first flush so they overlap with it
+    # (the tasks copy the current context, priority and deadline included)
+    with outbound_priority(INTERACTIVE):
+        price_task = asyncio.create_task(asyncio.to_thread(
+            get_uber_client().get_price_estimates,
+            start.latitude, start.longitude,
+            destination.latitude, destination.longitude
+        ))
+        time_task = asyncio.create_task(asyncio.to_thread(
+            get_uber_client().get_time_estimates,
+            start.latitude, start.longitude
+        ))
+
+    yield UberDisplay.render_page_head()
+    yield UberDisplay.render_location_card(start, destination)
+    yield UberDisplay.render_links_card(deep_link, web_link)
+
+    pending = {price_task, time_task}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is price_task:
+                yield UberDisplay.render_price_card(PriceView.from_estimates(task.result()))
+            else:
+                yield UberDisplay.render_time_card(PickupView.from_estimates(task.result()))
+
+    yield UberDisplay.render_page_tail()
+
+    view = TripView.build(start, destination, price_task.result(), time_task.result(), deep_link, web_link)
+    print(UberDisplay.render_terminal(view), flush=True)
+
+
+@router.get("/ride/live")
+async def ride_live_updates(
+    request: Request,
+    start_lat: Optional[float] = Query(None),
+    start_lon: Optional[float] = Query(None),
+    dest_lat: Optional[float] = Query(None),
+    dest_lon: Optional[float] = Query(None)
+):
+    """
+    Server-sent events with changed estimate values for an open ride page.
+
+    Takes the same query string as /ride. All pages open on the same trip
+    share one upstream poll.
+    """
+    # The page load that opened this stream already counted the trip for the prefetcher
+    start, destination = _resolve_trip(start_lat, start_lon, dest_lat, dest_lon, record=False)
+
+    if not get_live_updates().can_subscribe(start, destination):
+        raise HTTPException(status_code=503, detail="Too many live trips", headers={"Retry-After": "60"})
+
+    from utils.live_updates import sse_event
+
+    async def events() -> AsyncIterator[bytes]:
+        async for changes in get_live_updates().updates(start, destination):
+            if await request.is_disconnected():
+                break
+            yield sse_event(changes)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/api/ride-info", response_model=RideInfoResponse, response_class=FastJSONResponse)
 async def get_ride_info(
+    request: Request,
     start_lat: Optional[float] = Query(None),
     start_lon: Optional[float] = Query(None),
     dest_lat: Optional[float] = Query(None),
@@ -368,83 +565,241 @@ async def get_ride_info(
     """
     print("📡 API request for ride info...", flush=True)
 
-    # Use provided values or defaults
+    # Without coordinates: the default trip's JSON for the current estimates, rendered once
     if not all([start_lat, start_lon, dest_lat, dest_lon]):
-        start, destination = LocationInput.get_trip_locations()
-    else:
-        start = Location(
-            name=start_name or "Pickup",
-            address="Custom location",
-            latitude=start_lat,
-            longitude=start_lon
-        )
-        destination = Location(
-            name=dest_name or "Destination",
-            address="Custom location",
-            latitude=dest_lat,
-            longitude=dest_lon
+        default_trip = get_default_trip()
+        get_trip_prefetcher().record(default_trip.start, default_trip.destination)
+        with outbound_priority(INTERACTIVE):
+            estimates = await _trip_estimates(default_trip.start, default_trip.destination)
+        rendered = default_trip.render(*estimates)
+        return cached_response(
+            request, render=lambda: rendered.ride_info_json, media_type="application/json",
+            etag=rendered.ride_info_etag
         )
-        print(f"📍 Custom locations - Start: ({start_lat}, {start_lon}), Dest: ({dest_lat}, {dest_lon})", flush=True)
 
-    # Fetch estimates
-    price_estimates = uber_client.get_price_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude,
-        end_latitude=destination.latitude,
-        end_longitude=destination.longitude
+    start = Location(
+        name=start_name or "Pickup",
+        address="Custom location",
+        latitude=quantize_coordinate(start_lat),
+        longitude=quantize_coordinate(start_lon)
     )
-
-    time_estimates = uber_client.get_time_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude
+    destination = Location(
+        name=dest_name or "Destination",
+        address="Custom location",
+        latitude=quantize_coordinate(dest_lat),
+        longitude=quantize_coordinate(dest_lon)
     )
+    print(f"📍 Custom locations - Start: ({start_lat}, {start_lon}), Dest: ({dest_lat}, {dest_lon})", flush=True)
+    get_trip_prefetcher().record(start, destination)
+
+    # Fetch estimates
+    with outbound_priority(INTERACTIVE):
+        price_estimates, time_estimates = await _trip_estimates(start, destination)
 
     # Generate links
-    deep_link = UberClient.generate_deep_link(
-        pickup_latitude=start.latitude,
-        pickup_longitude=start.longitude,
-        dropoff_latitude=destination.latitude,
-        dropoff_longitude=destination.longitude,
-        pickup_nickname=start.name,
-        dropoff_nickname=destination.name,
-        pickup_address=start.address,
-        dropoff_address=destination.address
+    deep_link, web_link = _generate_links(start, destination)
+
+    etag = trip_etag("ride-info.json", start, destination, price_estimates, time_estimates)
+
+    def render() -> bytes:
+        with span("render.json"):
+            return dumps({
+                "start_location": start.to_dict(),
+                "destination": destination.to_dict(),
+                "price_estimates": price_estimates,
+                "time_estimates": time_estimates,
+                "deep_link": deep_link,
+                "web_link": web_link
+            })
+
+    return cached_response(request, render=render, media_type="application/json", etag=etag)
+
+
+def _stop_location(stop: StopSchema, default_name: str) -> Location:
+    return Location(
+        name=stop.name or default_name,
+        address=stop.address or "Custom location",
+        latitude=quantize_coordinate(stop.latitude),
+        longitude=quantize_coordinate(stop.longitude)
     )
 
-    web_link = UberClient.generate_mobile_web_link(
-        pickup_latitude=start.latitude,
-        pickup_longitude=start.longitude,
-        dropoff_latitude=destination.latitude,
-        dropoff_longitude=destination.longitude
+
+@router.post("/api/compare", response_class=FastJSONResponse)
+async def compare_fares(body: CompareRequest):
+    """
+    Compare fares from one pickup to many destinations, or along an ordered route.
+
+    Distances and fares for every ride type are computed for all trips in one
+    vectorized pass. Alternatives are ranked by the fare of `ride_type`, and
+    only the best COMPARE_UPSTREAM_TOP_N get live estimates from the Uber API
+    and booking links.
+    """
+    from utils.fare_calculator import FareCalculator
+    from utils.fare_matrix import (
+        COMPARE_MAX_DESTINATIONS, COMPARE_UPSTREAM_TOP_N, rank_destinations, route_fares, route_legs
     )
 
-    return {
-        "start_location": {
-            "name": start.name,
-            "address": start.address,
-            "latitude": start.latitude,
-            "longitude": start.longitude
-        },
-        "destination": {
-            "name": destination.name,
-            "address": destination.address,
-            "latitude": destination.latitude,
-            "longitude": destination.longitude
-        },
-        "price_estimates": price_estimates,
-        "time_estimates": time_estimates,
-        "deep_link": deep_link,
-        "web_link": web_link
-    }
-
-
-@app.get("/health")
+    if len(body.destinations) > COMPARE_MAX_DESTINATIONS:
+        raise HTTPException(status_code=413, detail=f"More than {COMPARE_MAX_DESTINATIONS} destinations")
+    if body.ride_type not in FareCalculator.RATE_CARDS:
+        raise HTTPException(status_code=400, detail=f"Unknown ride type: {body.ride_type}")
+
+    pickup = _stop_location(body.pickup, "Pickup")
+    destinations = [
+        _stop_location(stop, f"Stop {i}" if body.ordered else f"Destination {i}")
+        for i, stop in enumerate(body.destinations, 1)
+    ]
+    metrics.inc("compare.trips", len(destinations))
+
+    if body.ordered:
+        # Uber's estimates are point to point, so a route is priced from the rate cards only
+        stops = [pickup, *destinations]
+        with span("compare.matrix", trips=len(destinations)):
+            legs = route_legs(stops)
+        print(f"🧭 Compared route with {len(destinations)} stops: {sum(legs.distances):.2f} mi", flush=True)
+        return FastJSONResponse({
+            "pickup": pickup.to_dict(),
+            "legs": [
+                {
+                    "from": stops[i].to_dict(),
+                    "to": stops[i + 1].to_dict(),
+                    "distance_miles": round(legs.distances[i], 2),
+                    "duration_min": legs.durations[i],
+                    "fares": legs.trip_fares(i)
+                }
+                for i in range(len(destinations))
+            ],
+            "total": {
+                "distance_miles": round(sum(legs.distances), 2),
+                "duration_min": sum(legs.durations),
+                "fares": route_fares(legs)
+            }
+        })
+
+    with span("compare.matrix", trips=len(destinations)):
+        matrix, order = rank_destinations(pickup, destinations, body.ride_type)
+
+    # Live estimates for the best candidates only, fetched concurrently
+    top = order[:COMPARE_UPSTREAM_TOP_N]
+    with outbound_priority(INTERACTIVE):
+        upstream = await asyncio.gather(*(
+            asyncio.to_thread(
+                get_uber_client().get_price_estimates,
+                start_latitude=pickup.latitude,
+                start_longitude=pickup.longitude,
+                end_latitude=destinations[i].latitude,
+                end_longitude=destinations[i].longitude
+            )
+            for i in top
+        ))
+    live = dict(zip(top, upstream))
+    print(f"🧭 Compared {len(destinations)} destinations, cheapest {body.ride_type}: {destinations[order[0]].name}", flush=True)
+
+    candidates = []
+    for rank, i in enumerate(order, 1):
+        candidate = {
+            "rank": rank,
+            "destination": destinations[i].to_dict(),
+            "distance_miles": round(matrix.distances[i], 2),
+            "duration_min": matrix.durations[i],
+            "fares": matrix.trip_fares(i),
+            "price_estimates": live.get(i)
+        }
+        if i in live:
+            candidate["deep_link"], candidate["web_link"] = _generate_links(pickup, destinations[i])
+        candidates.append(candidate)
+    return FastJSONResponse({"pickup": pickup.to_dict(), "ride_type": body.ride_type, "candidates": candidates})
+
+
+@router.get("/api/reachable", response_class=FastJSONResponse)
+async def get_reachable(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    budget: float = Query(..., gt=0),
+    minutes: float = Query(..., gt=0),
+    limit: Optional[int] = Query(None, ge=1, le=100)
+):
+    """
+    Known places reachable from a pickup within a budget and a time limit.
+
+    A place is reachable by a ride type if its high fare estimate is at most
+    `budget` and the pickup wait plus the trip take at most `minutes`.
+    Results are per ride type, cheapest first.
+    """
+    from utils.places import REACHABLE_MAX_RESULTS
+
+    index = get_place_index()
+    with span("reachable.query", places=len(index)) as query:
+        reach = index.reachable(
+            quantize_coordinate(lat), quantize_coordinate(lon), budget, minutes, limit or REACHABLE_MAX_RESULTS
+        )
+        query.set(candidates=reach.candidates)
+    metrics.inc("reachable.candidates", reach.candidates)
+    print(f"🗺️  Reachable for ${budget:g} in {minutes:g} min: {reach.candidates} of {len(index)} places priced", flush=True)
+
+    return FastJSONResponse({
+        "pickup": {"latitude": lat, "longitude": lon},
+        "budget": budget,
+        "minutes": minutes,
+        "places_indexed": len(index),
+        "candidates": reach.candidates,
+        "ride_types": {
+            ride_type: {
+                "radius_miles": round(reach.radius_miles[ride_type], 2),
+                "places": [
+                    {
+                        "place": match.place.to_dict(),
+                        "distance_miles": match.distance_miles,
+                        "duration_min": match.duration_min,
+                        "arrival_min": match.arrival_min,
+                        "low_estimate": match.low_estimate,
+                        "high_estimate": match.high_estimate
+                    }
+                    for match in matches
+                ]
+            }
+            for ride_type, matches in reach.results.items()
+        }
+    })
+
+
+@router.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "omi-uber"}
 
 
-@app.post("/webhook/omi")
+@router.get("/metrics")
+async def get_metrics():
+    """Counters and gauges, including the current admission level."""
+    return FastJSONResponse(metrics.snapshot())
+
+
+@router.get("/debug/traces/{trace_id}", include_in_schema=False)
+async def get_trace(trace_id: str, request: Request):
+    """Return the buffered spans of one trace (requires X-Trace-Token)."""
+    if not debug_token_matches(request.headers.get("x-trace-token")):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return FastJSONResponse({"trace_id": trace_id, "spans": exporter.spans(trace_id)})
+
+
+@router.get("/debug/memory", include_in_schema=False)
+async def get_memory(request: Request, reset: bool = Query(False), limit: int = Query(10, ge=1, le=100)):
+    """
+    Return RSS and, with MEMORY_TRACE_FRAMES set, traced memory and the top
+    growth sites since the baseline (requires X-Trace-Token). `reset=true`
+    takes a new baseline after reporting.
+    """
+    if not debug_token_matches(request.headers.get("x-trace-token")):
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Snapshots walk every traced block, so keep them off the event loop
+    report = await asyncio.to_thread(memory_tracker.report, limit)
+    if reset:
+        await asyncio.to_thread(memory_tracker.reset)
+    return FastJSONResponse(report)
+
+
+@router.post("/webhook/omi")
 async def omi_webhook(request: Request, uid: str = Query(...)):
     """
     Omi webhook endpoint for ride booking integration.
@@ -456,101 +811,135 @@ async def omi_webhook(request: Request, uid: str = Query(...)):
     """
     print(f"📞 Omi webhook received for user: {uid}", flush=True)
 
-    # Parse incoming webhook payload
-    payload: Dict[str, Any] = await request.json()
-    print(f"📦 Payload: {payload}", flush=True)
-
-    # Extract transcript from payload
-    transcript = payload.get("transcript", [])
-    transcript_text = " ".join([seg.get("text", "") for seg in transcript if seg.get("is_user", False)])
-    print(f"💬 User said: {transcript_text}", flush=True)
-
-    # Use dummy locations (both hardcoded)
-    start, destination = LocationInput.get_trip_locations()
-
-    # Get ride estimates
-    price_estimates = uber_client.get_price_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude,
-        end_latitude=destination.latitude,
-        end_longitude=destination.longitude
-    )
-
-    time_estimates = uber_client.get_time_estimates(
-        start_latitude=start.latitude,
-        start_longitude=start.longitude
-    )
-
-    # Generate deep link
-    deep_link = UberClient.generate_deep_link(
-        pickup_latitude=start.latitude,
-        pickup_longitude=start.longitude,
-        dropoff_latitude=destination.latitude,
-        dropoff_longitude=destination.longitude,
-        pickup_nickname=start.name,
-        dropoff_nickname=destination.name,
-        pickup_address=start.address,
-        dropoff_address=destination.address
-    )
-
-    # Generate plain text response for Omi device
-    response_text = _format_omi_response(
-        start=start,
-        destination=destination,
-        price_estimates=price_estimates,
-        time_estimates=time_estimates,
-        deep_link=deep_link
-    )
-
-    print(f"✅ Response: {response_text}", flush=True)
-
-    # Return plain text response
-    return {"message": response_text}
+    content_length = request.headers.get("content-length")
+    declared_size = int(content_length) if content_length and content_length.isdigit() else None
+    if declared_size is not None and declared_size > OMI_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Payload larger than {OMI_MAX_BODY_BYTES} bytes")
+
+    # Parse the payload as it arrives, keeping only the id and user transcript, and hash it on the way
+    digest = webhook_replies.digest(uid)
+    with span("webhook.parse") as parse_span:
+        payload = await read_omi_payload(request.stream(), digest, declared_size)
+        parse_span.set(bytes=payload.size, segments=payload.segments)
+    print(f"📦 Payload: memory {payload.id}, {payload.segments} segments, {payload.size} bytes", flush=True)
+
+    # Retried deliveries get the reply that was already sent for the same body
+    idempotency_key = webhook_replies.key_for(digest)
+    earlier_reply = webhook_replies.get(idempotency_key)
+    if earlier_reply is not None:
+        print("🔁 Duplicate webhook delivery - returning the earlier response", flush=True)
+        return Response(content=earlier_reply, media_type="application/json")
+
+    transcript_text = payload.transcript_text
+    print(f"💬 User said: {transcript_text[:200]}", flush=True)
+
+    # Use dummy locations (both hardcoded), whose replies are rendered once per set of estimates
+    default_trip = get_default_trip()
+    start, destination = default_trip.start, default_trip.destination
+    get_trip_prefetcher().record(start, destination)
+
+    # Get ride estimates; the webhook goes ahead of everything else in the Uber quota
+    with outbound_priority(WEBHOOK):
+        estimates = await _trip_estimates(start, destination)
+    rendered = default_trip.render(*estimates)
+
+    # Store the quote, so the ride page linked from the reply shows exactly this
+    details_link = ""
+    if quotes_enabled():
+        with span("quote.share"):
+            details_link = get_quotes().share(
+                start, destination,
+                rendered.price_estimates, rendered.time_estimates,
+                rendered.deep_link, rendered.web_link
+            )
+
+    # Plain text response for the Omi device
+    with span("render.omi"):
+        reply = rendered.omi_reply_with(details_link)
+
+    print(f"✅ Response: {len(reply)} bytes for {start.name} → {destination.name}", flush=True)
+    webhook_replies.put(idempotency_key, reply)
+    return Response(content=reply, media_type="application/json")
+
+
+# Speculative prefetches started by real-time sessions (referenced so they aren't collected)
+_realtime_prefetches: set = set()
+
+
+async def _prefetch_trip(start: Location, destination: Location) -> None:
+    try:
+        await asyncio.to_thread(
+            get_uber_client().prefetch,
+            start.latitude, start.longitude,
+            destination.latitude, destination.longitude
+        )
+    except Exception as e:
+        print(f"❌ Real-time prefetch failed: {e}", flush=True)
 
 
-def _format_omi_response(
-    start: Location,
-    destination: Location,
-    price_estimates: Optional[list],
-    time_estimates: Optional[list],
-    deep_link: str
-) -> str:
+@router.post("/webhook/omi/realtime")
+async def omi_realtime_webhook(request: Request, uid: str = Query(...), session_id: Optional[str] = Query(None)):
     """
-    Format ride information as plain text for Omi device display.
+    Real-time transcript endpoint.
 
-    Returns:
-        Plain text string with ride options and booking link
+    Takes batches of new segments ({"session_id": ..., "segments": [...]}) while
+    a conversation is going on. Ride intent and destination are updated from
+    each batch's new words only; once a ride is asked for, estimates for the
+    trip are prefetched so the finished memory's webhook finds them cached.
     """
-    lines = []
-    lines.append(f"🚗 Uber Ride Options")
-    lines.append(f"From: {start.name} → To: {destination.name}")
-    lines.append("")
-
-    # Add pickup time
-    if time_estimates and len(time_estimates) > 0:
-        eta_seconds = time_estimates[0].get("estimate", 0)
-        eta_minutes = eta_seconds // 60
-        lines.append(f"⏱️  Pickup: ~{eta_minutes} min")
-        lines.append("")
-
-    # Add price options
-    if price_estimates:
-        lines.append("💰 Price Options:")
-        for est in price_estimates[:4]:  # Show top 4 options
-            display_name = est.get("localized_display_name", "Unknown")
-            estimate_str = est.get("estimate", "N/A")
-            duration = est.get("duration", 0)
-            distance = est.get("distance", 0)
-            duration_min = duration // 60
-            distance_miles = round(distance, 1)
-
-            lines.append(f"• {display_name}: {estimate_str} ({duration_min} min, {distance_miles} mi)")
-        lines.append("")
-
-    # Add booking link
-    lines.append(f"🔗 Book now: {deep_link}")
-
-    return "\n".join(lines)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > OMI_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Payload larger than {OMI_MAX_BODY_BYTES} bytes")
+
+    with span("realtime.parse"):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if isinstance(body, list):
+        segments, body = body, {}
+    elif isinstance(body, dict):
+        segments = body.get("segments") or []
+    else:
+        raise HTTPException(status_code=400, detail="Expected segments")
+    if not isinstance(segments, list):
+        raise HTTPException(status_code=400, detail="Expected segments")
+    if len(segments) > OMI_MAX_SEGMENTS:
+        raise HTTPException(status_code=413, detail=f"More than {OMI_MAX_SEGMENTS} segments")
+
+    session_id = str(session_id or body.get("session_id") or "default")
+    session = realtime_sessions.get(uid, session_id)
+    with span("realtime.detect", segments=len(segments)):
+        changed = session.add_segments(segments)
+    detector = session.detector
+
+    if changed:
+        print(f"🎙️  Session {session_id}: ride intent={detector.intent}, destination={detector.destination}", flush=True)
+
+    # Prefetch once intent is detected, and again if the destination turns out to be another place
+    start, destination = detector.resolve_trip() if detector.intent else (None, None)
+    if destination is not None and destination != session.prefetched:
+        session.prefetched = destination
+        get_trip_prefetcher().record(start, destination)
+        # Warm the estimate cache ahead of the webhook, without holding up this reply.
+        # Speculative, so it queues behind webhook and page requests for quota
+        with outbound_priority(BATCH):
+            task = asyncio.create_task(_prefetch_trip(start, destination))
+        _realtime_prefetches.add(task)
+        task.add_done_callback(_realtime_prefetches.discard)
+        metrics.inc("realtime.prefetches")
+        print(f"🔥 Ride intent detected - prefetching estimates to {destination.name}", flush=True)
+
+    return FastJSONResponse({
+        "session_id": session_id,
+        "segments": session.segments,
+        "ride_intent": detector.intent,
+        "destination": detector.destination,
+        "prefetching": session.prefetched is not None
+    })
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
@@ -563,9 +952,10 @@ if __name__ == "__main__":
     print(f"🚀 Starting on {host}:{port}", flush=True)
     print("=" * 50, flush=True)
 
+    # Development server; production runs serve.py. Auto-reload is opt-in.
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=True
+        reload=os.getenv("APP_RELOAD", "false").lower() == "true"
     )
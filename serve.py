@@ -0,0 +1,175 @@
+"""
+Production entry point.
+
+Runs the app on several worker processes, sized from the CPU cores available,
+with the fastest event loop and HTTP parser installed (uvloop / httptools).
+With gunicorn installed, the app is imported once in the master and forked
+into uvicorn workers (preload); otherwise uvicorn's own process manager is used.
+
+    python serve.py
+
+Settings (environment):
+    WEB_CONCURRENCY           worker processes (default: available cores, capped by a
+                              container's CPU quota)
+    PORT / APP_PORT, APP_HOST where to listen
+    KEEP_ALIVE_TIMEOUT        seconds an idle keep-alive connection is held (default 5)
+    BACKLOG                   pending-connection queue size (default 2048)
+    GRACEFUL_TIMEOUT          seconds in-flight requests get on shutdown (default 30)
+"""
+import math
+import os
+import sys
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+APP = "main:app"
+
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: str = CGROUP_ROOT) -> Optional[int]:
+    """
+    CPUs allowed by the container's CFS quota, rounded up, or None without one.
+
+    Reads cgroup v2 (cpu.max: "<quota> <period>" or "max <period>"), then
+    cgroup v1 (cpu.cfs_quota_us, -1 for none, and cpu.cfs_period_us).
+    """
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us")) or "-1"
+        period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us")) or ""
+    try:
+        quota_us, period_us = int(quota), int(period)
+    except ValueError:  # "max" or missing files
+        return None
+    if quota_us <= 0 or period_us <= 0:
+        return None
+    return max(1, math.ceil(quota_us / period_us))
+
+
+def available_cores() -> int:
+    """Cores this process may use: its CPU affinity, capped by the cgroup CPU quota of a container."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        cores = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return min(cores, limit) if limit is not None else cores
+
+
+def worker_count() -> int:
+    return max(1, int(os.getenv("WEB_CONCURRENCY", 0)) or available_cores())
+
+
+def fastest_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "asyncio"
+
+
+def fastest_http() -> str:
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
+
+def settings() -> dict:
+    return {
+        "host": os.getenv("APP_HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT") or os.getenv("APP_PORT", 8000)),
+        "workers": worker_count(),
+        "loop": fastest_loop(),
+        "http": fastest_http(),
+        "keep_alive": int(os.getenv("KEEP_ALIVE_TIMEOUT", 5)),
+        "backlog": int(os.getenv("BACKLOG", 2048)),
+        "graceful_timeout": int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+    }
+
+
+def run_gunicorn(config: dict) -> None:
+    """Preload the app in the gunicorn master and fork uvicorn workers from it."""
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{config['host']}:{config['port']}")
+            self.cfg.set("workers", config["workers"])
+            # UvicornWorker picks uvloop and httptools itself when they are installed
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("keepalive", config["keep_alive"])
+            self.cfg.set("backlog", config["backlog"])
+            self.cfg.set("graceful_timeout", config["graceful_timeout"])
+            self.cfg.set("timeout", max(30, config["graceful_timeout"]))
+            self.cfg.set("preload_app", True)
+            self.cfg.set("accesslog", None)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def run_uvicorn(config: dict) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=config["host"],
+        port=config["port"],
+        workers=config["workers"],
+        loop=config["loop"],
+        http=config["http"],
+        timeout_keep_alive=config["keep_alive"],
+        backlog=config["backlog"],
+        timeout_graceful_shutdown=config["graceful_timeout"],
+        access_log=False,
+    )
+
+
+def main() -> None:
+    config = settings()
+    # Per-process limits (e.g. the Uber quota) divide their budget by this
+    os.environ["WEB_CONCURRENCY"] = str(config["workers"])
+
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = sys.platform != "win32"
+    except ImportError:
+        use_gunicorn = False
+
+    print("🚗 OMI Uber Integration", flush=True)
+    print("=" * 50, flush=True)
+    print(
+        f"🚀 Serving on {config['host']}:{config['port']} with {config['workers']} worker(s) "
+        f"[{config['loop']} + {config['http']}, {'gunicorn preload' if use_gunicorn else 'uvicorn'}]",
+        flush=True
+    )
+    print("=" * 50, flush=True)
+
+    if use_gunicorn:
+        run_gunicorn(config)
+    else:
+        run_uvicorn(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+// Live estimate updates for the ride page.
+// The server pushes {"<data-live key>": "<text>"} with only the values that changed.
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+
+    var source = new EventSource('/ride/live' + window.location.search);
+
+    source.onmessage = function (event) {
+        var changes = JSON.parse(event.data);
+        var elements = document.querySelectorAll('[data-live]');
+
+        for (var i = 0; i < elements.length; i++) {
+            var key = elements[i].getAttribute('data-live');
+            if (Object.prototype.hasOwnProperty.call(changes, key)) {
+                elements[i].textContent = changes[key];
+            }
+        }
+    };
+})();
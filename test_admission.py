@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.admission import (
+    DEGRADED, NORMAL, SHEDDING, AdmissionController, AdmissionMiddleware, admission, calculator_only
+)
+from utils.cache_backends import MemoryBackend
+from utils.estimate_cache import EstimateCache
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.uber_client import UberClient
+
+
+def _controller() -> AdmissionController:
+    return AdmissionController(
+        degrade_lag_ms=100, shed_lag_ms=500, degrade_in_flight=4, shed_in_flight=8, recovery_seconds=5
+    )
+
+
+def test_levels_escalate_at_once_and_step_down_after_recovery():
+    controller = _controller()
+    assert controller.update(now=0) == NORMAL
+
+    controller.lag_ms = 150
+    assert controller.update(now=1) == DEGRADED
+    assert controller.calculator_only
+
+    controller.in_flight = 8
+    assert controller.update(now=2) == SHEDDING
+
+    # Calm again: one level down per recovery period, never straight to normal
+    controller.lag_ms, controller.in_flight = 0, 0
+    assert controller.update(now=3) == SHEDDING
+    assert controller.update(now=7.9) == SHEDDING
+    assert controller.update(now=8) == DEGRADED
+    assert controller.update(now=12) == DEGRADED
+    assert controller.update(now=13) == NORMAL
+    assert not controller.calculator_only
+
+    assert [(t["from"], t["to"]) for t in controller.transitions] == [
+        ("normal", "degraded"), ("degraded", "shedding"), ("shedding", "degraded"), ("degraded", "normal")
+    ]
+
+
+def test_a_new_spike_restarts_the_recovery_period():
+    controller = _controller()
+    controller.lag_ms = 200
+    controller.update(now=0)
+
+    controller.lag_ms = 0
+    controller.update(now=1)
+    controller.lag_ms = 200
+    controller.update(now=4)
+    controller.lag_ms = 0
+    controller.update(now=5)
+    assert controller.update(now=9) == DEGRADED
+    assert controller.update(now=10) == NORMAL
+
+
+def _call(middleware: AdmissionMiddleware, path: str) -> dict:
+    response: dict = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    scope = {"type": "http", "path": path, "method": "GET", "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    return response
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_shedding_rejects_low_priority_routes_only():
+    controller = _controller()
+    controller.lag_ms = 600
+    middleware = AdmissionMiddleware(_ok_app, controller)
+
+    rejected = _call(middleware, "/api/ride-info")
+    assert rejected["status"] == 503
+    assert rejected["headers"][b"retry-after"] == b"5"
+
+    webhook = _call(middleware, "/webhook/omi")
+    assert webhook["status"] == 200
+    assert webhook["headers"][b"x-degraded"] == b"calculator-only"
+    assert _call(middleware, "/health")["status"] == 200
+    assert controller.in_flight == 0
+
+
+@pytest.fixture
+def uber(monkeypatch):
+    """An Uber client with a token whose API always quotes $99, counting the calls."""
+    client = UberClient(cache=EstimateCache(backend=MemoryBackend()))
+    client.server_token = "token"
+    calls = []
+
+    def fetch_prices(start_latitude, start_longitude, end_latitude, end_longitude):
+        calls.append("price")
+        return [PriceEstimate.from_dict({
+            "localized_display_name": "UberX", "estimate": "$99", "duration": 600, "distance": 2.0
+        })], ""
+
+    def fetch_times(start_latitude, start_longitude):
+        calls.append("time")
+        return [TimeEstimate.from_dict({"localized_display_name": "UberX", "estimate": 240})], ""
+
+    monkeypatch.setattr(client, "_fetch_price_estimates", fetch_prices)
+    monkeypatch.setattr(client, "_fetch_time_estimates", fetch_times)
+    monkeypatch.setattr(main, "get_uber_client", lambda: client)
+    return client, calls
+
+
+@pytest.fixture
+def degraded(monkeypatch):
+    monkeypatch.setattr(admission, "lag_ms", admission.degrade_lag_ms)
+    monkeypatch.setattr(admission, "level", NORMAL)
+    monkeypatch.setattr(admission, "transitions", [])
+    assert admission.update() == DEGRADED
+
+
+TRIP = {"start_lat": 37.79, "start_lon": -122.40, "dest_lat": 37.75, "dest_lon": -122.42}
+
+
+def test_degraded_responses_carry_the_header_and_calculator_estimates(uber, degraded):
+    client, calls = uber
+    response = TestClient(main.create_app()).get("/api/ride-info", params=TRIP)
+    assert response.status_code == 200
+    assert response.headers["x-degraded"] == "calculator-only"
+    assert calls == []
+    prices = response.json()["price_estimates"]
+    assert prices and all(price["estimate"] != "$99" for price in prices)
+
+
+def test_other_callers_keep_using_uber_while_degraded(uber, degraded):
+    client, calls = uber
+    # Outside a degradable request, e.g. the prefetcher or the realtime webhook
+    assert not calculator_only()
+    prices = client.get_price_estimates(37.79, -122.40, 37.75, -122.42)
+    assert [price.estimate for price in prices] == ["$99"]
+    assert calls == ["price"]
+
+    response = TestClient(main.create_app()).get("/health")
+    assert "x-degraded" not in response.headers
+
+
+def test_normal_responses_come_from_uber_without_the_header(uber):
+    client, calls = uber
+    response = TestClient(main.create_app()).get("/api/ride-info", params=TRIP)
+    assert "x-degraded" not in response.headers
+    assert [price["estimate"] for price in response.json()["price_estimates"]] == ["$99"]
+    assert sorted(calls) == ["price", "time"]
@@ -0,0 +1,72 @@
+import socket
+
+import pytest
+
+from utils.cache_backends import MemoryBackend, RedisBackend, RESPConnection, RESPError
+from utils.estimate_cache import KEY_PREFIX, EstimateCache
+from utils.responses import dumps
+
+
+def _connection(client: socket.socket) -> RESPConnection:
+    """A RESPConnection over one end of a socket pair; the test plays the server on the other."""
+    connection = RESPConnection.__new__(RESPConnection)
+    connection.sock = client
+    connection.reader = client.makefile("rb")
+    return connection
+
+
+@pytest.fixture
+def sockets():
+    client, server = socket.socketpair()
+    client.settimeout(1)
+    yield client, server
+    client.close()
+    server.close()
+
+
+def test_error_reply_drains_the_rest_of_the_pipeline(sockets):
+    client, server = sockets
+    connection = _connection(client)
+
+    server.sendall(b"+OK\r\n-ERR wrong type\r\n$3\r\nabc\r\n")
+    with pytest.raises(RESPError, match="wrong type"):
+        connection.pipeline([("SET", "a", "1"), ("INCR", "b"), ("GET", "c")])
+
+    # The next command reads its own reply, not the one left over from the failed batch
+    server.sendall(b"+PONG\r\n")
+    assert connection.pipeline([("PING",)]) == [b"PONG"]
+
+
+def test_error_inside_an_array_reply_drains_the_array(sockets):
+    client, server = sockets
+    connection = _connection(client)
+
+    server.sendall(b"*2\r\n-ERR one\r\n$1\r\nx\r\n")
+    assert isinstance(connection.pipeline([("EXEC",)])[0][0], RESPError)
+    server.sendall(b":7\r\n")
+    assert connection.pipeline([("INCR", "n")]) == [7]
+
+
+def test_unreadable_reply_drops_the_connection(sockets):
+    client, server = sockets
+    backend = RedisBackend("redis://localhost:1/0")
+    backend._local.connection = _connection(client)
+
+    server.sendall(b"?garbage\r\n")
+    # An error counts as a miss, and the desynced connection is not reused
+    assert backend.get_many(["a"]) == {}
+    assert backend._local.connection is None
+
+
+def test_corrupt_cache_value_is_a_miss():
+    backend = MemoryBackend()
+    cache = EstimateCache(backend)
+    cache.put("good", [{"product_id": "a"}])
+    backend.set_many({
+        KEY_PREFIX + "garbage": b"not json",
+        KEY_PREFIX + "foreign": dumps({"written": "elsewhere"}),
+    }, ttl=60)
+
+    entries = cache.get_many(["good", "garbage", "foreign"])
+    assert list(entries) == ["good"]
+    assert entries["good"].value == [{"product_id": "a"}]
@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.display import TripView, UberDisplay
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.http_cache import trip_etag
+from utils.responses import dumps
+from utils.uber_client import UberClient
+
+
+class ChangingPrices(UberClient):
+    """Uber client whose UberX price the test sets, as if Uber repriced the trip."""
+
+    price = "$10-12"
+
+    def get_price_estimates(self, start_latitude, start_longitude, end_latitude, end_longitude):
+        return [PriceEstimate.from_dict({
+            "localized_display_name": "UberX", "estimate": self.price, "duration": 600, "distance": 2.0
+        })]
+
+    def get_time_estimates(self, start_latitude, start_longitude):
+        return [TimeEstimate.from_dict({"localized_display_name": "UberX", "estimate": 240})]
+
+    def prefetch(self, start_latitude, start_longitude, end_latitude, end_longitude):
+        return True
+
+
+@pytest.fixture
+def uber(monkeypatch):
+    client = ChangingPrices()
+    monkeypatch.setattr(main, "get_uber_client", lambda: client)
+    main.get_default_trip.cache_clear()
+    main.get_trip_prefetcher.cache_clear()
+    yield client
+    main.get_default_trip.cache_clear()
+    main.get_trip_prefetcher.cache_clear()
+
+
+def _fresh_view(client: UberClient) -> TripView:
+    """The default trip's view built from scratch, the way a custom trip is."""
+    start, destination = main.get_default_trip().start, main.get_default_trip().destination
+    prices, times = client.get_price_estimates(0, 0, 0, 0), client.get_time_estimates(0, 0)
+    deep_link = client.generate_deep_link(
+        pickup_latitude=start.latitude,
+        pickup_longitude=start.longitude,
+        dropoff_latitude=destination.latitude,
+        dropoff_longitude=destination.longitude,
+        pickup_nickname=start.name,
+        dropoff_nickname=destination.name,
+        pickup_address=start.address,
+        dropoff_address=destination.address
+    )
+    web_link = client.generate_mobile_web_link(
+        pickup_latitude=start.latitude,
+        pickup_longitude=start.longitude,
+        dropoff_latitude=destination.latitude,
+        dropoff_longitude=destination.longitude
+    )
+    return TripView.build(start, destination, prices, times, deep_link, web_link)
+
+
+def _refresh_from_prefetcher():
+    # What each prefetch pass does once the hot trips are warm
+    for callback in main.get_trip_prefetcher().listeners:
+        callback()
+
+
+def test_prerender_follows_the_prefetcher_to_new_prices(uber):
+    _refresh_from_prefetcher()
+    old = main.get_default_trip()._render
+    assert b"$10-12" in old.ride_html
+
+    uber.price = "$14-16"
+    _refresh_from_prefetcher()
+    rendered = main.get_default_trip()._render
+    view = _fresh_view(uber)
+    default_trip = main.get_default_trip()
+    start, destination = default_trip.start, default_trip.destination
+    prices, times = uber.get_price_estimates(0, 0, 0, 0), uber.get_time_estimates(0, 0)
+
+    assert rendered is not old
+    assert rendered.view == view
+    assert rendered.ride_html == UberDisplay.render_html(view).encode("utf-8")
+    assert rendered.ride_etag == trip_etag("ride.html", start, destination, prices, times)
+    assert rendered.ride_etag != old.ride_etag
+    assert rendered.ride_info_json == dumps({
+        "start_location": start.to_dict(),
+        "destination": destination.to_dict(),
+        "price_estimates": prices,
+        "time_estimates": times,
+        "deep_link": view.deep_link,
+        "web_link": view.web_link
+    })
+    assert rendered.ride_info_etag == trip_etag("ride-info.json", start, destination, prices, times)
+    assert rendered.omi_reply == dumps({"message": UberDisplay.render_omi(view)})
+    assert b"$10-12" not in rendered.ride_html + rendered.ride_info_json + rendered.omi_reply
+
+
+def test_omi_reply_with_a_link_matches_a_fresh_reply(uber):
+    _refresh_from_prefetcher()
+    rendered = main.get_default_trip()._render
+    view = _fresh_view(uber)
+    link = "https://example.com/ride?quote=abc.def"
+
+    assert rendered.omi_reply_with("") == rendered.omi_reply
+    assert rendered.omi_reply_with(link) == dumps({"message": UberDisplay.render_omi(view, link)})
+    assert link.encode() in rendered.omi_reply_with(link)
+
+
+def test_endpoints_serve_the_current_prices(uber, monkeypatch):
+    monkeypatch.setattr(main, "quotes_enabled", lambda: False)
+    client = TestClient(main.create_app())
+    _refresh_from_prefetcher()
+    uber.price = "$14-16"
+    _refresh_from_prefetcher()
+    view = _fresh_view(uber)
+
+    page = client.get("/ride", params={"stream": "false"})
+    assert page.content == UberDisplay.render_html(view).encode("utf-8")
+    assert client.get("/api/ride-info").json()["price_estimates"][0]["estimate"] == "$14-16"
+    reply = client.post("/webhook/omi", params={"uid": "default-trip"}, json={"id": "fresh-prices", "transcript": []})
+    assert reply.content == dumps({"message": UberDisplay.render_omi(view)})
@@ -0,0 +1,41 @@
+from utils.display import PickupView, PriceView, TripView, UberDisplay
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.location_input import LocationInput
+from utils.responses import dumps
+
+# Uber returns nulls for products without a fixed route or price, e.g. taxi
+TAXI = {
+    "localized_display_name": "Taxi",
+    "display_name": "Taxi",
+    "product_id": "taxi-1",
+    "estimate": "Metered",
+    "low_estimate": None,
+    "high_estimate": None,
+    "duration": None,
+    "distance": None,
+    "currency_code": None
+}
+
+
+def test_null_fields_get_defaults():
+    estimate = PriceEstimate.from_dict(TAXI)
+    assert estimate.duration_min == 0
+    assert estimate.distance_miles == 0
+    assert estimate.estimate == "Metered"
+    assert PriceView.from_estimate(estimate) == ("Taxi", "Metered", 0, 0)
+
+
+def test_null_product_renders_in_every_format():
+    start, destination = LocationInput.default_trip()
+    prices = [PriceEstimate.from_dict(TAXI), PriceEstimate.from_dict(dict(TAXI, estimate=None))]
+    times = [TimeEstimate.from_dict({"localized_display_name": None, "estimate": None})]
+    view = TripView.build(start, destination, prices, times, "uber://", "https://m.uber.com")
+
+    assert "Taxi" in UberDisplay.render_html(view)
+    assert "N/A" in UberDisplay.render_terminal(view)
+    assert "Pickup: ~0 min" in UberDisplay.render_omi(view)
+    assert PickupView.from_estimates(times)[0].eta_minutes == 0
+
+
+def test_json_keeps_what_uber_sent():
+    assert b'"duration":null' in dumps(PriceEstimate.from_dict(TAXI))
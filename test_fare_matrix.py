@@ -0,0 +1,146 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils import fare_matrix
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location
+
+
+def _trips(count: int, seed: int):
+    rng = random.Random(seed)
+    # Bay Area trips, from a few hundred feet (minimum fares) to ~30 miles
+    return [
+        [37.6 + rng.random() * 0.4 for _ in range(count)],
+        [-122.6 + rng.random() * 0.4 for _ in range(count)],
+        [37.6 + rng.random() * 0.4 for _ in range(count)],
+        [-122.6 + rng.random() * 0.4 for _ in range(count)],
+    ]
+
+
+@pytest.fixture(params=["numpy", "loop"])
+def vectorized(request, monkeypatch):
+    """fare_matrix with numpy forced on (for any batch size) or forced off."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(fare_matrix, "VECTORIZE_MIN_TRIPS", 0)
+    else:
+        monkeypatch.setattr(fare_matrix, "_numpy", False)
+    return request.param
+
+
+def test_matrix_matches_the_calculator(vectorized):
+    trips = _trips(500, seed=7)
+    matrix = fare_matrix.fare_matrix(*trips)
+
+    for i, trip in enumerate(zip(*trips)):
+        distance = FareCalculator.haversine_distance(*trip)
+        assert matrix.distances[i] == pytest.approx(distance, abs=1e-9)
+        assert matrix.durations[i] == FareCalculator.estimate_duration(distance)
+        for estimate in FareCalculator.get_price_estimates(*trip):
+            fare = matrix.trip_fares(i)[estimate.display_name]
+            assert (fare["low_estimate"], fare["high_estimate"], fare["estimate"]) == (
+                estimate.low_estimate, estimate.high_estimate, estimate.estimate
+            )
+
+
+def test_numpy_and_loop_agree():
+    numpy = pytest.importorskip("numpy")
+    trips = _trips(2000, seed=11)
+    vectorized, looped = fare_matrix._vectorized(numpy, *trips), fare_matrix._looped(*trips)
+    # Distances may differ in the last bit; durations and rounded fares may not
+    assert vectorized.distances == pytest.approx(looped.distances, abs=1e-9)
+    assert vectorized.durations == looped.durations
+    assert vectorized.fares == looped.fares
+
+
+def test_route_total_is_one_trip_over_all_legs(vectorized):
+    lats, lons, _, _ = _trips(20, seed=3)
+    stops = [Location(f"Stop {i}", "", lat, lon) for i, (lat, lon) in enumerate(zip(lats, lons))]
+    legs = fare_matrix.route_legs(stops)
+
+    assert len(legs.distances) == len(stops) - 1
+    for i in range(len(stops) - 1):
+        assert legs.distances[i] == pytest.approx(FareCalculator.haversine_distance(
+            stops[i].latitude, stops[i].longitude, stops[i + 1].latitude, stops[i + 1].longitude
+        ), abs=1e-9)
+    totals = fare_matrix.route_fares(legs)
+    for ride_type in FareCalculator.RATE_CARDS:
+        expected = FareCalculator.calculate_fare(sum(legs.distances), sum(legs.durations), ride_type)
+        assert totals[ride_type]["low_estimate"] == expected
+
+
+def test_rank_orders_by_fare_then_distance(vectorized):
+    _, _, lats, lons = _trips(40, seed=5)
+    pickup = Location("Pickup", "", 37.79, -122.40)
+    destinations = [Location(f"D{i}", "", lat, lon) for i, (lat, lon) in enumerate(zip(lats, lons))]
+    matrix, order = fare_matrix.rank_destinations(pickup, destinations, "Uber Black")
+
+    keys = [(matrix.fares["Uber Black"][i], matrix.distances[i]) for i in order]
+    assert keys == sorted(keys)
+    assert sorted(order) == list(range(len(destinations)))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Live estimates come from the fare calculator
+    monkeypatch.setattr(main.get_uber_client(), "server_token", None)
+    return TestClient(main.create_app())
+
+
+PICKUP = {"latitude": 37.7989, "longitude": -122.4074, "name": "Home"}
+DESTINATIONS = [
+    {"latitude": 37.7699, "longitude": -122.4192, "name": "Mission"},
+    {"latitude": 37.7989, "longitude": -122.4080},
+    {"latitude": 37.6213, "longitude": -122.3790, "name": "SFO"},
+    {"latitude": 37.8044, "longitude": -122.2712},
+]
+
+
+def test_compare_ranks_destinations(client):
+    response = client.post("/api/compare", json={"pickup": PICKUP, "destinations": DESTINATIONS})
+    assert response.status_code == 200
+    candidates = response.json()["candidates"]
+
+    assert [candidate["rank"] for candidate in candidates] == [1, 2, 3, 4]
+    fares = [candidate["fares"]["UberX"]["low_estimate"] for candidate in candidates]
+    assert fares == sorted(fares)
+    # Only the best COMPARE_UPSTREAM_TOP_N get live estimates and booking links
+    top_n = fare_matrix.COMPARE_UPSTREAM_TOP_N
+    assert all(candidate["price_estimates"] for candidate in candidates[:top_n])
+    assert all("deep_link" in candidate for candidate in candidates[:top_n])
+    assert all(candidate["price_estimates"] is None for candidate in candidates[top_n:])
+    # Each candidate's fares are the calculator's for its trip
+    for candidate in candidates:
+        destination = candidate["destination"]
+        uber_x = FareCalculator.get_price_estimates(
+            PICKUP["latitude"], PICKUP["longitude"], destination["latitude"], destination["longitude"]
+        )[0]
+        assert candidate["fares"]["UberX"]["low_estimate"] == uber_x.low_estimate
+
+
+def test_compare_prices_an_ordered_route(client):
+    response = client.post("/api/compare", json={"pickup": PICKUP, "destinations": DESTINATIONS, "ordered": True})
+    assert response.status_code == 200
+    body = response.json()
+
+    legs = body["legs"]
+    assert [leg["to"]["name"] for leg in legs] == ["Mission", "Stop 2", "SFO", "Stop 4"]
+    assert [leg["from"]["name"] for leg in legs[1:]] == [leg["to"]["name"] for leg in legs[:-1]]
+    assert body["total"]["duration_min"] == sum(leg["duration_min"] for leg in legs)
+    assert body["total"]["distance_miles"] == pytest.approx(sum(leg["distance_miles"] for leg in legs), abs=0.02)
+    # Charged as one trip: one base fare and booking fee, not one per leg
+    assert body["total"]["fares"]["UberX"]["low_estimate"] < sum(
+        leg["fares"]["UberX"]["low_estimate"] for leg in legs
+    )
+
+
+def test_compare_rejects_bad_requests(client, monkeypatch):
+    body = {"pickup": PICKUP, "destinations": DESTINATIONS}
+    assert client.post("/api/compare", json={**body, "ride_type": "Nope"}).status_code == 400
+    assert client.post("/api/compare", json={**body, "destinations": []}).status_code == 422
+    assert client.post("/api/compare", json={**body, "pickup": {"latitude": 91, "longitude": 0}}).status_code == 422
+    monkeypatch.setattr(fare_matrix, "COMPARE_MAX_DESTINATIONS", 3)
+    assert client.post("/api/compare", json=body).status_code == 413
@@ -0,0 +1,151 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from utils import http_cache
+from utils.http_cache import EncodedBodyCache, cached_response, etag_matches, negotiate_encoding
+
+ETAG = '"0123456789abcdef"'
+BODY = b"<html>" + b"estimates " * 200 + b"</html>"
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/ride",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    # gzip is always available; brotli is tested on its own where installed
+    monkeypatch.setattr(http_cache, "brotli", None)
+    monkeypatch.setattr(http_cache, "encoded_body_cache", EncodedBodyCache())
+
+
+class Renderer:
+    def __init__(self, body: bytes = BODY):
+        self.body = body
+        self.calls = 0
+
+    def __call__(self) -> bytes:
+        self.calls += 1
+        return self.body
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0, *", None),
+    ("*", "gzip"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("deflate;q=1, gzip;q=0.1", "gzip"),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate_encoding_without_brotli(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_prefers_brotli(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", pytest.importorskip("brotli"))
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert negotiate_encoding("*") == "br"
+
+
+def test_compressed_response_has_variant_etag_and_vary():
+    response = cached_response(_request(accept_encoding="gzip"), Renderer(), "text/html", ETAG)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"0123456789abcdef-gz"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == "no-cache"
+    assert gzip.decompress(response.body) == BODY
+
+
+def test_identity_response_has_plain_etag():
+    response = cached_response(_request(accept_encoding="gzip;q=0"), Renderer(), "text/html", ETAG)
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.body == BODY
+
+
+def test_small_bodies_are_not_compressed(monkeypatch):
+    small = b"<p>ok</p>"
+    assert len(small) < http_cache.COMPRESSION_MIN_SIZE
+    response = cached_response(_request(accept_encoding="gzip"), Renderer(small), "text/html", ETAG)
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
+    assert response.body == small
+
+
+@pytest.mark.parametrize("if_none_match", [
+    ETAG,
+    '"0123456789abcdef-gz"',
+    '"0123456789abcdef-br"',
+    'W/"0123456789abcdef-gz"',
+    '"other", "0123456789abcdef-gz"',
+    "*",
+])
+def test_if_none_match_ignores_coding_suffixes(if_none_match):
+    assert etag_matches(_request(if_none_match=if_none_match), ETAG)
+
+
+@pytest.mark.parametrize("if_none_match", ['"other"', '"0123456789abcdef-xz"', '"0123456789abcdef0"', ""])
+def test_if_none_match_rejects_other_tags(if_none_match):
+    assert not etag_matches(_request(if_none_match=if_none_match), ETAG)
+
+
+def test_revalidation_is_304_without_rendering():
+    render = Renderer()
+    first = cached_response(_request(accept_encoding="gzip"), render, "text/html", ETAG)
+    response = cached_response(
+        _request(accept_encoding="gzip", if_none_match=first.headers["etag"]), render, "text/html", ETAG
+    )
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert render.calls == 1
+
+
+def test_304_after_eviction_echoes_the_variant_the_client_holds():
+    render = Renderer()
+    response = cached_response(
+        _request(accept_encoding="gzip", if_none_match='"0123456789abcdef-gz"'), render, "text/html", ETAG
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"0123456789abcdef-gz"'
+    assert render.calls == 0
+
+
+def test_stale_etag_gets_a_fresh_body():
+    render = Renderer()
+    response = cached_response(_request(accept_encoding="gzip", if_none_match='"old-gz"'), render, "text/html", ETAG)
+    assert response.status_code == 200
+    assert gzip.decompress(response.body) == BODY
+
+
+def test_encoded_bodies_are_cached_per_coding():
+    render = Renderer()
+    for _ in range(3):
+        cached_response(_request(accept_encoding="gzip"), render, "text/html", ETAG)
+        cached_response(_request(), render, "text/html", ETAG)
+    assert render.calls == 2
+
+
+def test_responses_without_etag_are_not_cached():
+    render = Renderer()
+    for _ in range(2):
+        response = cached_response(_request(accept_encoding="gzip", if_none_match="*"), render, "application/json")
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+        assert "cache-control" not in response.headers
+    assert render.calls == 2
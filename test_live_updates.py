@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.live_updates import KEEP_ALIVE_EVENT, LiveUpdateHub, Subscriber, sse_event
+from utils.location_input import Location, LocationInput
+
+HOME, MISSION = LocationInput.default_trip()
+PARK = Location("Park", "Unknown", 37.75, -122.42)
+
+
+class FakeClient:
+    """Uber client whose UberX price the test sets; counts the polls."""
+
+    def __init__(self):
+        self.price = "$10-12"
+        self.polls = 0
+
+    def get_price_estimates(self, start_latitude, start_longitude, end_latitude, end_longitude):
+        self.polls += 1
+        return [PriceEstimate.from_dict({
+            "localized_display_name": "UberX", "estimate": self.price, "duration": 600, "distance": 2.0
+        })]
+
+    def get_time_estimates(self, start_latitude, start_longitude):
+        return [TimeEstimate.from_dict({"localized_display_name": "UberX", "estimate": 240})]
+
+
+def test_sse_framing():
+    assert sse_event({"price:UberX": "$10-12"}) == b'data: {"price:UberX":"$10-12"}\n\n'
+    assert sse_event({}) == KEEP_ALIVE_EVENT == b": keep-alive\n\n"
+    # One event per message: the JSON body never contains a raw newline
+    event = sse_event({"details:UberX": "line\nbreak"})
+    assert event.count(b"\n") == 2
+    assert json.loads(event[len(b"data: "):]) == {"details:UberX": "line\nbreak"}
+
+
+def test_subscriber_coalesces_changes_until_read():
+    async def run():
+        subscriber = Subscriber()
+        subscriber.push({"price:UberX": "$10-12", "eta:UberX": "4 min"})
+        subscriber.push({"price:UberX": "$11-13"})
+        first = await subscriber.next_changes(timeout=1)
+        second = await subscriber.next_changes(timeout=0.01)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == {"price:UberX": "$11-13", "eta:UberX": "4 min"}
+    assert second == {}
+
+
+def test_pages_on_one_trip_share_a_refresher_and_get_only_changes():
+    async def run():
+        client = FakeClient()
+        hub = LiveUpdateHub(client, interval=0.02)
+        first = hub.updates(HOME, MISSION, heartbeat=1)
+        initial = await first.__anext__()
+        # A page opened later starts from the shared snapshot
+        second = hub.updates(HOME, MISSION, heartbeat=1)
+        snapshot = await second.__anext__()
+        refreshers = len(hub.refreshers)
+
+        client.price = "$14-16"
+        change = await first.__anext__()
+        same_change = await second.__anext__()
+        await first.aclose()
+        await second.aclose()
+        return initial, snapshot, refreshers, change, same_change
+
+    initial, snapshot, refreshers, change, same_change = asyncio.run(run())
+    assert initial == {"price:UberX": "$10-12", "details:UberX": "10 min • 2.0 mi", "eta:UberX": "4 min"}
+    assert snapshot == initial
+    assert refreshers == 1
+    assert change == same_change == {"price:UberX": "$14-16"}
+
+
+def test_unchanged_polls_send_heartbeats_only():
+    async def run():
+        hub = LiveUpdateHub(FakeClient(), interval=0.01)
+        updates = hub.updates(HOME, MISSION, heartbeat=0.05)
+        await updates.__anext__()
+        heartbeat = await updates.__anext__()
+        await updates.aclose()
+        return heartbeat
+
+    assert asyncio.run(run()) == {}
+
+
+def test_refresher_stops_when_the_last_page_leaves():
+    async def run():
+        client = FakeClient()
+        hub = LiveUpdateHub(client, interval=0.01)
+        first = hub.updates(HOME, MISSION, heartbeat=1)
+        second = hub.updates(HOME, MISSION, heartbeat=1)
+        await first.__anext__()
+        await second.__anext__()
+        task = hub.refreshers[next(iter(hub.refreshers))].task
+
+        await first.aclose()
+        still_running = bool(hub.refreshers) and not task.done()
+        await second.aclose()
+        await asyncio.sleep(0.05)
+        polls = client.polls
+        await asyncio.sleep(0.05)
+        return still_running, hub.refreshers, task.cancelled(), polls, client.polls
+
+    still_running, refreshers, cancelled, polls, later_polls = asyncio.run(run())
+    assert still_running
+    assert refreshers == {}
+    assert cancelled
+    assert later_polls == polls
+
+
+def test_max_trips_limits_new_trips_only():
+    async def run():
+        hub = LiveUpdateHub(FakeClient(), interval=0.01, max_trips=1)
+        updates = hub.updates(HOME, MISSION, heartbeat=1)
+        await updates.__anext__()
+        limits = hub.can_subscribe(HOME, MISSION), hub.can_subscribe(HOME, PARK)
+        await updates.aclose()
+        return limits, hub.can_subscribe(HOME, PARK)
+
+    (same_trip, other_trip), after = asyncio.run(run())
+    assert same_trip and not other_trip
+    assert after
+
+
+def test_live_endpoint_rejects_new_trips_when_full_and_does_not_count_them(monkeypatch):
+    recorded = []
+
+    class Prefetcher:
+        def record(self, start, destination):
+            recorded.append((start, destination))
+
+    class FullHub:
+        def can_subscribe(self, start, destination):
+            return False
+
+    monkeypatch.setattr(main, "get_trip_prefetcher", lambda: Prefetcher())
+    monkeypatch.setattr(main, "get_live_updates", lambda: FullHub())
+    response = TestClient(main.create_app()).get(
+        "/ride/live", params={"start_lat": 37.79, "start_lon": -122.40, "dest_lat": 37.75, "dest_lon": -122.42}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "60"
+    # Only page loads count towards the prefetcher's popular trips, not their live streams
+    assert recorded == []
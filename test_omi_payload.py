@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from utils.omi_payload import read_omi_payload
+from utils.responses import dumps
+
+MEMORY = dumps({
+    "id": "m1",
+    "transcript": [
+        {"text": "I need a ride", "is_user": True, "speaker": "SPEAKER_0"},
+        {"text": "to the office", "is_user": False, "speaker": "SPEAKER_1"},
+        {"text": "right now", "is_user": True, "speaker": "SPEAKER_0"},
+    ]
+})
+
+
+async def _chunks(body: bytes, size: int = 16):
+    for offset in range(0, len(body), size):
+        yield body[offset:offset + size]
+
+
+def _sync_chunks(body: bytes, size: int = 16):
+    for offset in range(0, len(body), size):
+        yield body[offset:offset + size]
+
+
+def _read(body: bytes, streamed: bool, **limits):
+    # A declared size up to the threshold is buffered; no declared size is streamed
+    declared_size = None if streamed else len(body)
+    return asyncio.run(read_omi_payload(_chunks(body), declared_size=declared_size, **limits))
+
+
+@pytest.fixture(params=[True, False], ids=["streamed", "buffered"])
+def streamed(request):
+    return request.param
+
+
+def test_reads_id_and_user_transcript(streamed):
+    digest = hashlib.sha256()
+    payload = asyncio.run(read_omi_payload(
+        _chunks(MEMORY), digest, declared_size=None if streamed else len(MEMORY)
+    ))
+    assert payload.id == "m1"
+    assert payload.transcript_text == "I need a ride right now"
+    assert payload.segments == 3
+    assert payload.size == len(MEMORY)
+    assert digest.digest() == hashlib.sha256(MEMORY).digest()
+
+
+def test_oversize_body_is_413(streamed):
+    with pytest.raises(HTTPException) as error:
+        _read(MEMORY, streamed, max_bytes=len(MEMORY) - 1)
+    assert error.value.status_code == 413
+
+
+def test_too_many_segments_is_413(streamed):
+    with pytest.raises(HTTPException) as error:
+        _read(MEMORY, streamed, max_segments=2)
+    assert error.value.status_code == 413
+
+
+def test_truncated_json_is_400(streamed):
+    with pytest.raises(HTTPException) as error:
+        _read(MEMORY[:-20], streamed)
+    assert error.value.status_code == 400
+
+
+def test_missing_transcript_is_an_empty_transcript(streamed):
+    payload = _read(dumps({"id": 7, "structured": {"title": "No transcript"}}), streamed)
+    assert payload.id == "7"
+    assert payload.transcript_text == ""
+    assert payload.segments == 0
+
+
+def test_webhook_answers_400_to_a_malformed_stream():
+    client = TestClient(main.create_app())
+    # A generator body is sent chunked, without Content-Length, so it is streamed
+    response = client.post("/webhook/omi", params={"uid": "payload-test"}, content=_sync_chunks(MEMORY[:-20]))
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid JSON payload")
+
+
+@pytest.mark.parametrize("memory", [
+    {"id": "m2", "transcript": [{"text": 5, "is_user": True}, {"text": "I need a ride", "is_user": True}]},
+    {"id": "m3", "transcript": [{"text": ["a"], "is_user": True}, {"text": {"b": 1}, "is_user": True}]},
+    {"id": "m4", "transcript": [{"text": "uber", "is_user": {"yes": True}}, "text", 7, None]},
+    {"id": ["m5"], "transcript": "I need a ride"},
+    {"id": True, "transcript": {"item": "uber"}},
+], ids=["number text", "list text", "odd segments", "string transcript", "dict transcript"])
+def test_malformed_fields_read_the_same_streamed_and_buffered(memory):
+    body = dumps(memory)
+    streamed = _read(body, streamed=True)
+    buffered = _read(body, streamed=False)
+    assert streamed == buffered
+    assert all(isinstance(part, str) for part in streamed.transcript_text.split())
+
+
+def test_webhook_accepts_non_string_text_in_both_paths():
+    client = TestClient(main.create_app())
+    body = dumps({"id": "m6", "transcript": [{"text": 5, "is_user": True}]})
+
+    buffered = client.post("/webhook/omi", params={"uid": "payload-types"}, content=body)
+    streamed = client.post("/webhook/omi", params={"uid": "payload-types-stream"}, content=_sync_chunks(body))
+    assert buffered.status_code == streamed.status_code == 200
+    assert buffered.json() == streamed.json()
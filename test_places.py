@@ -0,0 +1,107 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location
+from utils.places import MIN_TRIP_MILES, PlaceIndex, build_place_index, pickup_minutes, reach_radius
+
+PICKUPS = [(37.7989, -122.4074), (37.7699, -122.4192), (37.6213, -122.3790), (37.8029, -122.4484)]
+# (budget, minutes): below every minimum fare, tight, typical and generous
+QUERIES = [(5.0, 60), (12.0, 15), (20.0, 30), (35.0, 25), (80.0, 90), (200.0, 600)]
+
+
+def _brute_force(places, latitude, longitude, budget, max_minutes):
+    """Every place that fits, per ride type, priced one by one with the calculator."""
+    waits = pickup_minutes(latitude, longitude)
+    found = {ride_type: set() for ride_type in FareCalculator.RATE_CARDS}
+    for place in places:
+        distance = FareCalculator.haversine_distance(latitude, longitude, place.latitude, place.longitude)
+        duration = FareCalculator.estimate_duration(distance)
+        for ride_type in FareCalculator.RATE_CARDS:
+            high_fare = round(FareCalculator.calculate_fare(distance, duration, ride_type) * 1.15, 2)
+            if high_fare <= budget and duration <= max_minutes - waits[ride_type] and distance >= MIN_TRIP_MILES:
+                found[ride_type].add(place)
+    return found
+
+
+def _reached(index, latitude, longitude, budget, max_minutes):
+    reach = index.reachable(latitude, longitude, budget, max_minutes, limit=10 ** 6)
+    return {ride_type: {match.place for match in matches} for ride_type, matches in reach.results.items()}
+
+
+@pytest.fixture(scope="module")
+def known_places():
+    index = build_place_index()
+    places = [place for cell in index._cells.values() for place in cell]
+    return index, places
+
+
+@pytest.fixture(scope="module")
+def dense_places():
+    # Enough places, close enough together, for the radius to prune most of them
+    rng = random.Random(17)
+    places = [
+        Location(f"P{i}", "", round(37.5 + rng.random() * 0.5, 4), round(-122.65 + rng.random() * 0.5, 4))
+        for i in range(3000)
+    ]
+    index = PlaceIndex()
+    index.extend(places)
+    return index, places
+
+
+@pytest.mark.parametrize("budget, minutes", QUERIES)
+@pytest.mark.parametrize("latitude, longitude", PICKUPS)
+def test_reachable_matches_brute_force_over_known_places(known_places, latitude, longitude, budget, minutes):
+    index, places = known_places
+    assert _reached(index, latitude, longitude, budget, minutes) == _brute_force(
+        places, latitude, longitude, budget, minutes
+    )
+
+
+@pytest.mark.parametrize("budget, minutes", QUERIES)
+@pytest.mark.parametrize("latitude, longitude", PICKUPS)
+def test_reachable_matches_brute_force_over_dense_places(dense_places, latitude, longitude, budget, minutes):
+    index, places = dense_places
+    assert _reached(index, latitude, longitude, budget, minutes) == _brute_force(
+        places, latitude, longitude, budget, minutes
+    )
+
+
+def test_budget_below_every_minimum_fare_prices_nothing(dense_places):
+    index, _ = dense_places
+    budget = min(rates["minimum_fare"] for rates in FareCalculator.RATE_CARDS.values())
+    reach = index.reachable(37.7989, -122.4074, budget, 120)
+    assert reach.candidates == 0
+    assert all(radius == 0 for radius in reach.radius_miles.values())
+    assert not any(reach.results.values())
+
+
+def test_radius_bounds_every_reachable_trip(dense_places):
+    index, _ = dense_places
+    latitude, longitude = PICKUPS[0]
+    waits = pickup_minutes(latitude, longitude)
+    for budget, minutes in QUERIES:
+        reach = index.reachable(latitude, longitude, budget, minutes, limit=10 ** 6)
+        for ride_type, matches in reach.results.items():
+            radius = reach_radius(FareCalculator.RATE_CARDS[ride_type], budget, minutes - waits[ride_type])
+            assert all(match.distance_miles <= radius + 0.005 for match in matches)
+
+
+def test_reachable_endpoint():
+    client = TestClient(main.create_app())
+    response = client.get("/api/reachable", params={"lat": 37.7989, "lon": -122.4074, "budget": 25, "minutes": 30, "limit": 3})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert body["places_indexed"] == len(main.get_place_index())
+    assert set(body["ride_types"]) == set(FareCalculator.RATE_CARDS)
+    uber_x = body["ride_types"]["UberX"]["places"]
+    assert 0 < len(uber_x) <= 3
+    assert [place["high_estimate"] for place in uber_x] == sorted(place["high_estimate"] for place in uber_x)
+    assert all(place["high_estimate"] <= 25 and place["arrival_min"] <= 30 for place in uber_x)
+
+    assert client.get("/api/reachable", params={"lat": 91, "lon": 0, "budget": 25, "minutes": 30}).status_code == 422
+    assert client.get("/api/reachable", params={"lat": 37.8, "lon": -122.4, "budget": 0, "minutes": 30}).status_code == 422
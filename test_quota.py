@@ -0,0 +1,49 @@
+import threading
+import time
+
+from utils.quota import BATCH, INTERACTIVE, WEBHOOK, QuotaScheduler
+
+
+def _wait_for_token(quota: QuotaScheduler, priority: int, granted: list) -> None:
+    if quota.acquire(priority, time.monotonic() + 5):
+        granted.append(priority)
+
+
+def _start_waiter(quota: QuotaScheduler, priority: int, granted: list, waiting: int) -> threading.Thread:
+    thread = threading.Thread(target=_wait_for_token, args=(quota, priority, granted))
+    thread.start()
+    # Let it join the queue before the next waiter arrives
+    while quota.snapshot()["waiting"] < waiting:
+        time.sleep(0.005)
+    return thread
+
+
+def test_waiting_webhook_call_is_granted_before_interactive():
+    # One token per 0.2 s, none left: both callers have to queue
+    quota = QuotaScheduler(per_hour=3600 * 5, burst=1)
+    assert quota.acquire(BATCH, time.monotonic() + 1)
+
+    granted: list = []
+    interactive = _start_waiter(quota, INTERACTIVE, granted, waiting=1)
+    webhook = _start_waiter(quota, WEBHOOK, granted, waiting=2)
+    interactive.join(timeout=5)
+    webhook.join(timeout=5)
+
+    # The interactive call queued first, but the webhook goes ahead of it
+    assert granted == [WEBHOOK, INTERACTIVE]
+
+
+def test_waiter_gives_up_at_its_deadline():
+    quota = QuotaScheduler(per_hour=1, burst=1)
+    assert quota.acquire(INTERACTIVE, time.monotonic() + 1)
+
+    started = time.monotonic()
+    assert not quota.acquire(INTERACTIVE, started + 0.1)
+    assert time.monotonic() - started < 1
+    assert quota.snapshot()["waiting"] == 0
+
+
+def test_try_acquire_never_jumps_the_queue():
+    quota = QuotaScheduler(per_hour=3600 * 5, burst=1)
+    assert quota.try_acquire(BATCH)
+    assert not quota.try_acquire(BATCH)
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.cache_backends import MemoryBackend
+from utils.estimates import PriceEstimate
+from utils.location_input import LocationInput
+from utils import quotes as quotes_module
+from utils.quotes import QuoteStore
+
+# Nothing the fare calculator would produce, so the page shows which estimates it used
+QUOTED = PriceEstimate.from_dict({
+    "localized_display_name": "Quoted Black",
+    "display_name": "Quoted Black",
+    "product_id": "quoted",
+    "estimate": "$99-123",
+    "duration": 600,
+    "distance": 3.0
+})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Live estimates come from the fare calculator
+    monkeypatch.setattr(main.get_uber_client(), "server_token", None)
+    return TestClient(main.create_app())
+
+
+def _use_store(monkeypatch, store: QuoteStore) -> str:
+    monkeypatch.setattr(main, "quotes_enabled", lambda: True)
+    monkeypatch.setattr(main, "get_quotes", lambda: store)
+    start, destination = LocationInput.default_trip()
+    return store.issue(start, destination, [QUOTED], None, "uber://quoted", "https://m.uber.com/quoted")
+
+
+def _is_live_page(page: str) -> bool:
+    return "Quoted Black" not in page and "UberX" in page and "/static/live." in page
+
+
+def test_stored_quote_is_rendered_without_live_updates(client, monkeypatch):
+    quote_id = _use_store(monkeypatch, QuoteStore(MemoryBackend(), ttl=60, secret=b"test"))
+
+    page = client.get("/ride", params={"quote": quote_id, "stream": "false"}).text
+    assert "Quoted Black" in page and "$99-123" in page
+    assert "uber://quoted" in page
+    assert "/static/live." not in page
+
+
+def test_tampered_signature_falls_back_to_live_estimates(client, monkeypatch):
+    quote_id = _use_store(monkeypatch, QuoteStore(MemoryBackend(), ttl=60, secret=b"test"))
+    nonce, _, signature = quote_id.partition(".")
+    tampered = f"{nonce}.{'A' if signature[0] != 'A' else 'B'}{signature[1:]}"
+
+    assert main.get_quotes().get(tampered) is None
+    page = client.get("/ride", params={"quote": tampered, "stream": "false"}).text
+    assert _is_live_page(page)
+
+
+def test_expired_quote_falls_back_to_live_estimates(client, monkeypatch):
+    quote_id = _use_store(monkeypatch, QuoteStore(MemoryBackend(), ttl=0.05, secret=b"test"))
+    time.sleep(0.1)
+
+    assert main.get_quotes().get(quote_id) is None
+    page = client.get("/ride", params={"quote": quote_id, "stream": "false"}).text
+    assert _is_live_page(page)
+
+
+def test_evicted_quote_falls_back_to_live_estimates(client, monkeypatch):
+    backend = MemoryBackend(max_entries=1)
+    quote_id = _use_store(monkeypatch, QuoteStore(backend, ttl=60, secret=b"test"))
+    # A newer entry pushes the quote out of the LRU
+    backend.set("estimate:newer", b"[]", 60)
+
+    assert main.get_quotes().get(quote_id) is None
+    page = client.get("/ride", params={"quote": quote_id, "stream": "false"}).text
+    assert _is_live_page(page)
+
+
+def test_non_ascii_signature_falls_back_to_live_estimates(client, monkeypatch):
+    quote_id = _use_store(monkeypatch, QuoteStore(MemoryBackend(), ttl=60, secret=b"test"))
+    nonce = quote_id.partition(".")[0]
+
+    assert main.get_quotes().get(f"{nonce}.é") is None
+    response = client.get("/ride", params={"quote": "abc.é", "stream": "false"})
+    assert response.status_code == 200
+    assert _is_live_page(response.text)
+
+
+def test_quotes_are_off_without_a_public_url_or_secret(client, monkeypatch):
+    monkeypatch.setattr(quotes_module, "PUBLIC_BASE_URL", "")
+    monkeypatch.delenv("QUOTE_SECRET", raising=False)
+    main.get_quotes.cache_clear()
+
+    assert not quotes_module.quotes_enabled()
+    page = client.get("/ride", params={"quote": "abc.def", "stream": "false"}).text
+    assert _is_live_page(page)
+    # No store, and so no per-process secret, was created
+    assert main.get_quotes.cache_info().currsize == 0
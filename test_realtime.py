@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.location_input import LocationInput
+from utils.quota import BATCH, current_priority
+from utils.realtime import RealtimeSession, RideIntentDetector, SessionStore
+
+
+def test_resent_segments_are_not_counted_twice():
+    session = RealtimeSession()
+    batch = [
+        {"text": "I need a ride", "is_user": True, "start": 0.0, "end": 1.5},
+        {"text": "sure", "is_user": False, "start": 1.5, "end": 2.0},
+    ]
+    assert session.add_segments(batch)
+    # Omi re-sends the same batch, then one overlapping with it
+    assert not session.add_segments(batch)
+    assert session.add_segments(batch[1:] + [{"text": "take me to the mission", "is_user": True, "end": 3.0}])
+
+    assert session.segments == 3
+    assert session.detector.intent
+    assert session.detector.destination == "mission"
+
+
+@pytest.mark.parametrize("text", [5, ["need a ride"], {"text": "uber"}, None])
+def test_segment_text_that_is_not_a_string_is_skipped(text):
+    client = TestClient(main.create_app())
+    response = client.post(
+        "/webhook/omi/realtime", params={"uid": "rt-types"},
+        json={"session_id": f"s-{type(text).__name__}", "segments": [{"text": text, "is_user": True, "end": 1.0}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["segments"] == 1
+    assert not response.json()["ride_intent"]
+
+
+def test_phrase_split_across_segments_still_matches():
+    detector = RideIntentDetector()
+    assert not detector.feed("could you take me")
+    assert detector.feed("to the airport please")
+    assert detector.intent
+    assert detector.destination == "airport"
+
+
+def test_take_me_home_is_a_trip_home_not_start_to_start():
+    detector = RideIntentDetector()
+    detector.feed("okay take me home")
+    assert detector.intent
+    assert detector.destination == "home"
+    assert detector.resolve_destination() == LocationInput.START_LOCATION
+    assert detector.resolve_trip() == (LocationInput.DESTINATION_LOCATION, LocationInput.START_LOCATION)
+
+
+def test_ride_home_is_prefetched_at_batch_priority(monkeypatch):
+    prefetches = []
+
+    def prefetch_trip(start, destination):
+        prefetches.append((start, destination, current_priority()[0]))
+        return asyncio.sleep(0)
+
+    monkeypatch.setattr(main, "_prefetch_trip", prefetch_trip)
+    client = TestClient(main.create_app())
+
+    response = client.post(
+        "/webhook/omi/realtime", params={"uid": "rt-home"},
+        json={"session_id": "s1", "segments": [{"text": "take me home", "is_user": True, "end": 1.0}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["prefetching"]
+    assert prefetches == [(LocationInput.DESTINATION_LOCATION, LocationInput.START_LOCATION, BATCH)]
+
+    # Nothing new to prefetch for the same destination
+    client.post(
+        "/webhook/omi/realtime", params={"uid": "rt-home"},
+        json={"session_id": "s1", "segments": [{"text": "home please", "is_user": True, "end": 2.0}]}
+    )
+    assert len(prefetches) == 1
+
+
+def test_session_store_is_bounded():
+    store = SessionStore(max_sessions=2, ttl=60)
+    first = store.get("u", "1")
+    store.get("u", "2")
+    store.get("u", "3")
+
+    assert len(store) == 2
+    # The least recently used session was dropped, so it starts over
+    assert store.get("u", "1") is not first
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(max_sessions=10, ttl=0.05)
+    first = store.get("u", "1")
+    store.get("u", "2")
+    time.sleep(0.1)
+
+    assert store.get("u", "3") is not None
+    assert len(store) == 1
+    assert store.get("u", "1") is not first
@@ -0,0 +1,44 @@
+from html import escape
+from urllib.parse import parse_qs
+
+from utils.recording import placeholder, pseudonym, redact, sanitize_query, sanitize_webhook
+
+
+def test_query_location_text_and_uid_are_pseudonymized():
+    query, replacements = sanitize_query(
+        "uid=alice&start_name=Jane%27s+Flat&dest_address=12+Oak+St&start_lat=37.79&dest_name="
+    )
+    fields = parse_qs(query, keep_blank_values=True)
+    assert fields["uid"] == [pseudonym("alice")]
+    assert fields["start_name"] == [pseudonym("Jane's Flat")]
+    assert fields["dest_address"] == [pseudonym("12 Oak St")]
+    assert fields["start_lat"] == ["37.79"]
+    assert fields["dest_name"] == [""]
+    assert set(replacements) == {"alice", "Jane's Flat", "12 Oak St"}
+
+
+def test_redact_covers_html_link_and_json_encodings():
+    name = "Jane's Flat"
+    _, replacements = sanitize_query("start_name=Jane%27s+Flat")
+    hashed = pseudonym(name)
+    body = "<h2>" + escape(name) + '</h2><a href="uber://?pickup[nickname]=' + escape(name.replace(" ", "+")) + '">'
+    assert redact(body, replacements) == "<h2>" + hashed + '</h2><a href="uber://?pickup[nickname]=' + hashed + '">'
+    assert "Jane" not in redact('{"name":"' + name + '"}', replacements)
+
+
+def test_webhook_body_keeps_only_id_and_placeholder_user_text():
+    body = b'{"id":"m1","transcript":[{"text":"ride please","is_user":true,"speaker":"Alice"},' \
+           b'{"text":"secret","is_user":false},{"text":5,"is_user":true}],"geolocation":{"latitude":1}}'
+    expected = '{"id":"m1","transcript":[{"text":"' + placeholder("ride please") + '","is_user":true},' \
+               '{"text":"","is_user":true}]}'
+    assert sanitize_webhook(body) == expected
+    assert "ride" not in expected and "secret" not in expected
+    assert sanitize_webhook(b'{"id":"m2","transcript":"ride please"}') == '{"id":"m2","transcript":[]}'
+    assert sanitize_webhook(b"not json") is None
+
+
+def test_placeholder_keeps_length_and_equality():
+    long_text = "I need a ride to the airport right now please " * 3
+    assert len(placeholder(long_text)) == len(long_text)
+    assert len(placeholder("hi")) == 2
+    assert placeholder(long_text) == placeholder(long_text) != placeholder(long_text + ".")
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.schemas import RideInfoResponse
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Estimates come from the fare calculator
+    monkeypatch.setattr(main.get_uber_client(), "server_token", None)
+    return TestClient(main.create_app())
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"start_lat": 37.79, "start_lon": -122.40, "dest_lat": 37.75, "dest_lon": -122.42, "dest_name": "Park"},
+], ids=["default trip", "custom trip"])
+def test_ride_info_body_matches_its_response_model(client, params):
+    response = client.get("/api/ride-info", params=params)
+    assert response.status_code == 200
+
+    # The handler skips response validation, so check here that the documented shape still holds
+    body = RideInfoResponse.model_validate_json(response.content)
+    assert body.price_estimates and body.time_estimates
+    assert body.model_dump(exclude_unset=True) == response.json()
@@ -0,0 +1,38 @@
+import serve
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text + "\n")
+
+
+def test_cgroup_v2_quota_is_rounded_up(tmp_path):
+    _write(tmp_path / "cpu.max", "150000 100000")
+    assert serve.cgroup_cpu_limit(str(tmp_path)) == 2
+
+
+def test_cgroup_v2_without_quota(tmp_path):
+    _write(tmp_path / "cpu.max", "max 100000")
+    assert serve.cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    _write(tmp_path / "cpu" / "cpu.cfs_quota_us", "200000")
+    _write(tmp_path / "cpu" / "cpu.cfs_period_us", "100000")
+    assert serve.cgroup_cpu_limit(str(tmp_path)) == 2
+
+    _write(tmp_path / "cpu" / "cpu.cfs_quota_us", "-1")
+    assert serve.cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_no_cgroup_files(tmp_path):
+    assert serve.cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_available_cores_takes_the_smaller_limit(monkeypatch):
+    monkeypatch.setattr(serve.os, "sched_getaffinity", lambda pid: set(range(64)), raising=False)
+    monkeypatch.setattr(serve, "cgroup_cpu_limit", lambda: 2)
+    assert serve.available_cores() == 2
+
+    monkeypatch.setattr(serve, "cgroup_cpu_limit", lambda: None)
+    assert serve.available_cores() == 64
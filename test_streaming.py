@@ -0,0 +1,67 @@
+import re
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.fare_calculator import FareCalculator
+from utils.uber_client import UberClient
+
+TRIP = {"start_lat": 37.79, "start_lon": -122.40, "dest_lat": 37.75, "dest_lon": -122.42, "dest_name": "Park"}
+
+
+class SlowClient(UberClient):
+    """Calculator estimates, with one of the two calls held back so the arrival order is known."""
+
+    def __init__(self, slow: str):
+        super().__init__()
+        self.slow = slow
+
+    def get_price_estimates(self, start_latitude, start_longitude, end_latitude, end_longitude):
+        if self.slow == "price":
+            time.sleep(0.05)
+        return FareCalculator.get_price_estimates(start_latitude, start_longitude, end_latitude, end_longitude)
+
+    def get_time_estimates(self, start_latitude, start_longitude):
+        if self.slow == "time":
+            time.sleep(0.05)
+        return FareCalculator.get_time_estimates(start_latitude, start_longitude)
+
+
+def _pages(monkeypatch, slow: str):
+    client = SlowClient(slow)
+    monkeypatch.setattr(main, "get_uber_client", lambda: client)
+    app = TestClient(main.create_app())
+    streamed = app.get("/ride", params={**TRIP, "stream": "true"})
+    whole = app.get("/ride", params={**TRIP, "stream": "false"})
+    assert streamed.status_code == whole.status_code == 200
+    return streamed.text, whole.text
+
+
+_CARD = re.compile(r'\n        <div class="card card-\w+">.*?\n        </div>\n', re.S)
+
+
+def _cards(page: str):
+    """The page without its cards, and the cards in a fixed order."""
+    return _CARD.sub("", page), sorted(_CARD.findall(page))
+
+
+def test_streamed_page_is_identical_to_the_whole_page(monkeypatch):
+    streamed, whole = _pages(monkeypatch, slow="price")
+    assert streamed == whole
+
+
+@pytest.mark.parametrize("slow", ["time", "price"])
+def test_streamed_cards_match_whatever_arrives_first(monkeypatch, slow):
+    streamed, whole = _pages(monkeypatch, slow)
+    # Card order follows arrival; flex order lays them out the same
+    assert _cards(streamed) == _cards(whole)
+    assert len(_cards(whole)[1]) == 4
+
+
+def test_streaming_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(main, "get_uber_client", lambda: SlowClient("time"))
+    response = TestClient(main.create_app()).get("/ride", params=TRIP)
+    assert main.RIDE_STREAMING is False
+    assert "etag" in response.headers
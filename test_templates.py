@@ -0,0 +1,134 @@
+import html
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils import templates
+from utils.display import TripView, UberDisplay
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location, LocationInput
+from utils.templates import Markup, Template
+
+HOSTILE_NAME = '<script>alert("name")</script>'
+HOSTILE_ADDRESS = "Tom & Jerry's \"Bar\" <b>"
+
+
+def _baseline_omi(start, destination, price_estimates, time_estimates, deep_link):
+    """_format_omi_response as it was before templates, over Uber-format dicts."""
+    lines = []
+    lines.append(f"🚗 Uber Ride Options")
+    lines.append(f"From: {start.name} → To: {destination.name}")
+    lines.append("")
+
+    if time_estimates and len(time_estimates) > 0:
+        eta_seconds = time_estimates[0].get("estimate", 0)
+        eta_minutes = eta_seconds // 60
+        lines.append(f"⏱️  Pickup: ~{eta_minutes} min")
+        lines.append("")
+
+    if price_estimates:
+        lines.append("💰 Price Options:")
+        for est in price_estimates[:4]:
+            display_name = est.get("localized_display_name", "Unknown")
+            estimate_str = est.get("estimate", "N/A")
+            duration = est.get("duration", 0)
+            distance = est.get("distance", 0)
+            duration_min = duration // 60
+            distance_miles = round(distance, 1)
+
+            lines.append(f"• {display_name}: {estimate_str} ({duration_min} min, {distance_miles} mi)")
+        lines.append("")
+
+    lines.append(f"🔗 Book now: {deep_link}")
+
+    return "\n".join(lines)
+
+
+UBER_PRICES = [
+    {"localized_display_name": "UberX", "display_name": "UberX", "product_id": "a", "estimate": "$12-15",
+     "low_estimate": 12, "high_estimate": 15, "duration": 754, "distance": 3.46, "currency_code": "USD"},
+    {"localized_display_name": "Black SUV", "display_name": "Black SUV", "product_id": "b", "estimate": "$41-52",
+     "low_estimate": 41, "high_estimate": 52, "duration": 754, "distance": 3.46, "currency_code": "USD"},
+    {"localized_display_name": "Comfort", "display_name": "Comfort", "product_id": "c", "estimate": "$18-23",
+     "low_estimate": 18, "high_estimate": 23, "duration": 59, "distance": 0.04, "currency_code": "USD"},
+    {"localized_display_name": "Pool", "display_name": "Pool", "product_id": "d", "estimate": "$8",
+     "low_estimate": 8, "high_estimate": 8, "duration": 1200, "distance": 12.95, "currency_code": "USD"},
+    {"localized_display_name": "WAV", "display_name": "WAV", "product_id": "e", "estimate": "$13-16",
+     "low_estimate": 13, "high_estimate": 16, "duration": 754, "distance": 3.46, "currency_code": "USD"},
+]
+UBER_TIMES = [{"localized_display_name": "UberX", "display_name": "UberX", "product_id": "a", "estimate": 239}]
+
+
+def _omi_cases():
+    start, destination = LocationInput.default_trip()
+    hostile = Location(HOSTILE_NAME, HOSTILE_ADDRESS, 37.79, -122.40)
+    calculator_prices = [estimate.to_dict() for estimate in FareCalculator.get_price_estimates(37.79, -122.40, 37.75, -122.42)]
+    calculator_times = [estimate.to_dict() for estimate in FareCalculator.get_time_estimates(37.79, -122.40)]
+    return [
+        (start, destination, UBER_PRICES, UBER_TIMES),
+        (start, destination, calculator_prices, calculator_times),
+        (hostile, destination, UBER_PRICES, None),
+        (start, hostile, None, UBER_TIMES),
+        (start, destination, None, None),
+    ]
+
+
+@pytest.mark.parametrize("start, destination, prices, times", _omi_cases(), ids=[
+    "uber", "calculator", "no pickup times", "no prices", "no estimates"
+])
+def test_omi_text_is_byte_identical_to_the_baseline(start, destination, prices, times):
+    deep_link = "uber://?action=setPickup&pickup[nickname]=A+%26+B"
+    view = TripView.build(
+        start, destination,
+        None if prices is None else list(map(PriceEstimate.from_dict, prices)),
+        None if times is None else list(map(TimeEstimate.from_dict, times)),
+        deep_link
+    )
+    expected = _baseline_omi(start, destination, prices, times, deep_link)
+    assert UberDisplay.render_omi(view).encode() == expected.encode()
+
+
+def test_ride_page_escapes_user_entered_names_and_addresses(monkeypatch):
+    monkeypatch.setattr(main.get_uber_client(), "server_token", None)
+    client = TestClient(main.create_app())
+    # Twice, so the second page is built from memoized escapes
+    for _ in range(2):
+        page = client.get("/ride", params={
+            "start_name": HOSTILE_NAME, "start_address": HOSTILE_ADDRESS, "start_lat": 37.79, "start_lon": -122.40,
+            "dest_name": "A & B", "dest_address": HOSTILE_ADDRESS, "dest_lat": 37.75, "dest_lon": -122.42,
+            "stream": "false"
+        }).text
+
+        assert HOSTILE_NAME not in page
+        assert "<b>" not in page
+        assert html.escape(HOSTILE_NAME) in page
+        assert html.escape(HOSTILE_ADDRESS) in page
+        assert "A &amp; B" in page
+        # Attributes are escaped too: no raw quote or bracket from the input ends up in a link
+        for href in page.split('href="')[2:]:
+            link = href.split('"', 1)[0]
+            assert "<" not in link and "'" not in link
+
+
+def test_slots_escape_unless_markup_or_numbers():
+    template = Template("<p title=\"{{ title }}\">{{ body }} {{ count }}</p>")
+    assert template.render(title='"x" & y', body="<i>", count=3) == '<p title="&quot;x&quot; &amp; y">&lt;i&gt; 3</p>'
+    assert template.render(title="", body=Markup("<i>ok</i>"), count=1.5) == '<p title=""><i>ok</i> 1.5</p>'
+    assert Template("{{ a }}", autoescape=False).render(a="<raw>") == "<raw>"
+
+
+def test_template_text_is_not_code():
+    # Braces, quotes and backslashes in the static text and values must come out as written
+    source = 'f"{x}" {{ value }} {0} \\n """ \' }}{{'
+    assert Template(source).render(value="{__import__('os')}") == 'f"{x}" {__import__(&#x27;os&#x27;)} {0} \\n """ \' }}{{'
+
+
+def test_escape_memo_is_bounded_and_stays_correct(monkeypatch):
+    monkeypatch.setattr(templates, "_ESCAPE_CACHE_SIZE", 4)
+    monkeypatch.setattr(templates, "_escaped", {})
+    values = [f"<{i}>" for i in range(10)]
+    for value in values * 2:
+        assert templates.escape_value(value) == html.escape(value)
+        assert len(templates._escaped) <= 4
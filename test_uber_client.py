@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from utils import uber_client
+from utils.quota import INTERACTIVE, QuotaScheduler
+from utils.uber_client import LatencyWindow, UberClient
+
+
+class FakeResponse:
+    status_code = 200
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """Hedging on, a p95 of 50 ms, and a quota with plenty of free tokens."""
+    latency = LatencyWindow()
+    for _ in range(50):
+        latency.record(0.05)
+    quota = QuotaScheduler(per_hour=3600, burst=10)
+    monkeypatch.setattr(uber_client, "UBER_HEDGE", True)
+    monkeypatch.setattr(uber_client, "UBER_HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(uber_client, "uber_latency", latency)
+    monkeypatch.setattr(uber_client, "uber_quota", quota)
+    return quota
+
+
+def _client_answering_after(monkeypatch, primary_seconds: float, hedge_seconds: float = 0.0) -> list:
+    sends = []
+
+    def send(self, url, headers, params, endpoint, attempt, deadline, hedge=False):
+        sends.append(hedge)
+        time.sleep(hedge_seconds if hedge else primary_seconds)
+        return FakeResponse(), ""
+
+    monkeypatch.setattr(UberClient, "_send", send)
+    return sends
+
+
+def _attempt(deadline_seconds: float = 2.0):
+    client = UberClient()
+    return client._attempt("url", {}, {}, "estimates/price", 1, INTERACTIVE, time.monotonic() + deadline_seconds)
+
+
+def test_fast_primary_takes_no_hedge_token(hedging, monkeypatch):
+    sends = _client_answering_after(monkeypatch, primary_seconds=0.01)
+    response, _ = _attempt()
+    assert response is not None
+    assert sends == [False]
+    assert hedging.snapshot()["tokens"] >= 9.99
+
+
+def test_slow_primary_is_hedged_after_its_p95(hedging, monkeypatch):
+    sends = _client_answering_after(monkeypatch, primary_seconds=0.5, hedge_seconds=0.01)
+    started = time.monotonic()
+    response, _ = _attempt()
+    assert response is not None
+    assert sends == [False, True]
+    assert time.monotonic() - started < 0.3
+
+
+def test_time_queued_in_the_hedger_pool_does_not_count(hedging, monkeypatch):
+    sends = _client_answering_after(monkeypatch, primary_seconds=0.02)
+    # Occupy every hedger thread, so the primary waits in the queue past the p95
+    release = threading.Event()
+    pool = uber_client._hedger_pool()
+    blockers = [pool.submit(release.wait) for _ in range(pool._max_workers)]
+    threading.Timer(0.15, release.set).start()
+
+    response, _ = _attempt()
+    for blocker in blockers:
+        blocker.result()
+    assert response is not None
+    assert sends == [False]
+
+
+def test_no_hedge_when_the_deadline_comes_first(hedging, monkeypatch):
+    sends = _client_answering_after(monkeypatch, primary_seconds=0.1)
+    _attempt(deadline_seconds=0.03)
+    assert sends == [False]
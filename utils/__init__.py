@@ -1,10 +1,18 @@
 """
 Utils package for OMI Uber Integration.
+
+Names are resolved on first access, so importing one submodule (e.g.
+utils.location_input) does not pull in the others and their dependencies.
 """
-from utils.location_input import LocationInput, Location
-from utils.uber_client import UberClient
-from utils.display import UberDisplay
-from utils.fare_calculator import FareCalculator
+from importlib import import_module
+
+_EXPORTS = {
+    "LocationInput": "utils.location_input",
+    "Location": "utils.location_input",
+    "UberClient": "utils.uber_client",
+    "UberDisplay": "utils.display",
+    "FareCalculator": "utils.fare_calculator"
+}
 
 __all__ = [
     "LocationInput",
@@ -13,3 +21,12 @@ __all__ = [
     "UberDisplay",
     "FareCalculator"
 ]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,231 @@
+"""
+Adaptive admission control driven by event-loop lag and in-flight requests.
+
+Rendering and parsing run on the event loop (Uber calls and quota waits run
+on worker threads), so under a burst every request slows down together. The
+controller watches two signals - how late
+the loop wakes up from a short sleep, and how many requests are in flight -
+and steps through three levels:
+
+    normal    everything as usual
+    degraded  /ride, /api/ride-info and /webhook/omi skip the Uber API and
+              answer from the fare calculator
+    shedding  still calculator-only, and low-priority routes get 503 + Retry-After
+
+Escalation is immediate; stepping back down waits until the signals have
+stayed below the thresholds for ADMISSION_RECOVERY_SECONDS. Degradation is
+decided once per request and only for DEGRADABLE_PATHS, so every other caller
+(the realtime webhook, the prefetchers) keeps using the Uber API, and a
+calculator-only body always comes with the X-Degraded header.
+"""
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+
+# Event-loop lag (ms) that triggers degraded mode / shedding
+ADMISSION_DEGRADE_LAG_MS = float(os.getenv("ADMISSION_DEGRADE_LAG_MS", 100))
+ADMISSION_SHED_LAG_MS = float(os.getenv("ADMISSION_SHED_LAG_MS", 500))
+# In-flight requests that trigger degraded mode / shedding
+ADMISSION_DEGRADE_IN_FLIGHT = int(os.getenv("ADMISSION_DEGRADE_IN_FLIGHT", 32))
+ADMISSION_SHED_IN_FLIGHT = int(os.getenv("ADMISSION_SHED_IN_FLIGHT", 128))
+# Seconds the signals must stay low before stepping down a level
+ADMISSION_RECOVERY_SECONDS = float(os.getenv("ADMISSION_RECOVERY_SECONDS", 5))
+
+LAG_PROBE_INTERVAL = 0.1
+# Weight of the newest lag sample in the moving average
+LAG_SMOOTHING = 0.3
+
+NORMAL, DEGRADED, SHEDDING = 0, 1, 2
+LEVEL_NAMES = {NORMAL: "normal", DEGRADED: "degraded", SHEDDING: "shedding"}
+
+# Routes that switch to calculator-only estimates when degraded
+DEGRADABLE_PATHS = ("/ride", "/api/ride-info", "/webhook/omi")
+# Routes rejected first when shedding; the Omi webhook and health checks are always admitted
+LOW_PRIORITY_PATHS = ("/ride", "/ride/live", "/api/ride-info")
+# Long-lived streams are admitted but not counted as in-flight work
+LONG_LIVED_PATHS = ("/ride/live",)
+
+OVERLOADED_BODY = b'{"detail":"Service overloaded, retry later"}'
+
+# Set by the middleware for requests it marked degraded
+_degraded: ContextVar[bool] = ContextVar("degraded", default=False)
+
+
+class AdmissionController:
+    """Tracks load signals and decides the current admission level."""
+
+    def __init__(
+        self,
+        degrade_lag_ms: float = ADMISSION_DEGRADE_LAG_MS,
+        shed_lag_ms: float = ADMISSION_SHED_LAG_MS,
+        degrade_in_flight: int = ADMISSION_DEGRADE_IN_FLIGHT,
+        shed_in_flight: int = ADMISSION_SHED_IN_FLIGHT,
+        recovery_seconds: float = ADMISSION_RECOVERY_SECONDS
+    ):
+        self.degrade_lag_ms = degrade_lag_ms
+        self.shed_lag_ms = shed_lag_ms
+        self.degrade_in_flight = degrade_in_flight
+        self.shed_in_flight = shed_in_flight
+        self.recovery_seconds = recovery_seconds
+        self.retry_after = str(max(1, math.ceil(recovery_seconds)))
+
+        self.level = NORMAL
+        self.lag_ms = 0.0
+        self.in_flight = 0
+        self._calm_since: Optional[float] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self.transitions: List[Dict] = []
+
+    def _target_level(self) -> int:
+        if self.lag_ms >= self.shed_lag_ms or self.in_flight >= self.shed_in_flight:
+            return SHEDDING
+        if self.lag_ms >= self.degrade_lag_ms or self.in_flight >= self.degrade_in_flight:
+            return DEGRADED
+        return NORMAL
+
+    def update(self, now: Optional[float] = None) -> int:
+        """Re-evaluate the level from the current signals."""
+        now = time.monotonic() if now is None else now
+        target = self._target_level()
+
+        if target > self.level:
+            self._calm_since = None
+            self._set_level(target)
+        elif target < self.level:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recovery_seconds:
+                # Step down one level at a time so recovery is gradual
+                self._calm_since = now
+                self._set_level(self.level - 1)
+        else:
+            self._calm_since = None
+        return self.level
+
+    def _set_level(self, level: int) -> None:
+        previous, self.level = self.level, level
+        icon = "✅" if level == NORMAL else "⚠️ "
+        print(
+            f"{icon} Admission {LEVEL_NAMES[previous]} → {LEVEL_NAMES[level]} "
+            f"(loop lag {self.lag_ms:.0f} ms, {self.in_flight} in flight)",
+            flush=True
+        )
+        metrics.inc(f"admission.transitions.{LEVEL_NAMES[level]}")
+        self.transitions.append({
+            "at": time.time(),
+            "from": LEVEL_NAMES[previous],
+            "to": LEVEL_NAMES[level],
+            "lag_ms": round(self.lag_ms, 1),
+            "in_flight": self.in_flight
+        })
+        del self.transitions[:-20]
+
+    @property
+    def calculator_only(self) -> bool:
+        return self.level >= DEGRADED
+
+    def record_lag(self, lag_ms: float) -> None:
+        self.lag_ms += LAG_SMOOTHING * (lag_ms - self.lag_ms)
+        self.update()
+
+    async def _monitor_loop(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.record_lag(max(0.0, (loop.time() - expected) * 1000))
+
+    def start(self, interval: float = LAG_PROBE_INTERVAL) -> None:
+        """Start the event-loop lag probe on the running loop."""
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_loop(interval))
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "level": LEVEL_NAMES[self.level],
+            "loop_lag_ms": round(self.lag_ms, 1),
+            "in_flight": self.in_flight,
+            "recent_transitions": list(self.transitions)
+        }
+
+
+admission = AdmissionController()
+metrics.gauge("admission", admission.snapshot)
+
+
+def calculator_only() -> bool:
+    """True inside a degraded request, whose estimates should skip the Uber API."""
+    return _degraded.get()
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that counts in-flight requests and applies the admission level.
+
+    Rejected requests never reach the app; degraded responses carry
+    `X-Degraded: calculator-only` so clients can tell.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        path = scope["path"]
+        level = controller.update()
+
+        if level >= SHEDDING and path in LOW_PRIORITY_PATHS:
+            metrics.inc("admission.rejected")
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(OVERLOADED_BODY)).encode()),
+                    (b"retry-after", controller.retry_after.encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": OVERLOADED_BODY})
+            return
+
+        degraded = level >= DEGRADED and path in DEGRADABLE_PATHS
+        if degraded:
+            metrics.inc("admission.degraded")
+
+        async def send_with_status(message):
+            if degraded and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-degraded", b"calculator-only")]
+            await send(message)
+
+        token = _degraded.set(degraded)
+        try:
+            if path in LONG_LIVED_PATHS:
+                await self.app(scope, receive, send_with_status)
+                return
+
+            controller.in_flight += 1
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                controller.in_flight -= 1
+        finally:
+            _degraded.reset(token)
@@ -0,0 +1,78 @@
+"""
+Static asset pipeline.
+Serves files from static/ under content-hashed names so browsers can cache them forever.
+"""
+import hashlib
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STATIC_URL_PREFIX = "/static"
+
+# Hashed URLs change whenever the content does, so responses never need revalidation
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A static file loaded into memory."""
+    name: str
+    hashed_name: str
+    body: bytes
+    media_type: str
+    etag: str
+
+    @property
+    def url(self) -> str:
+        return f"{STATIC_URL_PREFIX}/{self.hashed_name}"
+
+
+class StaticAssets:
+    """Loads static files once and looks them up by logical or hashed name."""
+
+    _by_name: Optional[Dict[str, Asset]] = None
+    _by_hashed_name: Optional[Dict[str, Asset]] = None
+
+    @classmethod
+    def load(cls, directory: Path = STATIC_DIR) -> None:
+        """Read and hash every file in the static directory."""
+        by_name = {}
+        by_hashed_name = {}
+
+        for path in sorted(directory.iterdir()):
+            if not path.is_file():
+                continue
+
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            hashed_name = f"{path.stem}.{digest}{path.suffix}"
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+            asset = Asset(
+                name=path.name,
+                hashed_name=hashed_name,
+                body=body,
+                media_type=media_type,
+                etag=f'"{digest}"'
+            )
+            by_name[asset.name] = asset
+            by_hashed_name[asset.hashed_name] = asset
+
+        cls._by_name = by_name
+        cls._by_hashed_name = by_hashed_name
+
+    @classmethod
+    def url(cls, name: str) -> str:
+        """Get the content-hashed URL for a static file, e.g. /static/app.1a2b3c4d5e6f.css."""
+        if cls._by_name is None:
+            cls.load()
+        return cls._by_name[name].url
+
+    @classmethod
+    def get(cls, hashed_name: str) -> Optional[Asset]:
+        """Look up an asset by its hashed file name."""
+        if cls._by_hashed_name is None:
+            cls.load()
+        return cls._by_hashed_name.get(hashed_name)
@@ -0,0 +1,347 @@
+"""
+Pluggable key/value cache backends.
+
+All backends store bytes with a per-key TTL and offer batch get/set, so the
+estimate cache and webhook idempotency can share state between workers:
+
+    memory  in-process LRU (default; each worker has its own)
+    sqlite  one WAL-mode SQLite file shared by the workers on a host
+    redis   any server speaking the Redis protocol (RESP), via a tiny built-in client
+
+Pick one with CACHE_BACKEND. Every backend reports hit/miss counts and
+get/set latency under `cache.<backend>.*` on /metrics.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.metrics import metrics
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", 4096))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "cache.sqlite3")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Seconds to wait on the Redis server before treating the call as a miss
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 0.25))
+# After a connection failure, calls are skipped (as misses) for this long
+REDIS_RETRY_SECONDS = 5.0
+
+# (key, expires_at, value) as exported by the memory backend for snapshots
+SnapshotEntry = Tuple[str, float, bytes]
+
+
+class CacheBackend:
+    """Base class: subclasses implement _get_many and _set_many."""
+
+    name = "base"
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Values for the keys that are present and unexpired."""
+        if not keys:
+            return {}
+        started = time.perf_counter()
+        try:
+            found = self._get_many(keys)
+        except Exception as e:
+            # A cache outage must never fail the request; treat it as a miss
+            print(f"⚠️  {self.name} cache get failed: {e}", flush=True)
+            metrics.inc(f"cache.{self.name}.errors")
+            found = {}
+        metrics.observe(f"cache.{self.name}.get", (time.perf_counter() - started) * 1000)
+        metrics.inc(f"cache.{self.name}.hit", len(found))
+        metrics.inc(f"cache.{self.name}.miss", len(keys) - len(found))
+        return found
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        """Store all items, each expiring after `ttl` seconds."""
+        if not items:
+            return
+        started = time.perf_counter()
+        try:
+            self._set_many(items, ttl)
+        except Exception as e:
+            print(f"⚠️  {self.name} cache set failed: {e}", flush=True)
+            metrics.inc(f"cache.{self.name}.errors")
+        metrics.observe(f"cache.{self.name}.set", (time.perf_counter() - started) * 1000)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.set_many({key: value}, ttl)
+
+    def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        raise NotImplementedError
+
+    def _set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe in-process LRU; supports snapshots for warm restarts."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every write, so snapshots can skip unchanged caches
+        self.revision = 0
+        self._loader: Optional[Callable[[], Iterable[SnapshotEntry]]] = None
+
+    def load_lazily(self, loader: Callable[[], Iterable[SnapshotEntry]]) -> None:
+        """Restore (key, expires_at, value) entries from `loader` on first access."""
+        self._loader = loader
+
+    def _load_pending(self) -> None:
+        """Run the pending loader; called with the lock held."""
+        loader, self._loader = self._loader, None
+        now = time.time()
+        restored = 0
+        for key, expires_at, value in loader():
+            if expires_at > now and key not in self._entries:
+                self._entries[key] = (expires_at, value)
+                restored += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if restored:
+            print(f"♻️  Restored {restored} cache entries from snapshot", flush=True)
+
+    def entries(self) -> List[SnapshotEntry]:
+        """All unexpired (key, expires_at, value) entries, oldest first."""
+        now = time.time()
+        with self._lock:
+            if self._loader is not None:
+                self._load_pending()
+            return [(key, expires_at, value) for key, (expires_at, value) in self._entries.items() if expires_at > now]
+
+    def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        now = time.time()
+        found = {}
+        with self._lock:
+            if self._loader is not None:
+                self._load_pending()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def _set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            if self._loader is not None:
+                self._load_pending()
+            self.revision += 1
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache in a WAL-mode SQLite file, shared by every worker on the host."""
+
+    name = "sqlite"
+
+    # Expired rows are purged every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        # Set up with a throwaway connection: the app may be imported before workers fork
+        connection = sqlite3.connect(self.path, timeout=1.0)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, time.time())
+        ).fetchall()
+        return {key: bytes(value) for key, value in rows}
+
+    def _set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in items.items()]
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+
+class RESPError(Exception):
+    """An error reply from a Redis-protocol server."""
+
+
+class RESPConnection:
+    """Minimal blocking Redis-protocol (RESP2) connection supporting pipelined commands."""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None,
+                 timeout: float = REDIS_TIMEOUT):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.pipeline([("AUTH", password)])
+        if db:
+            self.pipeline([("SELECT", str(db))])
+
+    @staticmethod
+    def _encode(command: Tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for argument in command:
+            if not isinstance(argument, bytes):
+                argument = str(argument).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(argument), argument))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        """One reply; error replies are returned as RESPError so the rest can still be read."""
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            return RESPError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        # Out of step with the server; the connection can't be used any more
+        raise ConnectionError(f"unexpected reply type {kind!r}")
+
+    def pipeline(self, commands: List[Tuple]) -> List:
+        """
+        Send all commands in one write and read their replies in order.
+
+        Every reply is read before the first error reply is raised, so the
+        connection stays in step for the next pipeline.
+        """
+        self.sock.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RESPError):
+                raise reply
+        return replies
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """Cache on a Redis-protocol server; one connection per thread."""
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, timeout: float = REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connection(self) -> RESPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = RESPConnection(self.host, self.port, self.db, self.password, self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _pipeline(self, commands: List[Tuple]) -> List:
+        if time.monotonic() < self._down_until:
+            # Don't pay a connect timeout on every request while the server is down
+            raise ConnectionError("cache server unavailable")
+        try:
+            return self._connection().pipeline(commands)
+        except RESPError:
+            # An error reply: all replies were read, so the connection is still usable
+            raise
+        except Exception as e:
+            # Anything else may leave unread replies behind: drop the connection so the next call reconnects
+            connection = getattr(self._local, "connection", None)
+            if connection is not None:
+                connection.close()
+            self._local.connection = None
+            if isinstance(e, (OSError, ConnectionError)):
+                self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            raise
+
+    def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        values = self._pipeline([("MGET", *keys)])[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def _set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        milliseconds = max(1, int(ttl * 1000))
+        self._pipeline([("SET", key, value, "PX", milliseconds) for key, value in items.items()])
+
+
+def create_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    """Build the configured backend."""
+    if kind == "sqlite":
+        backend = SQLiteBackend()
+    elif kind == "redis":
+        backend = RedisBackend()
+    else:
+        if kind != "memory":
+            print(f"⚠️  Unknown CACHE_BACKEND '{kind}' - using memory", flush=True)
+        backend = MemoryBackend()
+        metrics.gauge("cache.memory.entries", lambda: len(backend))
+    print(f"🗄️  Cache backend: {backend.name}", flush=True)
+    return backend
+
+
+cache_backend = create_backend()
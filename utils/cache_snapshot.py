@@ -0,0 +1,122 @@
+"""
+Snapshots of the in-process cache for warm restarts.
+
+The memory cache backend is written to CACHE_SNAPSHOT_PATH as zlib-compressed
+records every CACHE_SNAPSHOT_INTERVAL seconds (when it changed) and on
+shutdown. On boot only the raw file is read; it is decoded the first time
+the cache is used, and entries whose TTL has run out are dropped then.
+
+Shared backends (SQLite, Redis) outlive the process already and are not snapshotted.
+"""
+import asyncio
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+from utils.cache_backends import CacheBackend, MemoryBackend, SnapshotEntry
+
+# Empty disables snapshots
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "cache_snapshot.bin")
+CACHE_SNAPSHOT_INTERVAL = max(float(os.getenv("CACHE_SNAPSHOT_INTERVAL", 60)), 5.0)
+
+SNAPSHOT_MAGIC = b"OMIC\x02"
+# Per record: key length, expiry (unix time), value length
+_RECORD = struct.Struct("<Hdi")
+
+
+def encode_snapshot(entries: List[SnapshotEntry]) -> bytes:
+    parts = []
+    for key, expires_at, value in entries:
+        raw_key = key.encode()
+        parts.append(_RECORD.pack(len(raw_key), expires_at, len(value)))
+        parts.append(raw_key)
+        parts.append(value)
+    return SNAPSHOT_MAGIC + zlib.compress(b"".join(parts), 6)
+
+
+def decode_snapshot(raw: bytes) -> List[SnapshotEntry]:
+    """Decode a snapshot; unreadable or incompatible files yield no entries."""
+    if not raw.startswith(SNAPSHOT_MAGIC):
+        return []
+    try:
+        data = zlib.decompress(raw[len(SNAPSHOT_MAGIC):])
+    except zlib.error as e:
+        print(f"⚠️  Ignoring unreadable cache snapshot: {e}", flush=True)
+        return []
+
+    entries = []
+    offset = 0
+    view = memoryview(data)
+    while offset + _RECORD.size <= len(data):
+        key_length, expires_at, value_length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        key = bytes(view[offset:offset + key_length]).decode()
+        offset += key_length
+        entries.append((key, expires_at, bytes(view[offset:offset + value_length])))
+        offset += value_length
+    return entries
+
+
+class CacheSnapshotter:
+    """Restores the memory cache at boot and saves it periodically and on shutdown."""
+
+    def __init__(self, backend: CacheBackend, path: str = CACHE_SNAPSHOT_PATH,
+                 interval: float = CACHE_SNAPSHOT_INTERVAL):
+        self.backend = backend
+        self.path = Path(path) if path and isinstance(backend, MemoryBackend) else None
+        self.interval = interval
+        self._saved_revision = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def restore(self) -> None:
+        """Read the snapshot file and hand it to the backend to decode on first use."""
+        if self.path is None:
+            return
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"⚠️  Could not read cache snapshot: {e}", flush=True)
+            return
+        self.backend.load_lazily(lambda: decode_snapshot(raw))
+
+    def save(self) -> None:
+        """Write a snapshot atomically if the cache changed since the last one."""
+        if self.path is None:
+            return
+        revision = self.backend.revision
+        if revision == self._saved_revision:
+            return
+        entries = self.backend.entries()
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            temporary.write_bytes(encode_snapshot(entries))
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"❌ Could not write cache snapshot: {e}", flush=True)
+            return
+        self._saved_revision = revision
+        print(f"💾 Saved {len(entries)} cache entries to {self.path}", flush=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.save)
+
+    def start(self) -> None:
+        self.restore()
+        if self.path is not None and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.save()
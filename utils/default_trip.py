@@ -0,0 +1,158 @@
+"""
+Prerendered responses for the default trip.
+
+Every request without custom coordinates gets the same trip (LocationInput's
+default locations), so its booking links, ride page, ride-info JSON and Omi
+reply are rendered once per set of estimates instead of on every hit. Renders
+are keyed by the estimates' content: a request whose estimates match is served
+the stored bytes, and the first request (or prefetch pass) that sees new
+estimates renders the trip again.
+
+The prefetcher refreshes the render after each pass, so it is ready by the
+first request and follows the estimates even when no one asks for the trip.
+"""
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+from utils.display import TripView, UberDisplay
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.http_cache import trip_etag
+from utils.location_input import Location, LocationInput
+from utils.metrics import metrics
+from utils.quota import BATCH, outbound_priority
+from utils.responses import dumps
+from utils.tracing import span
+from utils.uber_client import UberClient
+
+
+class DefaultTripRender(NamedTuple):
+    """Everything served for the default trip with one set of estimates."""
+    version: bytes
+    price_estimates: Optional[List[PriceEstimate]]
+    time_estimates: Optional[List[TimeEstimate]]
+    deep_link: str
+    web_link: str
+    view: TripView
+    ride_html: bytes
+    ride_etag: str
+    ride_info_json: bytes
+    ride_info_etag: str
+    omi_reply: bytes
+
+    def omi_reply_with(self, details_link: str) -> bytes:
+        """The webhook reply, linking to a stored quote's ride page if there is one."""
+        if not details_link:
+            return self.omi_reply
+        return dumps({"message": UberDisplay.render_omi(self.view, details_link)})
+
+
+def estimates_version(
+    price_estimates: Optional[List[PriceEstimate]],
+    time_estimates: Optional[List[TimeEstimate]]
+) -> bytes:
+    """The estimates' content, as trip ETags hash it."""
+    return dumps([price_estimates, time_estimates])
+
+
+class DefaultTrip:
+    """Renders the default trip once per set of estimates."""
+
+    def __init__(self, client: UberClient):
+        self.client = client
+        self.start, self.destination = LocationInput.default_trip()
+        self._render: Optional[DefaultTripRender] = None
+        self._lock = threading.Lock()
+
+    def matches(self, start: Location, destination: Location) -> bool:
+        return start == self.start and destination == self.destination
+
+    def estimates(self) -> Tuple[Optional[List[PriceEstimate]], Optional[List[TimeEstimate]]]:
+        """Current estimates for the trip, at the caller's outbound priority."""
+        price_estimates = self.client.get_price_estimates(
+            start_latitude=self.start.latitude,
+            start_longitude=self.start.longitude,
+            end_latitude=self.destination.latitude,
+            end_longitude=self.destination.longitude
+        )
+        time_estimates = self.client.get_time_estimates(
+            start_latitude=self.start.latitude,
+            start_longitude=self.start.longitude
+        )
+        return price_estimates, time_estimates
+
+    def render(
+        self,
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]]
+    ) -> DefaultTripRender:
+        """The render for these estimates, reusing the stored one if they haven't changed."""
+        version = estimates_version(price_estimates, time_estimates)
+        current = self._render
+        if current is not None and current.version == version:
+            metrics.inc("default_trip.hit")
+            return current
+
+        with self._lock:
+            current = self._render
+            if current is None or current.version != version:
+                with span("default_trip.render"):
+                    current = self._render = self._build(version, price_estimates, time_estimates)
+                metrics.inc("default_trip.render")
+        return current
+
+    def refresh(self) -> DefaultTripRender:
+        """Render with the current estimates; run after each prefetch pass."""
+        with outbound_priority(BATCH):
+            price_estimates, time_estimates = self.estimates()
+        return self.render(price_estimates, time_estimates)
+
+    def _build(
+        self,
+        version: bytes,
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]]
+    ) -> DefaultTripRender:
+        start, destination = self.start, self.destination
+        deep_link = self.client.generate_deep_link(
+            pickup_latitude=start.latitude,
+            pickup_longitude=start.longitude,
+            dropoff_latitude=destination.latitude,
+            dropoff_longitude=destination.longitude,
+            pickup_nickname=start.name,
+            dropoff_nickname=destination.name,
+            pickup_address=start.address,
+            dropoff_address=destination.address
+        )
+        web_link = self.client.generate_mobile_web_link(
+            pickup_latitude=start.latitude,
+            pickup_longitude=start.longitude,
+            dropoff_latitude=destination.latitude,
+            dropoff_longitude=destination.longitude
+        )
+
+        view = TripView.build(start, destination, price_estimates, time_estimates, deep_link, web_link)
+        # Logged once per render rather than on every request for the trip
+        print(f"📍 Start: {start.name} ({start.address})", flush=True)
+        print(f"📍 Destination: {destination.name} ({destination.address})", flush=True)
+        print(UberDisplay.render_terminal(view), flush=True)
+
+        return DefaultTripRender(
+            version=version,
+            price_estimates=price_estimates,
+            time_estimates=time_estimates,
+            deep_link=deep_link,
+            web_link=web_link,
+            view=view,
+            ride_html=UberDisplay.render_html(view).encode("utf-8"),
+            ride_etag=trip_etag("ride.html", start, destination, price_estimates, time_estimates),
+            ride_info_json=dumps({
+                "start_location": start.to_dict(),
+                "destination": destination.to_dict(),
+                "price_estimates": price_estimates,
+                "time_estimates": time_estimates,
+                "deep_link": deep_link,
+                "web_link": web_link
+            }),
+            ride_info_etag=trip_etag("ride-info.json", start, destination, price_estimates, time_estimates),
+            omi_reply=dumps({"message": UberDisplay.render_omi(view)})
+        )
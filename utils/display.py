@@ -1,41 +1,275 @@
 """
 Display module for showing Uber ride information.
 """
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, NamedTuple, Optional, Tuple
+from utils.estimates import PriceEstimate, TimeEstimate
 from utils.location_input import Location
+from utils.assets import StaticAssets
+from utils.templates import Markup, Template
+
+
+# Views are built for every estimate on every request; skip NamedTuple's keyword handling
+_new_tuple = tuple.__new__
+
+# No output format shows more than this many pickup times
+MAX_PICKUP_VIEWS = 3
+
+
+class PriceView(NamedTuple):
+    """Display fields for one price estimate."""
+    display_name: str
+    estimate: str
+    duration_min: int
+    distance_miles: float
+
+    @classmethod
+    def from_estimate(cls, estimate: PriceEstimate) -> "PriceView":
+        return _new_tuple(cls, (
+            estimate.display_name,
+            estimate.estimate,
+            estimate.duration_min,
+            estimate.distance_miles
+        ))
+
+    @classmethod
+    def from_estimates(cls, estimates: Optional[List[PriceEstimate]]) -> Tuple["PriceView", ...]:
+        return tuple(map(cls.from_estimate, estimates or ()))
+
+
+class PickupView(NamedTuple):
+    """Display fields for one pickup time estimate."""
+    display_name: str
+    eta_minutes: int
+
+    @classmethod
+    def from_estimate(cls, estimate: TimeEstimate) -> "PickupView":
+        return _new_tuple(cls, (estimate.display_name, estimate.eta_minutes))
+
+    @classmethod
+    def from_estimates(cls, estimates: Optional[List[TimeEstimate]]) -> Tuple["PickupView", ...]:
+        return tuple(map(cls.from_estimate, (estimates or ())[:MAX_PICKUP_VIEWS]))
+
+
+class TripView(NamedTuple):
+    """Everything the output formats show for a trip, computed once."""
+    start: Location
+    destination: Location
+    prices: Tuple[PriceView, ...]
+    pickups: Tuple[PickupView, ...]
+    deep_link: str
+    web_link: str
+
+    @classmethod
+    def build(
+        cls,
+        start: Location,
+        destination: Location,
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]],
+        deep_link: str,
+        web_link: str = ""
+    ) -> "TripView":
+        return _new_tuple(cls, (
+            start,
+            destination,
+            PriceView.from_estimates(price_estimates),
+            PickupView.from_estimates(time_estimates),
+            deep_link,
+            web_link
+        ))
+
+
+# Text templates (terminal and Omi device)
+
+PRICE_LINE = Template(
+    "{{ display_name }}: {{ estimate }} (~{{ duration_min }} min, {{ distance_miles }} mi)",
+    autoescape=False
+)
+PICKUP_LINE = Template("{{ display_name }}: {{ eta_minutes }} min pickup", autoescape=False)
+
+TERMINAL_HEADER = Template("""\
+============================================================
+🚗 UBER RIDE INFORMATION
+============================================================
+
+📍 FROM: {{ start_name }}
+   {{ start_address }}
+   ({{ start_latitude }}, {{ start_longitude }})
+
+📍 TO: {{ dest_name }}
+   {{ dest_address }}
+   ({{ dest_latitude }}, {{ dest_longitude }})
+
+""", autoescape=False)
+
+TERMINAL_FOOTER = Template("""\
+🔗 DEEP LINKS:
+   App Link: {{ deep_link }}
+   Web Link: {{ web_link }}
+
+============================================================""", autoescape=False)
+
+OMI_HEADER = Template("🚗 Uber Ride Options\nFrom: {{ start_name }} → To: {{ dest_name }}\n\n", autoescape=False)
+OMI_PICKUP = Template("⏱️  Pickup: ~{{ eta_minutes }} min\n\n", autoescape=False)
+OMI_PRICE_LINE = Template(
+    "• {{ display_name }}: {{ estimate }} ({{ duration_min }} min, {{ distance_miles }} mi)\n",
+    autoescape=False
+)
+OMI_FOOTER = Template("🔗 Book now: {{ deep_link }}", autoescape=False)
+OMI_DETAILS = Template("\n📄 Details: {{ details_link }}", autoescape=False)
+
+# HTML templates, split per card so pages can be assembled or streamed piece by piece.
+# Cards carry a flex order class, so they may be sent in any order. Whole pages use the
+# order a streamed page has when pickup times arrive first, so the two are byte-identical.
+
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <title>Uber Ride - Omi</title>
+    <link rel="stylesheet" href="{{ stylesheet }}">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="icon">🚗</div>
+            <h1>Your Uber Ride</h1>
+            <p>Ready to book</p>
+        </div>
+
+        <div class="cards">
+""")
+
+LOCATION_CARD = Template("""
+        <div class="card card-location">
+            <div class="location">
+                <div class="location-label">📍 From</div>
+                <div class="location-name">{{ start_name }}</div>
+                <div class="location-address">{{ start_address }}</div>
+            </div>
+            <div class="location">
+                <div class="location-label">📍 To</div>
+                <div class="location-name">{{ dest_name }}</div>
+                <div class="location-address">{{ dest_address }}</div>
+            </div>
+        </div>
+""")
+
+TIME_CARD = Template("""
+        <div class="card card-time">
+            <div class="section-title">⏱️ Pickup Time</div>{{ rows }}
+        </div>
+""")
+
+TIME_ROW = Template("""
+            <div class="time-estimate">
+                <span class="ride-type">{{ display_name }}</span>
+                <span class="eta" data-live="eta:{{ display_name }}">{{ eta_minutes }} min</span>
+            </div>""")
+
+PRICE_CARD = Template("""
+        <div class="card card-price">
+            <div class="section-title">💰 Price Estimates</div>{{ rows }}
+        </div>
+""")
+
+PRICE_ROW = Template("""
+            <div class="estimate-card">
+                <div class="ride-type">{{ display_name }}</div>
+                <div class="price" data-live="price:{{ display_name }}">{{ estimate }}</div>
+                <div class="details" data-live="details:{{ display_name }}">{{ duration_min }} min • {{ distance_miles }} mi</div>
+            </div>""")
+
+LINKS_CARD = Template("""
+        <div class="card card-links">
+            <div class="section-title">🔗 Book Your Ride</div>
+            <a href="{{ deep_link }}" class="btn btn-primary">Open in Uber App</a>
+            <a href="{{ web_link }}" class="btn">Open in Browser</a>
+        </div>
+""")
+
+PAGE_TAIL = Template("""
+        </div>
+
+        <div class="footer">
+            <p>Powered by <strong>Omi</strong></p>
+        </div>
+    </div>{{ scripts }}
+</body>
+</html>
+""")
+LIVE_SCRIPT = Template("""
+    <script src="{{ live_script }}" defer></script>""")
+
+NO_PICKUP_TIMES = Markup('\n            <p class="no-data">Pickup time estimates not available</p>')
+NO_PRICES = Markup('\n            <p class="no-data">Price estimates not available</p>')
+
+
+# Rows only depend on their (hashable) view, and the same ride types and prices
+# repeat across requests, so rendered rows are memoized.
+ROW_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _price_line(price: PriceView) -> str:
+    return PRICE_LINE.render(
+        display_name=price.display_name,
+        estimate=price.estimate,
+        duration_min=price.duration_min,
+        distance_miles=price.distance_miles
+    )
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _pickup_line(pickup: PickupView) -> str:
+    return PICKUP_LINE.render(display_name=pickup.display_name, eta_minutes=pickup.eta_minutes)
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _omi_price_line(price: PriceView) -> str:
+    return OMI_PRICE_LINE.render(
+        display_name=price.display_name,
+        estimate=price.estimate,
+        duration_min=price.duration_min,
+        distance_miles=price.distance_miles
+    )
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _price_row(price: PriceView) -> str:
+    return PRICE_ROW.render(
+        display_name=price.display_name,
+        estimate=price.estimate,
+        duration_min=price.duration_min,
+        distance_miles=price.distance_miles
+    )
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _time_row(pickup: PickupView) -> str:
+    return TIME_ROW.render(display_name=pickup.display_name, eta_minutes=pickup.eta_minutes)
 
 
 class UberDisplay:
     """Handles display formatting for Uber ride information."""
 
     @staticmethod
-    def format_price(estimate: Dict) -> str:
+    def format_price(estimate: PriceEstimate) -> str:
         """Format price estimate for display."""
-        display_name = estimate.get("localized_display_name", "Unknown")
-        estimate_str = estimate.get("estimate", "N/A")
-        duration = estimate.get("duration", 0)
-        distance = estimate.get("distance", 0)
-
-        duration_min = duration // 60
-        distance_miles = round(distance, 1)
-
-        return f"{display_name}: {estimate_str} (~{duration_min} min, {distance_miles} mi)"
+        return _price_line(PriceView.from_estimate(estimate))
 
     @staticmethod
-    def format_time(estimate: Dict) -> str:
+    def format_time(estimate: TimeEstimate) -> str:
         """Format time estimate for display."""
-        display_name = estimate.get("localized_display_name", "Unknown")
-        eta_seconds = estimate.get("estimate", 0)
-        eta_minutes = eta_seconds // 60
-
-        return f"{display_name}: {eta_minutes} min pickup"
+        return _pickup_line(PickupView.from_estimate(estimate))
 
     @staticmethod
     def generate_terminal_output(
         start: Location,
         destination: Location,
-        price_estimates: Optional[List[Dict]],
-        time_estimates: Optional[List[Dict]],
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]],
         deep_link: str,
         web_link: str
     ) -> str:
@@ -44,46 +278,63 @@ class UberDisplay:
 
         Returns: Formatted string for terminal display.
         """
-        lines = []
-        lines.append("=" * 60)
-        lines.append("🚗 UBER RIDE INFORMATION")
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append(f"📍 FROM: {start.name}")
-        lines.append(f"   {start.address}")
-        lines.append(f"   ({start.latitude}, {start.longitude})")
-        lines.append("")
-        lines.append(f"📍 TO: {destination.name}")
-        lines.append(f"   {destination.address}")
-        lines.append(f"   ({destination.latitude}, {destination.longitude})")
-        lines.append("")
-
-        if time_estimates:
-            lines.append("⏱️  PICKUP TIME ESTIMATES:")
-            for est in time_estimates[:3]:
-                lines.append(f"   • {UberDisplay.format_time(est)}")
-            lines.append("")
-
-        if price_estimates:
-            lines.append("💰 PRICE ESTIMATES:")
-            for est in price_estimates:
-                lines.append(f"   • {UberDisplay.format_price(est)}")
-            lines.append("")
-
-        lines.append("🔗 DEEP LINKS:")
-        lines.append(f"   App Link: {deep_link}")
-        lines.append(f"   Web Link: {web_link}")
-        lines.append("")
-        lines.append("=" * 60)
-
-        return "\n".join(lines)
+        view = TripView.build(start, destination, price_estimates, time_estimates, deep_link, web_link)
+        return UberDisplay.render_terminal(view)
+
+    @staticmethod
+    def render_terminal(view: TripView) -> str:
+        """Render a trip view for terminal display."""
+        parts = [TERMINAL_HEADER.render(
+            start_name=view.start.name,
+            start_address=view.start.address,
+            start_latitude=view.start.latitude,
+            start_longitude=view.start.longitude,
+            dest_name=view.destination.name,
+            dest_address=view.destination.address,
+            dest_latitude=view.destination.latitude,
+            dest_longitude=view.destination.longitude
+        )]
+
+        if view.pickups:
+            parts.append("⏱️  PICKUP TIME ESTIMATES:\n")
+            for pickup in view.pickups:
+                parts.append(f"   • {_pickup_line(pickup)}\n")
+            parts.append("\n")
+
+        if view.prices:
+            parts.append("💰 PRICE ESTIMATES:\n")
+            for price in view.prices:
+                parts.append(f"   • {_price_line(price)}\n")
+            parts.append("\n")
+
+        parts.append(TERMINAL_FOOTER.render(deep_link=view.deep_link, web_link=view.web_link))
+        return "".join(parts)
+
+    @staticmethod
+    def render_omi(view: TripView, details_link: str = "") -> str:
+        """Render a trip view as plain text for the Omi device, optionally linking to its ride page."""
+        parts = [OMI_HEADER.render(start_name=view.start.name, dest_name=view.destination.name)]
+
+        if view.pickups:
+            parts.append(OMI_PICKUP.render(eta_minutes=view.pickups[0].eta_minutes))
+
+        if view.prices:
+            parts.append("💰 Price Options:\n")
+            for price in view.prices[:4]:  # Show top 4 options
+                parts.append(_omi_price_line(price))
+            parts.append("\n")
+
+        parts.append(OMI_FOOTER.render(deep_link=view.deep_link))
+        if details_link:
+            parts.append(OMI_DETAILS.render(details_link=details_link))
+        return "".join(parts)
 
     @staticmethod
     def generate_html_output(
         start: Location,
         destination: Location,
-        price_estimates: Optional[List[Dict]],
-        time_estimates: Optional[List[Dict]],
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]],
         deep_link: str,
         web_link: str
     ) -> str:
@@ -92,270 +343,78 @@ class UberDisplay:
 
         Returns: HTML string.
         """
-        # Build price estimates HTML
-        price_html = ""
-        if price_estimates:
-            for est in price_estimates:
-                display_name = est.get("localized_display_name", "Unknown")
-                estimate_str = est.get("estimate", "N/A")
-                duration = est.get("duration", 0)
-                distance = est.get("distance", 0)
-                duration_min = duration // 60
-                distance_miles = round(distance, 1)
-
-                price_html += f"""
-                <div class="estimate-card">
-                    <div class="ride-type">{display_name}</div>
-                    <div class="price">{estimate_str}</div>
-                    <div class="details">{duration_min} min • {distance_miles} mi</div>
-                </div>
-                """
+        view = TripView.build(start, destination, price_estimates, time_estimates, deep_link, web_link)
+        return UberDisplay.render_html(view)
+
+    @staticmethod
+    def render_html(view: TripView, live: bool = True) -> str:
+        """Render a trip view as a full HTML page; live=False leaves out the live-update script."""
+        return "".join((
+            UberDisplay.render_page_head(),
+            UberDisplay.render_location_card(view.start, view.destination),
+            UberDisplay.render_links_card(view.deep_link, view.web_link),
+            UberDisplay.render_time_card(view.pickups),
+            UberDisplay.render_price_card(view.prices),
+            UberDisplay.render_page_tail(live)
+        ))
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def render_page_head() -> str:
+        """Render the page shell up to the first card."""
+        return PAGE_HEAD.render(stylesheet=StaticAssets.url("app.css"))
+
+    @staticmethod
+    @lru_cache(maxsize=2)
+    def render_page_tail(live: bool = True) -> str:
+        """Render the footer, live-update script (unless live=False) and closing tags."""
+        scripts = Markup(LIVE_SCRIPT.render(live_script=StaticAssets.url("live.js")) if live else "")
+        return PAGE_TAIL.render(scripts=scripts)
+
+    @staticmethod
+    def render_location_card(start: Location, destination: Location) -> str:
+        """Render the from/to card."""
+        return LOCATION_CARD.render(
+            start_name=start.name,
+            start_address=start.address,
+            dest_name=destination.name,
+            dest_address=destination.address
+        )
+
+    @staticmethod
+    def render_time_card(pickups: Tuple[PickupView, ...]) -> str:
+        """Render the pickup time card."""
+        if pickups:
+            rows = Markup("".join([_time_row(pickup) for pickup in pickups]))
         else:
-            price_html = '<p class="no-data">Price estimates not available</p>'
-
-        # Build time estimates HTML
-        time_html = ""
-        if time_estimates:
-            for est in time_estimates[:3]:
-                display_name = est.get("localized_display_name", "Unknown")
-                eta_seconds = est.get("estimate", 0)
-                eta_minutes = eta_seconds // 60
-
-                time_html += f"""
-                <div class="time-estimate">
-                    <span class="ride-type">{display_name}</span>
-                    <span class="eta">{eta_minutes} min</span>
-                </div>
-                """
+            rows = NO_PICKUP_TIMES
+        return TIME_CARD.render(rows=rows)
+
+    @staticmethod
+    def render_price_card(prices: Tuple[PriceView, ...]) -> str:
+        """Render the price estimates card."""
+        if prices:
+            rows = Markup("".join([_price_row(price) for price in prices]))
         else:
-            time_html = '<p class="no-data">Pickup time estimates not available</p>'
-
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <title>Uber Ride - Omi</title>
-            <style>
-                * {{
-                    margin: 0;
-                    padding: 0;
-                    box-sizing: border-box;
-                }}
-
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', sans-serif;
-                    background: linear-gradient(135deg, #000000 0%, #1a1a1a 100%);
-                    color: #ffffff;
-                    padding: 20px;
-                    min-height: 100vh;
-                }}
-
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                }}
-
-                .header {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                }}
-
-                .header h1 {{
-                    font-size: 32px;
-                    margin-bottom: 10px;
-                }}
-
-                .header .icon {{
-                    font-size: 48px;
-                    margin-bottom: 10px;
-                }}
-
-                .card {{
-                    background: #1e1e1e;
-                    border-radius: 12px;
-                    padding: 20px;
-                    margin-bottom: 20px;
-                    border: 1px solid #333;
-                }}
-
-                .location {{
-                    margin-bottom: 15px;
-                }}
-
-                .location-label {{
-                    font-size: 12px;
-                    color: #888;
-                    text-transform: uppercase;
-                    margin-bottom: 5px;
-                }}
-
-                .location-name {{
-                    font-size: 18px;
-                    font-weight: 600;
-                    margin-bottom: 3px;
-                }}
-
-                .location-address {{
-                    font-size: 14px;
-                    color: #aaa;
-                }}
-
-                .section-title {{
-                    font-size: 16px;
-                    font-weight: 600;
-                    margin-bottom: 15px;
-                    display: flex;
-                    align-items: center;
-                    gap: 8px;
-                }}
-
-                .estimate-card {{
-                    background: #2a2a2a;
-                    border-radius: 8px;
-                    padding: 15px;
-                    margin-bottom: 10px;
-                    border: 1px solid #444;
-                }}
-
-                .ride-type {{
-                    font-size: 16px;
-                    font-weight: 600;
-                    margin-bottom: 5px;
-                }}
-
-                .price {{
-                    font-size: 24px;
-                    font-weight: 700;
-                    color: #00ff00;
-                    margin-bottom: 5px;
-                }}
-
-                .details {{
-                    font-size: 14px;
-                    color: #888;
-                }}
-
-                .time-estimate {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    padding: 12px 0;
-                    border-bottom: 1px solid #333;
-                }}
-
-                .time-estimate:last-child {{
-                    border-bottom: none;
-                }}
-
-                .eta {{
-                    font-weight: 600;
-                    color: #00ff00;
-                }}
-
-                .btn {{
-                    display: block;
-                    width: 100%;
-                    padding: 16px;
-                    background: #000000;
-                    color: #ffffff;
-                    text-decoration: none;
-                    border-radius: 8px;
-                    font-size: 16px;
-                    font-weight: 600;
-                    text-align: center;
-                    margin-bottom: 10px;
-                    border: 2px solid #ffffff;
-                    transition: all 0.2s;
-                }}
-
-                .btn:hover {{
-                    background: #ffffff;
-                    color: #000000;
-                }}
-
-                .btn-primary {{
-                    background: #ffffff;
-                    color: #000000;
-                }}
-
-                .btn-primary:hover {{
-                    background: #000000;
-                    color: #ffffff;
-                }}
-
-                .no-data {{
-                    text-align: center;
-                    color: #666;
-                    padding: 20px;
-                    font-style: italic;
-                }}
-
-                .footer {{
-                    text-align: center;
-                    margin-top: 40px;
-                    color: #666;
-                    font-size: 14px;
-                }}
-
-                @media (max-width: 480px) {{
-                    body {{
-                        padding: 12px;
-                    }}
-
-                    .header h1 {{
-                        font-size: 24px;
-                    }}
-
-                    .card {{
-                        padding: 15px;
-                    }}
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <div class="icon">🚗</div>
-                    <h1>Your Uber Ride</h1>
-                    <p>Ready to book</p>
-                </div>
-
-                <div class="card">
-                    <div class="location">
-                        <div class="location-label">📍 From</div>
-                        <div class="location-name">{start.name}</div>
-                        <div class="location-address">{start.address}</div>
-                    </div>
-                    <div class="location">
-                        <div class="location-label">📍 To</div>
-                        <div class="location-name">{destination.name}</div>
-                        <div class="location-address">{destination.address}</div>
-                    </div>
-                </div>
-
-                <div class="card">
-                    <div class="section-title">⏱️ Pickup Time</div>
-                    {time_html}
-                </div>
-
-                <div class="card">
-                    <div class="section-title">💰 Price Estimates</div>
-                    {price_html}
-                </div>
-
-                <div class="card">
-                    <div class="section-title">🔗 Book Your Ride</div>
-                    <a href="{deep_link}" class="btn btn-primary">Open in Uber App</a>
-                    <a href="{web_link}" class="btn">Open in Browser</a>
-                </div>
-
-                <div class="footer">
-                    <p>Powered by <strong>Omi</strong></p>
-                </div>
-            </div>
-        </body>
-        </html>
+            rows = NO_PRICES
+        return PRICE_CARD.render(rows=rows)
+
+    @staticmethod
+    def live_values(prices: Tuple[PriceView, ...], pickups: Tuple[PickupView, ...]) -> Dict[str, str]:
         """
+        Flatten estimates into the text of each live-updatable element.
 
-        return html
+        Keys match the data-live attributes in the price and time rows.
+        """
+        values = {}
+        for price in prices:
+            values[f"price:{price.display_name}"] = price.estimate
+            values[f"details:{price.display_name}"] = f"{price.duration_min} min • {price.distance_miles} mi"
+        for pickup in pickups:
+            values[f"eta:{pickup.display_name}"] = f"{pickup.eta_minutes} min"
+        return values
+
+    @staticmethod
+    def render_links_card(deep_link: str, web_link: str) -> str:
+        """Render the booking buttons card."""
+        return LINKS_CARD.render(deep_link=deep_link, web_link=web_link)
@@ -0,0 +1,97 @@
+"""
+Cache of Uber estimates with stale-while-revalidate semantics.
+
+An entry is fresh for ESTIMATE_FRESH_SECONDS and may then be served stale,
+while it is refreshed in the background, for up to ESTIMATE_MAX_STALE_SECONDS.
+Only real Uber API results are cached; the fare calculator is cheap enough to run.
+
+Entries live in the configured cache backend (see utils.cache_backends), so
+workers sharing a SQLite or Redis backend also share estimates.
+"""
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from utils.cache_backends import CacheBackend, cache_backend
+from utils.location_input import quantize_coordinate
+from utils.metrics import metrics
+from utils.responses import dumps
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional
+    import json
+    _loads = json.loads
+
+ESTIMATE_FRESH_SECONDS = float(os.getenv("ESTIMATE_FRESH_SECONDS", 30))
+# Oldest entry that may still be served while it is revalidated
+ESTIMATE_MAX_STALE_SECONDS = float(os.getenv("ESTIMATE_MAX_STALE_SECONDS", 300))
+
+KEY_PREFIX = "estimate:"
+
+
+class CacheEntry(NamedTuple):
+    value: List[Dict]
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+def estimate_key(kind: str, *coordinates: float) -> str:
+    """Cache key for an estimate kind ("price"/"time") at quantized coordinates."""
+    return kind + ":" + ",".join(f"{quantize_coordinate(c):.6f}" for c in coordinates)
+
+
+class EstimateCache:
+    """Estimate lists stored in a cache backend with their fetch time."""
+
+    def __init__(
+        self,
+        backend: CacheBackend = cache_backend,
+        fresh_seconds: float = ESTIMATE_FRESH_SECONDS,
+        max_stale_seconds: float = ESTIMATE_MAX_STALE_SECONDS
+    ):
+        self.backend = backend
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max(max_stale_seconds, fresh_seconds)
+
+    def get_many(self, keys: List[str]) -> Dict[str, CacheEntry]:
+        """Servable (fresh or acceptably stale) entries for the keys, in one backend round trip."""
+        found = self.backend.get_many([KEY_PREFIX + key for key in keys])
+        entries = {}
+        for key in keys:
+            raw = found.get(KEY_PREFIX + key)
+            if raw is None:
+                continue
+            try:
+                fetched_at, value = _loads(raw)
+                entry = CacheEntry(value, float(fetched_at))
+            except (ValueError, TypeError):
+                # Corrupt, or written by something else under our prefix: a miss, not a failed request
+                metrics.inc("estimate_cache.corrupt")
+                continue
+            if entry.age <= self.max_stale_seconds:
+                entries[key] = entry
+        return entries
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self.get_many([key]).get(key)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age <= self.fresh_seconds
+
+    def put(self, key: str, value: List[Dict]) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, values: Dict[str, List[Dict]]) -> None:
+        now = time.time()
+        self.backend.set_many(
+            {KEY_PREFIX + key: dumps([now, value]) for key, value in values.items()},
+            ttl=self.max_stale_seconds
+        )
+
+
+estimate_cache = EstimateCache()
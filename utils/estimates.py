@@ -0,0 +1,118 @@
+"""
+Typed price and pickup-time estimates.
+
+Estimates are slotted objects whose display fields (minutes, rounded miles)
+are computed once, when the estimate is created. The Uber API dict shape is
+only produced at the JSON boundary (see utils.responses.dumps), and then
+memoized; estimates parsed from an Uber response keep the original dict.
+
+Estimates may be shared between requests (the fare calculator memoizes
+them), so treat them as read-only.
+"""
+from typing import Any, Dict, Optional
+
+
+class PriceEstimate:
+    """Price estimate for one ride type."""
+
+    __slots__ = (
+        "product_id", "display_name", "estimate", "low_estimate", "high_estimate",
+        "duration", "distance", "currency_code", "duration_min", "distance_miles", "_dict"
+    )
+
+    def __init__(
+        self,
+        product_id: str,
+        display_name: str,
+        estimate: str,
+        low_estimate: Optional[float],
+        high_estimate: Optional[float],
+        duration: int,
+        distance: float,
+        currency_code: Optional[str] = "USD",
+        source: Optional[Dict[str, Any]] = None
+    ):
+        self.product_id = product_id
+        self.display_name = display_name
+        self.estimate = estimate
+        self.low_estimate = low_estimate
+        self.high_estimate = high_estimate
+        self.duration = duration  # seconds
+        self.distance = distance  # miles
+        self.currency_code = currency_code
+        self.duration_min = duration // 60
+        self.distance_miles = round(distance, 1)
+        self._dict = source
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PriceEstimate":
+        """
+        Wrap an estimate in Uber API format (from Uber, the cache or a stored quote).
+
+        Uber sends null for fields some products don't have (e.g. duration and
+        distance); those get the same defaults as missing ones.
+        """
+        get = data.get
+        return cls(
+            get("product_id") or "",
+            get("localized_display_name") or "Unknown",
+            get("estimate") or "N/A",
+            get("low_estimate"),
+            get("high_estimate"),
+            get("duration") or 0,
+            get("distance") or 0,
+            get("currency_code"),
+            data
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The estimate in Uber API format."""
+        if self._dict is None:
+            self._dict = {
+                "localized_display_name": self.display_name,
+                "estimate": self.estimate,
+                "low_estimate": self.low_estimate,
+                "high_estimate": self.high_estimate,
+                "duration": self.duration,
+                "distance": self.distance,
+                "display_name": self.display_name,
+                "product_id": self.product_id,
+                "currency_code": self.currency_code
+            }
+        return self._dict
+
+    def __repr__(self) -> str:
+        return f"PriceEstimate({self.display_name!r}, {self.estimate!r})"
+
+
+class TimeEstimate:
+    """Pickup time estimate for one ride type."""
+
+    __slots__ = ("product_id", "display_name", "estimate", "eta_minutes", "_dict")
+
+    def __init__(self, product_id: str, display_name: str, estimate: int, source: Optional[Dict[str, Any]] = None):
+        self.product_id = product_id
+        self.display_name = display_name
+        self.estimate = estimate  # seconds
+        self.eta_minutes = estimate // 60
+        self._dict = source
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TimeEstimate":
+        """Wrap an estimate in Uber API format (from Uber, the cache or a stored quote); nulls get defaults."""
+        get = data.get
+        return cls(get("product_id") or "", get("localized_display_name") or "Unknown", get("estimate") or 0, data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The estimate in Uber API format."""
+        if self._dict is None:
+            self._dict = {
+                "localized_display_name": self.display_name,
+                "estimate": self.estimate,
+                "display_name": self.display_name,
+                "product_id": self.product_id
+            }
+        return self._dict
+
+    def __repr__(self) -> str:
+        return f"TimeEstimate({self.display_name!r}, {self.estimate!r})"
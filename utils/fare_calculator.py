@@ -3,7 +3,10 @@ Fare calculator for estimating Uber ride costs and times.
 Uses Haversine formula for distance and standard Uber rate cards.
 """
 import math
-from typing import Dict, List
+from functools import lru_cache
+from typing import List, Tuple
+
+from utils.estimates import PriceEstimate, TimeEstimate
 
 
 class FareCalculator:
@@ -115,62 +118,72 @@ class FareCalculator:
         start_lon: float,
         end_lat: float,
         end_lon: float
-    ) -> List[Dict]:
+    ) -> List[PriceEstimate]:
         """
         Generate price estimates for all ride types.
-        Returns list in Uber API format.
+        Estimates for a trip are computed once and reused for repeated requests.
         """
-        # Calculate distance and duration
-        distance_miles = cls.haversine_distance(start_lat, start_lon, end_lat, end_lon)
-        duration_minutes = cls.estimate_duration(distance_miles)
-
-        estimates = []
-
-        for ride_type, rates in cls.RATE_CARDS.items():
-            low_fare = cls.calculate_fare(distance_miles, duration_minutes, ride_type)
-            # Add 15% variance for high estimate
-            high_fare = round(low_fare * 1.15, 2)
-
-            estimates.append({
-                "localized_display_name": rates["display_name"],
-                "estimate": f"${low_fare:.0f}-${high_fare:.0f}",
-                "low_estimate": low_fare,
-                "high_estimate": high_fare,
-                "duration": int(duration_minutes * 60),  # seconds
-                "distance": round(distance_miles, 2),
-                "display_name": rates["display_name"],
-                "product_id": ride_type.lower().replace(" ", "_"),
-                "currency_code": "USD"
-            })
-
-        print(f"📊 Calculated estimates: {len(estimates)} ride types, {distance_miles:.2f} mi, ~{duration_minutes} min", flush=True)
-
-        return estimates
+        return list(_price_estimates(start_lat, start_lon, end_lat, end_lon))
 
     @classmethod
-    def get_time_estimates(cls, start_lat: float, start_lon: float) -> List[Dict]:
+    def get_time_estimates(cls, start_lat: float, start_lon: float) -> List[TimeEstimate]:
         """
         Generate pickup time estimates for all ride types.
-        Returns list in Uber API format.
+        Pickup times don't depend on the location, so they are computed once.
         """
-        estimates = []
-
-        for ride_type, rates in cls.RATE_CARDS.items():
-            # Vary pickup time slightly by ride type
-            if "Black" in ride_type:
-                pickup_time = cls.AVG_PICKUP_TIME + 2
-            elif "XL" in ride_type or "Comfort" in ride_type:
-                pickup_time = cls.AVG_PICKUP_TIME + 1
-            else:
-                pickup_time = cls.AVG_PICKUP_TIME
-
-            estimates.append({
-                "localized_display_name": rates["display_name"],
-                "estimate": pickup_time * 60,  # seconds
-                "display_name": rates["display_name"],
-                "product_id": ride_type.lower().replace(" ", "_")
-            })
-
-        print(f"⏱️  Calculated pickup times: avg {cls.AVG_PICKUP_TIME} min", flush=True)
-
-        return estimates
+        return list(_time_estimates())
+
+
+# Per ride type: (ride type, rates, product ID), so product IDs aren't rebuilt per request
+_PRODUCTS = tuple(
+    (ride_type, rates, ride_type.lower().replace(" ", "_"))
+    for ride_type, rates in FareCalculator.RATE_CARDS.items()
+)
+
+
+@lru_cache(maxsize=1024)
+def _price_estimates(start_lat: float, start_lon: float, end_lat: float, end_lon: float) -> Tuple[PriceEstimate, ...]:
+    # Calculate distance and duration
+    distance_miles = FareCalculator.haversine_distance(start_lat, start_lon, end_lat, end_lon)
+    duration_minutes = FareCalculator.estimate_duration(distance_miles)
+    duration_seconds = int(duration_minutes * 60)
+    distance = round(distance_miles, 2)
+
+    estimates = []
+    for ride_type, rates, product_id in _PRODUCTS:
+        low_fare = FareCalculator.calculate_fare(distance_miles, duration_minutes, ride_type)
+        # Add 15% variance for high estimate
+        high_fare = round(low_fare * 1.15, 2)
+
+        estimates.append(PriceEstimate(
+            product_id,
+            rates["display_name"],
+            f"${low_fare:.0f}-${high_fare:.0f}",
+            low_fare,
+            high_fare,
+            duration_seconds,
+            distance
+        ))
+
+    print(f"📊 Calculated estimates: {len(estimates)} ride types, {distance_miles:.2f} mi, ~{duration_minutes} min", flush=True)
+
+    return tuple(estimates)
+
+
+@lru_cache(maxsize=1)
+def _time_estimates() -> Tuple[TimeEstimate, ...]:
+    estimates = []
+    for ride_type, rates, product_id in _PRODUCTS:
+        # Vary pickup time slightly by ride type
+        if "Black" in ride_type:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME + 2
+        elif "XL" in ride_type or "Comfort" in ride_type:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME + 1
+        else:
+            pickup_time = FareCalculator.AVG_PICKUP_TIME
+
+        estimates.append(TimeEstimate(product_id, rates["display_name"], pickup_time * 60))
+
+    print(f"⏱️  Calculated pickup times: avg {FareCalculator.AVG_PICKUP_TIME} min", flush=True)
+
+    return tuple(estimates)
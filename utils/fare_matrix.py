@@ -0,0 +1,137 @@
+"""
+Fares for many trips at once.
+
+Takes parallel lists of trip endpoints (one pickup to many candidate
+destinations, or the legs of a multi-stop route) and computes the haversine
+distance, duration and every ride type's fare for all of them in one
+vectorized pass. numpy is used when it is installed and there are enough
+trips to pay for its overhead; otherwise the same formulas run in a plain
+loop. Results match FareCalculator.get_price_estimates for each trip.
+
+/api/compare uses it to rank candidate destinations from one pickup, or to
+price an ordered list of stops leg by leg.
+"""
+import os
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from utils.fare_calculator import FareCalculator
+from utils.location_input import Location
+
+# numpy is imported on first use, so it doesn't add to cold start
+_numpy = None
+# Fewer trips than this are computed in a plain loop, which is faster for small batches
+VECTORIZE_MIN_TRIPS = int(os.getenv("FARE_MATRIX_VECTORIZE_MIN", 16))
+
+EARTH_RADIUS_MILES = 3959.0
+
+# Most destinations or stops accepted by one comparison
+COMPARE_MAX_DESTINATIONS = int(os.getenv("COMPARE_MAX_DESTINATIONS", 100))
+# Best-ranked candidates that also get live estimates from the Uber API
+COMPARE_UPSTREAM_TOP_N = int(os.getenv("COMPARE_UPSTREAM_TOP_N", 3))
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # numpy is optional
+            _numpy = False
+    return _numpy or None
+
+
+class FareMatrix(NamedTuple):
+    """Per trip: distance (miles), duration (minutes) and low fare per ride type."""
+    distances: List[float]
+    durations: List[int]
+    fares: Dict[str, List[float]]
+
+    def trip_fares(self, trip: int) -> Dict[str, Dict]:
+        """Low/high fare per ride type for one trip, in the calculator's estimate format."""
+        return {ride_type: _fare_range(fares[trip]) for ride_type, fares in self.fares.items()}
+
+
+def fare_matrix(
+    start_lats: Sequence[float],
+    start_lons: Sequence[float],
+    end_lats: Sequence[float],
+    end_lons: Sequence[float]
+) -> FareMatrix:
+    """Distances, durations and fares for trip i = (start_i -> end_i)."""
+    numpy = _load_numpy() if len(start_lats) >= VECTORIZE_MIN_TRIPS else None
+    if numpy is not None:
+        return _vectorized(numpy, start_lats, start_lons, end_lats, end_lons)
+    return _looped(start_lats, start_lons, end_lats, end_lons)
+
+
+def _looped(start_lats, start_lons, end_lats, end_lons) -> FareMatrix:
+    distances = list(map(FareCalculator.haversine_distance, start_lats, start_lons, end_lats, end_lons))
+    durations = list(map(FareCalculator.estimate_duration, distances))
+    fares = {
+        ride_type: list(map(
+            lambda distance, duration: FareCalculator.calculate_fare(distance, duration, ride_type),
+            distances, durations
+        ))
+        for ride_type in FareCalculator.RATE_CARDS
+    }
+    return FareMatrix(distances, durations, fares)
+
+
+def _vectorized(numpy, start_lats, start_lons, end_lats, end_lons) -> FareMatrix:
+    lat1, lon1, lat2, lon2 = (
+        numpy.radians(numpy.asarray(values, dtype=numpy.float64))
+        for values in (start_lats, start_lons, end_lats, end_lons)
+    )
+    a = numpy.sin((lat2 - lat1) / 2) ** 2 + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+    distances = EARTH_RADIUS_MILES * (2 * numpy.arcsin(numpy.sqrt(a)))
+    durations = numpy.maximum((distances / FareCalculator.AVG_CITY_SPEED * 60).astype(numpy.int64), 5)
+
+    fares = {}
+    for ride_type, rates in FareCalculator.RATE_CARDS.items():
+        # Same order of operations as FareCalculator.calculate_fare
+        total = rates["base_fare"] + distances * rates["per_mile"] + durations * rates["per_minute"] + rates["booking_fee"]
+        fares[ride_type] = [round(fare, 2) for fare in numpy.maximum(total, rates["minimum_fare"]).tolist()]
+    return FareMatrix(distances.tolist(), durations.tolist(), fares)
+
+
+def _fare_range(low_fare: float) -> Dict:
+    # Same 15% spread as the calculator's high estimate
+    high_fare = round(low_fare * 1.15, 2)
+    return {"low_estimate": low_fare, "high_estimate": high_fare, "estimate": f"${low_fare:.0f}-${high_fare:.0f}"}
+
+
+def rank_destinations(pickup: Location, destinations: Sequence[Location], ride_type: str) -> Tuple[FareMatrix, List[int]]:
+    """
+    Price pickup -> every destination in one pass.
+
+    Returns the matrix and the destination indexes ordered by ride_type's
+    fare, cheapest first (nearest first on equal fares).
+    """
+    count = len(destinations)
+    matrix = fare_matrix(
+        [pickup.latitude] * count, [pickup.longitude] * count,
+        [destination.latitude for destination in destinations],
+        [destination.longitude for destination in destinations]
+    )
+    fares = matrix.fares[ride_type]
+    order = sorted(range(count), key=lambda i: (fares[i], matrix.distances[i]))
+    return matrix, order
+
+
+def route_legs(stops: Sequence[Location]) -> FareMatrix:
+    """Price each leg stops[i] -> stops[i + 1] of an ordered route in one pass."""
+    starts, ends = stops[:-1], stops[1:]
+    return fare_matrix(
+        [stop.latitude for stop in starts], [stop.longitude for stop in starts],
+        [stop.latitude for stop in ends], [stop.longitude for stop in ends]
+    )
+
+
+def route_fares(legs: FareMatrix) -> Dict[str, Dict]:
+    """Fare per ride type for the whole route, charged as one trip over all legs."""
+    distance, duration = sum(legs.distances), sum(legs.durations)
+    return {
+        ride_type: _fare_range(FareCalculator.calculate_fare(distance, duration, ride_type))
+        for ride_type in FareCalculator.RATE_CARDS
+    }
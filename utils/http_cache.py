@@ -0,0 +1,224 @@
+"""
+HTTP caching helpers: strong ETags, conditional GET and response compression.
+"""
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, List, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.location_input import Location, quantize_coordinate
+from utils.responses import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 512))
+# Max number of encoded bodies kept in memory
+COMPRESSED_CACHE_ENTRIES = int(os.getenv("COMPRESSED_CACHE_ENTRIES", 256))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Dynamic pages may change with every estimate, so clients must revalidate
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+def _source_fingerprint() -> bytes:
+    """Hash the app's source and static files so ETags change with every deploy."""
+    root = Path(__file__).resolve().parent.parent
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted([root / "main.py", *root.glob("utils/*.py"), *root.glob("static/*")]):
+        if path.is_file():
+            digest.update(path.read_bytes())
+    return digest.digest()
+
+
+@lru_cache(maxsize=None)
+def build_fingerprint() -> bytes:
+    """Computed on the first ETag rather than at import, to keep cold starts short."""
+    return _source_fingerprint()
+
+
+def make_etag(*parts: bytes) -> str:
+    """Build a strong ETag from raw byte parts."""
+    digest = hashlib.blake2b(build_fingerprint(), digest_size=16)
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\x1e")
+    return f'"{digest.hexdigest()}"'
+
+
+def trip_etag(
+    kind: str,
+    start: Location,
+    destination: Location,
+    price_estimates: Optional[List[PriceEstimate]],
+    time_estimates: Optional[List[TimeEstimate]]
+) -> str:
+    """
+    Build a strong ETag for a rendered trip.
+
+    Derived from the response kind, the quantized trip and the estimate content,
+    so it can be checked before anything is rendered.
+    """
+    trip = "\x1f".join(
+        f"{loc.name}\x1f{loc.address}\x1f{quantize_coordinate(loc.latitude)}\x1f{quantize_coordinate(loc.longitude)}"
+        for loc in (start, destination)
+    )
+    return make_etag(kind.encode(), trip.encode(), dumps([price_estimates, time_estimates]))
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content coding from an Accept-Encoding header.
+
+    Returns "br", "gzip" or None for identity.
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def _encode(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def _variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ per content coding."""
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}{_ENCODING_SUFFIXES[encoding]}"'
+
+
+def matching_etag(request: Request, etag: str) -> Optional[str]:
+    """
+    The variant of `etag` that If-None-Match names (content-coding suffix
+    included), or None. "*" matches the ETag itself.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+
+    base = etag.strip('"')
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        variant = candidate = candidate.strip('"')
+        for suffix in _ENCODING_SUFFIXES.values():
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)]
+                break
+        if candidate == base:
+            return f'"{variant}"'
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag, ignoring content-coding suffixes."""
+    return matching_etag(request, etag) is not None
+
+
+class EncodedBodyCache:
+    """Bounded LRU of encoded response bodies keyed by (ETag, requested content coding)."""
+
+    def __init__(self, max_entries: int = COMPRESSED_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[bytes, Optional[str]]]" = OrderedDict()
+
+    def get(self, etag: str, encoding: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return (body, applied content coding) or None."""
+        key = (etag, encoding)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, etag: str, encoding: Optional[str], body: bytes, applied: Optional[str]) -> None:
+        key = (etag, encoding)
+        self._entries[key] = (body, applied)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+encoded_body_cache = EncodedBodyCache()
+
+
+def cached_response(
+    request: Request,
+    render: Callable[[], bytes],
+    media_type: str,
+    etag: Optional[str] = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL
+) -> Response:
+    """
+    Build a response with conditional GET and content negotiation.
+
+    render() is only called when the client does not already hold the
+    representation and no encoded body is cached for the ETag.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    requested = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    entry = encoded_body_cache.get(etag, requested) if etag is not None else None
+
+    if etag is not None:
+        headers["Cache-Control"] = cache_control
+        matched = matching_etag(request, etag)
+        if matched is not None:
+            # Without a cached body the applied coding isn't known: echo the variant the client holds
+            headers["ETag"] = _variant_etag(etag, entry[1]) if entry is not None else matched
+            return Response(status_code=304, headers=headers)
+
+    if entry is not None:
+        body, encoding = entry
+    else:
+        body = render()
+        encoding = requested if len(body) >= COMPRESSION_MIN_SIZE else None
+        body = _encode(body, encoding)
+        if etag is not None:
+            encoded_body_cache.put(etag, requested, body, encoding)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag is not None:
+        headers["ETag"] = _variant_etag(etag, encoding)
+
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,57 @@
+"""
+Idempotent webhook replies.
+
+Omi retries a webhook delivery when it doesn't get a timely answer. A retry
+carries the same body, so the reply to each (uid, body) is kept in the cache
+backend for WEBHOOK_IDEMPOTENCY_TTL seconds and returned as-is to duplicates,
+from whichever worker receives them.
+"""
+import hashlib
+import os
+from typing import Optional
+
+from utils.cache_backends import CacheBackend, cache_backend
+from utils.metrics import metrics
+
+# 0 disables idempotent replies
+WEBHOOK_IDEMPOTENCY_TTL = float(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", 300))
+
+
+class IdempotencyStore:
+    """Stores rendered replies keyed by a hash of the request."""
+
+    def __init__(self, backend: CacheBackend = cache_backend, ttl: float = WEBHOOK_IDEMPOTENCY_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def digest(uid: str) -> "hashlib.blake2b":
+        """A hash to feed the request body into, chunk by chunk."""
+        digest = hashlib.blake2b(uid.encode(), digest_size=16)
+        digest.update(b"\x00")
+        return digest
+
+    @staticmethod
+    def key_for(digest: "hashlib.blake2b") -> str:
+        return f"webhook:{digest.hexdigest()}"
+
+    @classmethod
+    def key(cls, uid: str, body: bytes) -> str:
+        digest = cls.digest(uid)
+        digest.update(body)
+        return cls.key_for(digest)
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.ttl <= 0:
+            return None
+        reply = self.backend.get(key)
+        if reply is not None:
+            metrics.inc("webhook.duplicates")
+        return reply
+
+    def put(self, key: str, reply: bytes) -> None:
+        if self.ttl > 0:
+            self.backend.set(key, reply, self.ttl)
+
+
+webhook_replies = IdempotencyStore()
@@ -0,0 +1,147 @@
+"""
+Live estimate updates for open ride pages.
+
+One TripRefresher polls Uber per trip, however many pages are open for it,
+and pushes only the values that changed to each subscriber.
+"""
+import asyncio
+import os
+from typing import AsyncIterator, Dict, Optional, Set
+
+from utils.display import PickupView, PriceView, UberDisplay
+from utils.location_input import Location, TripKey, trip_key
+from utils.quota import BATCH, outbound_priority
+from utils.responses import dumps
+from utils.tracing import trace
+from utils.uber_client import UberClient
+
+# Seconds between upstream polls for a trip with open pages (never below 5s)
+LIVE_REFRESH_INTERVAL = max(float(os.getenv("LIVE_REFRESH_INTERVAL", 30)), 5.0)
+# Max number of trips refreshed at once
+LIVE_MAX_TRIPS = int(os.getenv("LIVE_MAX_TRIPS", 100))
+
+# Sent when a heartbeat passes without changes, so proxies keep the stream open
+KEEP_ALIVE_EVENT = b": keep-alive\n\n"
+
+
+def sse_event(changes: Dict[str, str]) -> bytes:
+    """One server-sent event with the changed values, or a keep-alive comment if there are none."""
+    if not changes:
+        return KEEP_ALIVE_EVENT
+    return b"data: " + dumps(changes) + b"\n\n"
+
+
+class Subscriber:
+    """Pending changes for one open page, coalesced until it reads them."""
+
+    def __init__(self):
+        self.pending: Dict[str, str] = {}
+        self.ready = asyncio.Event()
+
+    def push(self, changes: Dict[str, str]) -> None:
+        self.pending.update(changes)
+        self.ready.set()
+
+    async def next_changes(self, timeout: float) -> Dict[str, str]:
+        """Wait for changes; returns {} on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        changes, self.pending = self.pending, {}
+        return changes
+
+
+class TripRefresher:
+    """Polls Uber for one trip while at least one page is subscribed."""
+
+    def __init__(self, start: Location, destination: Location, client: UberClient, interval: float):
+        self.start = start
+        self.destination = destination
+        self.client = client
+        self.interval = interval
+        self.values: Dict[str, str] = {}
+        self.subscribers: Set[Subscriber] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        if self.values:
+            # Sync the page with the shared snapshot, then only diffs follow
+            subscriber.push(dict(self.values))
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> bool:
+        """Remove a subscriber; returns True once the refresher is idle."""
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+        return not self.subscribers
+
+    async def _poll(self) -> Dict[str, str]:
+        # Each poll is its own trace rather than part of the page that started the refresher
+        # Background refreshes queue behind page loads and the webhook for Uber quota
+        with trace("live.refresh", subscribers=len(self.subscribers)), outbound_priority(BATCH):
+            price_estimates, time_estimates = await asyncio.gather(
+                asyncio.to_thread(
+                    self.client.get_price_estimates,
+                    self.start.latitude, self.start.longitude,
+                    self.destination.latitude, self.destination.longitude
+                ),
+                asyncio.to_thread(self.client.get_time_estimates, self.start.latitude, self.start.longitude)
+            )
+        return UberDisplay.live_values(
+            PriceView.from_estimates(price_estimates),
+            PickupView.from_estimates(time_estimates)
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                values = await self._poll()
+            except Exception as e:
+                print(f"❌ Live refresh failed: {e}", flush=True)
+            else:
+                changes = {key: value for key, value in values.items() if self.values.get(key) != value}
+                if changes:
+                    self.values.update(changes)
+                    for subscriber in self.subscribers:
+                        subscriber.push(changes)
+            await asyncio.sleep(self.interval)
+
+
+class LiveUpdateHub:
+    """Registry of per-trip refreshers shared by all open pages."""
+
+    def __init__(self, client: UberClient, interval: float = LIVE_REFRESH_INTERVAL, max_trips: int = LIVE_MAX_TRIPS):
+        self.client = client
+        self.interval = interval
+        self.max_trips = max_trips
+        self.refreshers: Dict[TripKey, TripRefresher] = {}
+
+    def can_subscribe(self, start: Location, destination: Location) -> bool:
+        return trip_key(start, destination) in self.refreshers or len(self.refreshers) < self.max_trips
+
+    async def updates(self, start: Location, destination: Location, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, str]]:
+        """
+        Yield changed values for a trip until the consumer stops.
+
+        Yields {} every `heartbeat` seconds without changes so callers can keep the connection alive.
+        """
+        key = trip_key(start, destination)
+        refresher = self.refreshers.get(key)
+        if refresher is None:
+            refresher = self.refreshers[key] = TripRefresher(start, destination, self.client, self.interval)
+
+        subscriber = refresher.subscribe()
+        try:
+            while True:
+                yield await subscriber.next_changes(heartbeat)
+        finally:
+            if refresher.unsubscribe(subscriber):
+                self.refreshers.pop(key, None)
@@ -2,17 +2,47 @@
 Location input module with hardcoded San Francisco locations.
 """
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Any, Dict, Tuple
 
+# Coordinates are rounded to 6 decimal places (~0.1 m) so equivalent trips share cache keys
+COORDINATE_PRECISION = 6
 
-@dataclass
+
+def quantize_coordinate(value: float) -> float:
+    """Round a latitude or longitude to COORDINATE_PRECISION decimal places."""
+    return round(value, COORDINATE_PRECISION)
+
+
+@dataclass(frozen=True, slots=True)
 class Location:
-    """Represents a geographic location."""
+    """Represents a geographic location (immutable and hashable, so it can key caches)."""
     name: str
     address: str
     latitude: float
     longitude: float
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the location as a JSON-ready dict."""
+        return {
+            "name": self.name,
+            "address": self.address,
+            "latitude": self.latitude,
+            "longitude": self.longitude
+        }
+
+
+TripKey = Tuple[float, float, float, float]
+
+
+def trip_key(start: Location, destination: Location) -> TripKey:
+    """Key a trip by its quantized coordinates."""
+    return (
+        quantize_coordinate(start.latitude),
+        quantize_coordinate(start.longitude),
+        quantize_coordinate(destination.latitude),
+        quantize_coordinate(destination.longitude)
+    )
+
 
 class LocationInput:
     """Handles location input with hardcoded SF locations."""
@@ -32,6 +62,11 @@ class LocationInput:
         longitude=-122.4192
     )
 
+    @classmethod
+    def default_trip(cls) -> Tuple[Location, Location]:
+        """The hardcoded (start, destination) pair, without logging it."""
+        return cls.START_LOCATION, cls.DESTINATION_LOCATION
+
     @classmethod
     def get_trip_locations(cls) -> Tuple[Location, Location]:
         """
@@ -0,0 +1,95 @@
+"""
+Process memory sampling for soak tests.
+
+RSS is always available. With MEMORY_TRACE_FRAMES > 0, tracemalloc is
+started with the app (keeping that many frames per allocation, which slows
+every allocation down, so leave it off in production) and /debug/memory
+reports which source lines grew since the baseline snapshot.
+"""
+import os
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+
+# Frames of traceback kept per allocation; 0 leaves tracemalloc off
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", 0))
+
+# Allocations by tracemalloc itself and the import system are not the app's
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryTracker:
+    """Tracemalloc snapshots compared against a baseline."""
+
+    def __init__(self, frames: int = MEMORY_TRACE_FRAMES):
+        self.frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if self.frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.reset()
+            print(f"🧮 tracemalloc started ({self.frames} frames)", flush=True)
+
+    def reset(self) -> None:
+        """Take a new baseline; later reports show growth since now."""
+        if tracemalloc.is_tracing():
+            self._baseline = self._snapshot()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def top_growth(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Source lines whose live allocations grew the most since the baseline."""
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            return []
+        stats = self._snapshot().compare_to(self._baseline, "lineno")
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size
+            }
+            for stat in stats[:limit] if stat.size_diff > 0
+        ]
+
+    def report(self, limit: int = 10) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"rss_bytes": rss_bytes(), "tracing": self.tracing}
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            report.update(traced_bytes=current, traced_peak_bytes=peak, top_growth=self.top_growth(limit))
+        return report
+
+    def stop(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._baseline = None
+
+
+memory_tracker = MemoryTracker()
+metrics.gauge("process.rss_bytes", rss_bytes)
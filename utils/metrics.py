@@ -0,0 +1,66 @@
+"""
+In-process metrics served as JSON on /metrics.
+
+Counters are incremented from request handlers and worker threads; timings
+keep a count, total and max in milliseconds; gauges are callbacks read when a
+snapshot is taken, so components report their own state.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class Metrics:
+    """Registry of counters, timings and gauge callbacks."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters: Dict[str, int] = {}
+        self._timings: Dict[str, List[float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def count(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def observe(self, name: str, milliseconds: float) -> None:
+        """Record one duration under `name`."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                self._timings[name] = [1, milliseconds, milliseconds]
+            else:
+                timing[0] += 1
+                timing[1] += milliseconds
+                timing[2] = max(timing[2], milliseconds)
+
+    def gauge(self, name: str, read: Callable[[], Any]) -> None:
+        """Register a callback whose value is reported under `name`."""
+        self._gauges[name] = read
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(sorted(self._counters.items()))
+            timings = {
+                name: {"count": count, "avg_ms": round(total / count, 3), "max_ms": round(peak, 3)}
+                for name, (count, total, peak) in sorted(self._timings.items())
+            }
+        gauges = {}
+        for name, read in sorted(self._gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "timings": timings,
+            "gauges": gauges
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,150 @@
+"""
+Streaming extraction of the fields the webhook needs from an Omi payload.
+
+Omi posts the whole memory object, which grows with the conversation. Rather
+than loading it into a dict, the body is parsed as it arrives and only the
+memory id and the user's transcript text are kept, so memory stays flat
+whatever the payload size. Bodies over OMI_MAX_BODY_BYTES and transcripts
+over OMI_MAX_SEGMENTS segments are rejected with 413.
+
+Streaming uses ijson (C backend). Its per-event overhead makes it slower
+than one orjson call, so bodies that declare a Content-Length up to
+OMI_STREAM_THRESHOLD_BYTES are buffered and parsed in one go, which bounds
+their memory all the same. Without ijson every body is buffered, up to
+OMI_MAX_BODY_BYTES.
+"""
+import os
+from typing import Any, AsyncIterator, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+try:
+    import ijson
+except ImportError:  # ijson is optional
+    ijson = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional
+    import json
+    _loads = json.loads
+
+OMI_MAX_BODY_BYTES = int(os.getenv("OMI_MAX_BODY_BYTES", 8 * 1024 * 1024))
+OMI_MAX_SEGMENTS = int(os.getenv("OMI_MAX_SEGMENTS", 5000))
+# Declared sizes up to this are parsed whole; larger or unknown sizes are streamed
+OMI_STREAM_THRESHOLD_BYTES = int(os.getenv("OMI_STREAM_THRESHOLD_BYTES", 256 * 1024))
+# is_user values that count (by truthiness), as ijson events and as parsed types
+_SCALAR_EVENTS = ("boolean", "number", "string")
+_SCALARS = (bool, int, float, str)
+
+
+class OmiPayload(NamedTuple):
+    id: Optional[str]
+    transcript_text: str
+    segments: int
+    size: int
+
+
+class _TranscriptExtractor:
+    """Collects the memory id and user transcript text from ijson parse events."""
+
+    def __init__(self, max_segments: int):
+        self.max_segments = max_segments
+        self.id: Optional[str] = None
+        self.segments = 0
+        self.parts: List[str] = []
+        self._text: Optional[str] = None
+        self._is_user = False
+
+    def segment(self) -> None:
+        self.segments += 1
+        if self.segments > self.max_segments:
+            raise HTTPException(status_code=413, detail=f"Transcript has more than {self.max_segments} segments")
+
+    def feed(self, events: Iterable[Tuple[str, str, Any]]) -> None:
+        for prefix, event, value in events:
+            if prefix == "transcript.item":
+                if event == "start_map":
+                    self.segment()
+                    self._text = None
+                    self._is_user = False
+                elif event == "end_map" and self._is_user and self._text:
+                    self.parts.append(self._text)
+            elif prefix == "transcript.item.text":
+                if event == "string":
+                    self._text = value
+            elif prefix == "transcript.item.is_user" and event in _SCALAR_EVENTS:
+                self._is_user = bool(value)
+            elif prefix == "id" and event in ("string", "number"):
+                self.id = str(value)
+
+    def feed_document(self, payload: Any) -> None:
+        """Same extraction from an already parsed payload (no ijson), with the same type checks."""
+        if not isinstance(payload, dict):
+            return
+        memory_id = payload.get("id")
+        if isinstance(memory_id, (str, int, float)) and not isinstance(memory_id, bool):
+            self.id = str(memory_id)
+        transcript = payload.get("transcript")
+        if not isinstance(transcript, list):
+            # Only a list has segments, as with the "transcript.item" prefix when streaming
+            return
+        for segment in transcript:
+            if not isinstance(segment, dict):
+                continue
+            self.segment()
+            is_user, text = segment.get("is_user"), segment.get("text")
+            if isinstance(is_user, _SCALARS) and is_user and isinstance(text, str) and text:
+                self.parts.append(text)
+
+
+async def read_omi_payload(
+    chunks: AsyncIterator[bytes],
+    digest: Optional[Any] = None,
+    declared_size: Optional[int] = None,
+    max_bytes: int = OMI_MAX_BODY_BYTES,
+    max_segments: int = OMI_MAX_SEGMENTS
+) -> OmiPayload:
+    """
+    Parse a webhook body as it streams in.
+
+    Every chunk is also fed to `digest` (a hashlib object), so the body can be
+    keyed for idempotency without being kept.
+    """
+    extractor = _TranscriptExtractor(max_segments)
+    size = 0
+    streamed = ijson is not None and (declared_size is None or declared_size > OMI_STREAM_THRESHOLD_BYTES)
+    if streamed:
+        events = ijson.sendable_list()
+        parser = ijson.parse_coro(events)
+    else:
+        buffer = bytearray()
+
+    try:
+        async for chunk in chunks:
+            if not chunk:  # an empty chunk would end ijson's input early
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Payload larger than {max_bytes} bytes")
+            if digest is not None:
+                digest.update(chunk)
+            if streamed:
+                parser.send(chunk)
+                extractor.feed(events)
+                del events[:]
+            else:
+                buffer += chunk
+
+        if streamed:
+            parser.close()
+            extractor.feed(events)
+        else:
+            extractor.feed_document(_loads(bytes(buffer)))
+    except HTTPException:
+        raise
+    except Exception as e:  # ijson.JSONError or the json module's ValueError
+        raise HTTPException(status_code=400, detail=f"Invalid JSON payload: {type(e).__name__}")
+
+    return OmiPayload(extractor.id, " ".join(extractor.parts), extractor.segments, size)
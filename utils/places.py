@@ -0,0 +1,197 @@
+"""
+Known places and "where can I get from here?" queries.
+
+Places are the built-in locations plus those listed in PLACES_PATH (a JSON
+list of {name, address, latitude, longitude}), kept in a uniform lat/lon grid
+so a query only looks at the cells around the pickup.
+
+A reachability query asks which places fit a budget and a time limit. From
+the rate cards, each ride type gets the largest distance it could possibly
+cover within both (its reach radius); only places inside the largest radius
+are priced, in one fare_matrix pass, and then checked exactly per ride type.
+"""
+import heapq
+import json
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from utils.fare_calculator import FareCalculator
+from utils.fare_matrix import EARTH_RADIUS_MILES, fare_matrix
+from utils.location_input import Location, LocationInput
+
+PLACES_PATH = os.getenv("PLACES_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "places.json"))
+# Grid cell size in degrees (0.01 is about 0.7 miles north-south)
+PLACES_CELL_DEGREES = float(os.getenv("PLACES_CELL_DEGREES", 0.01))
+# Most places returned per ride type
+REACHABLE_MAX_RESULTS = int(os.getenv("REACHABLE_MAX_RESULTS", 20))
+
+# Places closer than this to the pickup are where the rider already is
+MIN_TRIP_MILES = 0.05
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+
+
+class Reachable(NamedTuple):
+    place: Location
+    distance_miles: float
+    duration_min: int
+    arrival_min: int
+    low_estimate: float
+    high_estimate: float
+
+
+class Reachability(NamedTuple):
+    """Places reachable per ride type, with the pruning figures that found them."""
+    radius_miles: Dict[str, float]
+    candidates: int
+    results: Dict[str, List[Reachable]]
+
+
+def pickup_minutes(latitude: float, longitude: float) -> Dict[str, int]:
+    """Pickup wait per ride type, from the calculator's pickup estimates."""
+    return {
+        ride_type: estimate.eta_minutes
+        for ride_type, estimate in zip(FareCalculator.RATE_CARDS, FareCalculator.get_time_estimates(latitude, longitude))
+    }
+
+
+def reach_radius(rates: Dict, budget: float, trip_minutes: float) -> float:
+    """
+    Upper bound on the distance a ride type covers within budget and trip time.
+
+    The trip duration is int(distance / speed * 60), at least 5 minutes, so
+    it fits trip_minutes only below (trip_minutes + 1) / 60 * speed. The fare
+    is at least base + booking + distance * per_mile + (distance / speed * 60 - 1)
+    * per_minute, and its high estimate (+15%) has to fit the budget. Returns
+    0 when nothing is reachable.
+    """
+    speed = FareCalculator.AVG_CITY_SPEED
+    # Slack for the rounding of the low and high estimates to cents
+    fare_budget = budget / 1.15 + 0.01
+    if trip_minutes < 5 or rates["minimum_fare"] > fare_budget:
+        return 0.0
+    time_radius = (math.floor(trip_minutes) + 1) / 60 * speed
+    fare_radius = (
+        (fare_budget - rates["base_fare"] - rates["booking_fee"] + rates["per_minute"])
+        / (rates["per_mile"] + rates["per_minute"] * 60 / speed)
+    )
+    return max(0.0, min(time_radius, fare_radius))
+
+
+class PlaceIndex:
+    """Places bucketed by grid cell."""
+
+    def __init__(self, cell_degrees: float = PLACES_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[Location]] = defaultdict(list)
+        self._count = 0
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def add(self, place: Location) -> None:
+        self._cells[self._cell(place.latitude, place.longitude)].append(place)
+        self._count += 1
+
+    def extend(self, places: Iterable[Location]) -> None:
+        for place in places:
+            self.add(place)
+
+    def near(self, latitude: float, longitude: float, radius_miles: float) -> List[Location]:
+        """Places in the cells covering the bounding box of a circle (a superset of those inside it)."""
+        if radius_miles <= 0 or not self._count:
+            return []
+        lat_span = radius_miles / MILES_PER_DEGREE
+        # Degrees of longitude shrink with latitude; clamp so the poles don't divide by zero
+        lon_span = min(180.0, radius_miles / (MILES_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)))
+        low_row, low_col = self._cell(latitude - lat_span, longitude - lon_span)
+        high_row, high_col = self._cell(latitude + lat_span, longitude + lon_span)
+        # A box covering more cells than there are places is cheaper to scan place by place
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > len(self._cells):
+            return [
+                place
+                for (row, col), places in self._cells.items() if low_row <= row <= high_row and low_col <= col <= high_col
+                for place in places
+            ]
+        found = []
+        for row in range(low_row, high_row + 1):
+            for col in range(low_col, high_col + 1):
+                found.extend(self._cells.get((row, col), ()))
+        return found
+
+    def reachable(
+        self,
+        latitude: float,
+        longitude: float,
+        budget: float,
+        max_minutes: float,
+        limit: int = REACHABLE_MAX_RESULTS
+    ) -> Reachability:
+        """
+        Places whose high fare estimate fits `budget` and that can be reached
+        (pickup wait + trip) within `max_minutes`, cheapest first per ride type.
+        """
+        waits = pickup_minutes(latitude, longitude)
+        radius = {
+            ride_type: reach_radius(rates, budget, max_minutes - waits[ride_type])
+            for ride_type, rates in FareCalculator.RATE_CARDS.items()
+        }
+        candidates = self.near(latitude, longitude, max(radius.values()))
+        results: Dict[str, List[Reachable]] = {ride_type: [] for ride_type in radius}
+        if not candidates:
+            return Reachability(radius, 0, results)
+
+        count = len(candidates)
+        matrix = fare_matrix(
+            [latitude] * count, [longitude] * count,
+            [place.latitude for place in candidates], [place.longitude for place in candidates]
+        )
+        distances, durations = matrix.distances, matrix.durations
+        for ride_type, fares in matrix.fares.items():
+            trip_minutes = max_minutes - waits[ride_type]
+            high_fares = [round(fare * 1.15, 2) for fare in fares]
+            matches = [
+                i for i in range(count)
+                if high_fares[i] <= budget and durations[i] <= trip_minutes and distances[i] >= MIN_TRIP_MILES
+            ]
+            # Cheapest first; only the returned places are built
+            for i in heapq.nsmallest(limit, matches, key=lambda i: (high_fares[i], distances[i])):
+                results[ride_type].append(Reachable(
+                    candidates[i], round(distances[i], 2), durations[i],
+                    durations[i] + waits[ride_type], fares[i], high_fares[i]
+                ))
+        return Reachability(radius, count, results)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def load_places(path: str = PLACES_PATH) -> List[Location]:
+    """Places listed in a JSON file; a missing or invalid file gives none."""
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, "rb") as f:
+            entries = json.load(f)
+        return [
+            Location(
+                name=entry["name"],
+                address=entry.get("address") or "Unknown",
+                latitude=float(entry["latitude"]),
+                longitude=float(entry["longitude"])
+            )
+            for entry in entries
+        ]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️  Could not load places from {path}: {e}", flush=True)
+        return []
+
+
+def build_place_index(path: str = PLACES_PATH) -> PlaceIndex:
+    """Index of the built-in locations and the places in `path`."""
+    index = PlaceIndex()
+    index.extend((LocationInput.START_LOCATION, LocationInput.DESTINATION_LOCATION))
+    index.extend(load_places(path))
+    print(f"🗺️  Indexed {len(index)} places", flush=True)
+    return index
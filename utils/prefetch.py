@@ -0,0 +1,153 @@
+"""
+Hot-trip prefetcher.
+
+Trip popularity is tracked in a count-min sketch with periodic aging, so it
+takes fixed memory however many distinct trips are seen. On a schedule, the
+estimates of the top trips are refreshed in the background, so requests for
+them are answered from the estimate cache instead of waiting on Uber.
+"""
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.location_input import Location, TripKey, trip_key
+from utils.metrics import metrics
+from utils.quota import BATCH, outbound_priority
+from utils.uber_client import UberClient
+
+# Number of most popular trips kept warm
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", 5))
+# Seconds between refresh passes (never below 5s)
+PREFETCH_INTERVAL = max(float(os.getenv("PREFETCH_INTERVAL", 20)), 5.0)
+# Max trips refreshed per pass, which caps the upstream rate this adds
+PREFETCH_MAX_PER_PASS = int(os.getenv("PREFETCH_MAX_PER_PASS", 5))
+
+
+class FrequencySketch:
+    """Count-min sketch whose counters are halved every `sample_size` additions."""
+
+    def __init__(self, width: int = 1024, depth: int = 4, sample_size: Optional[int] = None):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size or width * 10
+        self.rows = [[0] * width for _ in range(depth)]
+        self.additions = 0
+
+    def _indexes(self, key) -> List[int]:
+        return [hash((seed, key)) % self.width for seed in range(self.depth)]
+
+    def add(self, key) -> int:
+        """Count one occurrence of key and return its new estimate."""
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += 1
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            # Age old popularity out so today's hot trips win over yesterday's
+            for row in self.rows:
+                for index, count in enumerate(row):
+                    row[index] = count >> 1
+            self.additions //= 2
+        return estimate
+
+    def estimate(self, key) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+
+class TripPrefetcher:
+    """Keeps the estimates of the most requested trips warm."""
+
+    def __init__(
+        self,
+        client: UberClient,
+        top_n: int = PREFETCH_TOP_N,
+        interval: float = PREFETCH_INTERVAL,
+        max_per_pass: int = PREFETCH_MAX_PER_PASS
+    ):
+        self.client = client
+        self.top_n = top_n
+        self.interval = interval
+        self.max_per_pass = max_per_pass
+        self.sketch = FrequencySketch()
+        # A few more candidates than top_n, so trips on the rise can overtake
+        self.candidates: Dict[TripKey, Tuple[Location, Location]] = {}
+        self.pinned: Dict[TripKey, Tuple[Location, Location]] = {}
+        # Run on a worker thread after each pass (e.g. to re-render the default trip)
+        self.listeners: List[Callable[[], object]] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def pin(self, start: Location, destination: Location) -> None:
+        """Always keep this trip warm (e.g. the default trip)."""
+        self.pinned[trip_key(start, destination)] = (start, destination)
+
+    def add_listener(self, callback: Callable[[], object]) -> None:
+        """Call `callback` after every refresh pass, once the hot trips are warm."""
+        self.listeners.append(callback)
+
+    def record(self, start: Location, destination: Location) -> None:
+        """Count a request for a trip."""
+        key = trip_key(start, destination)
+        count = self.sketch.add(key)
+        if key in self.candidates or key in self.pinned:
+            return
+
+        if len(self.candidates) < self.top_n * 4:
+            self.candidates[key] = (start, destination)
+            return
+
+        coldest = min(self.candidates, key=self.sketch.estimate)
+        if count > self.sketch.estimate(coldest):
+            del self.candidates[coldest]
+            self.candidates[key] = (start, destination)
+
+    def hot_trips(self) -> List[Tuple[Location, Location]]:
+        """Pinned trips, then the top_n most requested ones."""
+        ranked = sorted(self.candidates, key=self.sketch.estimate, reverse=True)[:self.top_n]
+        return list(self.pinned.values()) + [self.candidates[key] for key in ranked]
+
+    async def refresh(self) -> int:
+        """Refresh hot trips whose cached estimates are no longer fresh; returns how many were fetched."""
+        refreshed = 0
+        for start, destination in self.hot_trips():
+            if refreshed >= self.max_per_pass:
+                break
+            with outbound_priority(BATCH):
+                fetched = await asyncio.to_thread(
+                    self.client.prefetch,
+                    start.latitude, start.longitude,
+                    destination.latitude, destination.longitude
+                )
+            if fetched:
+                refreshed += 1
+        if refreshed:
+            metrics.inc("prefetch.trips_refreshed", refreshed)
+            print(f"🔥 Prefetched estimates for {refreshed} hot trip(s)", flush=True)
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"❌ Prefetch failed: {e}", flush=True)
+            for callback in self.listeners:
+                try:
+                    await asyncio.to_thread(callback)
+                except Exception as e:
+                    print(f"❌ Prefetch listener failed: {e}", flush=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,97 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or is
+picked by PROFILE_SAMPLE_RATE. Its cProfile stats are written to PROFILE_DIR
+as a .prof file (open with snakeviz, flameprof or `python -m pstats`).
+
+The middleware is only installed when one of the two triggers is configured,
+so there is no per-request overhead otherwise.
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+PROFILE_HEADER = b"x-profile"
+
+
+def profiling_enabled() -> bool:
+    """True if any profiling trigger is configured."""
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests with cProfile.
+
+    Only one request is profiled at a time. cProfile records the event-loop
+    thread, so work for other requests interleaved on the loop may show up,
+    and work moved to worker threads does not.
+    """
+
+    def __init__(self, app, token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 directory: Path = PROFILE_DIR):
+        self.app = app
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.active = False
+
+    def _should_profile(self, scope) -> bool:
+        if self.active:
+            return False
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self.active = True
+        profile_id = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000:06d}"
+            f"-{scope['method']}-{_slug(scope['path'])}-{os.getpid()}"
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            self.active = False
+            self._dump(profiler, profile_id)
+
+    def _dump(self, profiler: cProfile.Profile, profile_id: str) -> Optional[Path]:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{profile_id}.prof"
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"❌ Could not write profile {profile_id}: {e}", flush=True)
+            return None
+
+        print(f"🔬 Profile written: {path}", flush=True)
+        return path
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
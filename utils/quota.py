@@ -0,0 +1,170 @@
+"""
+Global token-bucket quota for outbound Uber API calls.
+
+Uber rate-limits per server token, so every outbound call first takes a token
+from one shared bucket. When the bucket is empty, callers queue by priority
+class (the Omi webhook, then interactive pages, then batch/prefetch work) and
+give up once their deadline passes, falling back to the fare calculator.
+
+A 429 from Uber pauses the bucket for Retry-After and halves the rate; the
+rate then creeps back up with each successful call.
+
+Callers declare their class and deadline for the current context:
+
+    with outbound_priority(WEBHOOK):
+        uber_client.get_price_estimates(...)
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+# Sustained outbound rate and burst size shared by all Uber calls. The bucket
+# lives in each worker process, so the budget is split across WEB_CONCURRENCY workers.
+WORKER_PROCESSES = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+UBER_QUOTA_PER_HOUR = float(os.getenv("UBER_QUOTA_PER_HOUR", 2000)) / WORKER_PROCESSES
+UBER_QUOTA_BURST = max(1, int(os.getenv("UBER_QUOTA_BURST", 20)) // WORKER_PROCESSES)
+
+WEBHOOK, INTERACTIVE, BATCH = 0, 1, 2
+PRIORITY_NAMES = {WEBHOOK: "webhook", INTERACTIVE: "interactive", BATCH: "batch"}
+# How long a call may wait for a token before falling back, per class
+DEFAULT_TIMEOUTS = {WEBHOOK: 3.0, INTERACTIVE: 2.0, BATCH: 10.0}
+
+# Rate recovered per successful call after a 429, as a fraction of the configured rate
+RECOVERY_STEP = 0.05
+MIN_RATE_FRACTION = 0.05
+
+_priority: ContextVar[int] = ContextVar("outbound_priority", default=BATCH)
+_deadline: ContextVar[Optional[float]] = ContextVar("outbound_deadline", default=None)
+
+
+@contextmanager
+def outbound_priority(priority: int, timeout: Optional[float] = None) -> Iterator[None]:
+    """Set the priority class and deadline for outbound calls made in this context."""
+    deadline = time.monotonic() + (DEFAULT_TIMEOUTS[priority] if timeout is None else timeout)
+    priority_token = _priority.set(priority)
+    deadline_token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(deadline_token)
+        _priority.reset(priority_token)
+
+
+def current_priority() -> Tuple[int, float]:
+    """The (priority, deadline) for the current context."""
+    priority = _priority.get()
+    deadline = _deadline.get()
+    if deadline is None:
+        deadline = time.monotonic() + DEFAULT_TIMEOUTS[priority]
+    return priority, deadline
+
+
+class QuotaScheduler:
+    """Thread-safe token bucket that grants tokens to waiters in priority order."""
+
+    def __init__(self, per_hour: float = UBER_QUOTA_PER_HOUR, burst: int = UBER_QUOTA_BURST):
+        self.configured_rate = max(per_hour, 1.0) / 3600
+        self.rate = self.configured_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int, deadline: float) -> bool:
+        """
+        Wait for a token until `deadline` (time.monotonic()).
+
+        Returns False if the deadline passes first; the caller should not call Uber.
+        """
+        name = PRIORITY_NAMES[priority]
+        with self._cond:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    at_head = self._waiters[0] == entry
+                    if at_head and now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        metrics.inc(f"quota.granted.{name}")
+                        return True
+                    if now >= deadline:
+                        metrics.inc(f"quota.expired.{name}")
+                        return False
+
+                    wait = deadline - now
+                    if at_head:
+                        ready_at = max(self.paused_until, now + (1 - self.tokens) / self.rate)
+                        wait = min(wait, ready_at - now)
+                    self._cond.wait(max(wait, 0.001))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # The next waiter in line may be able to go now
+                self._cond.notify_all()
+
+    def try_acquire(self, priority: int) -> bool:
+        """Take a token only if one is free now and nobody is waiting (for optional extra calls)."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if self._waiters or now < self.paused_until or self.tokens < 1:
+                return False
+            self.tokens -= 1
+        metrics.inc(f"quota.granted.{PRIORITY_NAMES[priority]}")
+        return True
+
+    def throttled(self, retry_after: Optional[float]) -> None:
+        """Back off after a 429: pause for Retry-After and halve the rate."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + (retry_after or 1.0))
+            self.rate = max(self.rate / 2, self.configured_rate * MIN_RATE_FRACTION)
+        metrics.inc("quota.throttled")
+        print(f"⚠️  Uber rate limit hit - pausing {retry_after or 1.0:.1f}s, rate now {self.rate * 3600:.0f}/h", flush=True)
+
+    def succeeded(self) -> None:
+        """Creep the rate back toward the configured rate after a successful call."""
+        if self.rate < self.configured_rate:
+            with self._cond:
+                self.rate = min(self.configured_rate, self.rate + self.configured_rate * RECOVERY_STEP)
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "tokens": round(self.tokens, 2),
+                "rate_per_hour": round(self.rate * 3600, 1),
+                "waiting": len(self._waiters),
+                "paused_for": round(max(0.0, self.paused_until - now), 2)
+            }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds (HTTP dates are treated as unknown)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+uber_quota = QuotaScheduler()
+metrics.gauge("uber_quota", uber_quota.snapshot)
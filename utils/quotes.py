@@ -0,0 +1,163 @@
+"""
+Shareable ride quotes.
+
+The webhook stores what it computed for a trip (locations, estimates and
+links) under a short quote ID, and links to /ride?quote=<id>. The ride page
+then renders that quote without calling Uber or recomputing anything. Quotes
+live in the cache backend for QUOTE_TTL_SECONDS; after that the page falls
+back to a fresh fetch.
+
+IDs are signed with QUOTE_SECRET, so forged or mistyped IDs are rejected
+without a cache lookup. Set the same secret on every instance that serves
+ride pages. Quotes are off (and no store or secret is created) unless
+PUBLIC_BASE_URL or QUOTE_SECRET is set.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from typing import List, NamedTuple, Optional
+
+from utils.cache_backends import CacheBackend, cache_backend
+from utils.estimates import PriceEstimate, TimeEstimate
+from utils.location_input import Location
+from utils.metrics import metrics
+from utils.responses import dumps
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional
+    import json
+    _loads = json.loads
+
+# 0 disables quotes
+QUOTE_TTL_SECONDS = float(os.getenv("QUOTE_TTL_SECONDS", 900))
+# Where this app is reachable from the user's phone, e.g. https://omi-uber.up.railway.app
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+
+KEY_PREFIX = "quote:"
+# 9 random bytes and a 9-byte signature, each 12 base64url characters
+_NONCE_BYTES = 9
+_SIGNATURE_BYTES = 9
+
+
+def _secret() -> bytes:
+    secret = os.getenv("QUOTE_SECRET")
+    if secret:
+        return secret.encode()
+    # Fine for one process (or forked workers); quotes from other instances won't verify
+    print("⚠️  QUOTE_SECRET not set - using a random per-process secret", flush=True)
+    return secrets.token_bytes(32)
+
+
+def _encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+class Quote(NamedTuple):
+    start: Location
+    destination: Location
+    price_estimates: Optional[List[PriceEstimate]]
+    time_estimates: Optional[List[TimeEstimate]]
+    deep_link: str
+    web_link: str
+    created_at: float
+
+
+class QuoteStore:
+    """Issues signed quote IDs and stores the quotes behind them."""
+
+    def __init__(
+        self,
+        backend: CacheBackend = cache_backend,
+        ttl: float = QUOTE_TTL_SECONDS,
+        secret: Optional[bytes] = None
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.secret = secret or _secret()
+
+    def _sign(self, nonce: str) -> str:
+        digest = hmac.new(self.secret, nonce.encode("ascii"), hashlib.sha256).digest()
+        return _encode(digest[:_SIGNATURE_BYTES])
+
+    def verify(self, quote_id: str) -> Optional[str]:
+        """Return the nonce of a correctly signed ID, or None."""
+        nonce, _, signature = quote_id.partition(".")
+        if not nonce or not signature or not nonce.isascii() or not signature.isascii():
+            return None
+        if not hmac.compare_digest(signature, self._sign(nonce)):
+            return None
+        return nonce
+
+    def issue(
+        self,
+        start: Location,
+        destination: Location,
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]],
+        deep_link: str,
+        web_link: str = ""
+    ) -> Optional[str]:
+        """Store a quote and return its ID (None when quotes are disabled)."""
+        if self.ttl <= 0:
+            return None
+        nonce = _encode(secrets.token_bytes(_NONCE_BYTES))
+        self.backend.set(KEY_PREFIX + nonce, dumps([
+            start.to_dict(),
+            destination.to_dict(),
+            price_estimates,
+            time_estimates,
+            deep_link,
+            web_link,
+            time.time()
+        ]), self.ttl)
+        metrics.inc("quotes.issued")
+        return f"{nonce}.{self._sign(nonce)}"
+
+    def get(self, quote_id: str) -> Optional[Quote]:
+        """The stored quote, or None if the ID is invalid or the quote expired."""
+        nonce = self.verify(quote_id)
+        if nonce is None:
+            metrics.inc("quotes.invalid")
+            return None
+
+        raw = self.backend.get(KEY_PREFIX + nonce)
+        if raw is None:
+            metrics.inc("quotes.expired")
+            return None
+
+        start, destination, prices, times, deep_link, web_link, created_at = _loads(raw)
+        metrics.inc("quotes.served")
+        return Quote(
+            Location(**start),
+            Location(**destination),
+            None if prices is None else list(map(PriceEstimate.from_dict, prices)),
+            None if times is None else list(map(TimeEstimate.from_dict, times)),
+            deep_link,
+            web_link,
+            created_at
+        )
+
+    def share(
+        self,
+        start: Location,
+        destination: Location,
+        price_estimates: Optional[List[PriceEstimate]],
+        time_estimates: Optional[List[TimeEstimate]],
+        deep_link: str,
+        web_link: str = ""
+    ) -> str:
+        """Issue a quote and return its absolute ride-page URL ("" without PUBLIC_BASE_URL)."""
+        if not PUBLIC_BASE_URL:
+            return ""
+        quote_id = self.issue(start, destination, price_estimates, time_estimates, deep_link, web_link)
+        return f"{PUBLIC_BASE_URL}/ride?quote={quote_id}" if quote_id else ""
+
+
+def quotes_enabled() -> bool:
+    """Whether this instance issues quotes or can verify ones issued elsewhere."""
+    return QUOTE_TTL_SECONDS > 0 and bool(PUBLIC_BASE_URL or os.getenv("QUOTE_SECRET"))
@@ -0,0 +1,205 @@
+"""
+Real-time transcript sessions.
+
+Omi can post transcript segments while a conversation is still going on.
+Each (uid, session) keeps a small RideIntentDetector that only looks at the
+new words of every batch (plus a few words carried over, so phrases split
+across segments still match), instead of rescanning the whole transcript.
+
+Sessions live in a bounded in-process LRU: at most REALTIME_MAX_SESSIONS,
+each dropped after REALTIME_SESSION_TTL seconds without segments. With
+several workers a session is only seen by the workers its batches reach.
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from utils.location_input import Location, LocationInput
+from utils.metrics import metrics
+
+REALTIME_MAX_SESSIONS = int(os.getenv("REALTIME_MAX_SESSIONS", 1000))
+REALTIME_SESSION_TTL = float(os.getenv("REALTIME_SESSION_TTL", 600))
+
+# Phrases that mean the user wants a ride
+INTENT_PHRASES = {
+    ("uber",), ("lyft",), ("taxi",), ("cab",),
+    ("need", "a", "ride"), ("get", "a", "ride"), ("book", "a", "ride"), ("call", "a", "ride"),
+    ("order", "a", "ride"), ("give", "me", "a", "lift"), ("need", "a", "lift"),
+    ("take", "me", "to"), ("drive", "me", "to"), ("get", "me", "to")
+}
+# Phrases after which the destination is named
+DESTINATION_PHRASES = {
+    ("take", "me", "to"), ("drive", "me", "to"), ("get", "me", "to"), ("ride", "to"),
+    ("uber", "to"), ("lyft", "to"), ("taxi", "to"), ("cab", "to"), ("lift", "to"),
+    ("head", "to"), ("heading", "to")
+}
+# Phrases asking for a ride home, i.e. to the start location
+HOME_PHRASES = {
+    ("take", "me", "home"), ("drive", "me", "home"), ("get", "me", "home"), ("ride", "home")
+}
+# Words that end a destination
+DESTINATION_STOP_WORDS = {
+    ".", ",", "!", "?", "please", "now", "asap", "and", "so", "because", "then", "right", "by", "at", "in", "for"
+}
+# Not part of a destination's name when they lead it
+LEADING_ARTICLES = {"the", "a", "an"}
+MAX_DESTINATION_WORDS = 5
+
+_PHRASE_LENGTHS = sorted(
+    {len(phrase) for phrase in INTENT_PHRASES | DESTINATION_PHRASES | HOME_PHRASES}, reverse=True
+)
+# Words carried over between batches, so a phrase split across segments still matches
+_CARRY = max(_PHRASE_LENGTHS) - 1
+_TOKEN = re.compile(r"[a-z0-9']+|[.,!?]")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class RideIntentDetector:
+    """Incremental ride-intent and destination detection over a stream of text."""
+
+    __slots__ = ("intent", "destination", "_tail", "_capture")
+
+    def __init__(self):
+        self.intent = False
+        self.destination: Optional[str] = None
+        self._tail: List[str] = []
+        self._capture: Optional[List[str]] = None
+
+    def feed(self, text: str) -> bool:
+        """Scan the words of one new segment; returns True if intent or destination changed."""
+        before = (self.intent, self.destination)
+        window = self._tail + tokenize(text)
+
+        for end in range(len(self._tail), len(window)):
+            token = window[end]
+            if self._capture is not None:
+                if token in DESTINATION_STOP_WORDS:
+                    self._finish_capture()
+                elif not self._capture and token in LEADING_ARTICLES:
+                    pass
+                else:
+                    self._capture.append(token)
+                    if len(self._capture) >= MAX_DESTINATION_WORDS:
+                        self._finish_capture()
+                continue
+
+            for length in _PHRASE_LENGTHS:
+                if length > end + 1:
+                    continue
+                phrase = tuple(window[end - length + 1:end + 1])
+                if phrase in INTENT_PHRASES:
+                    self.intent = True
+                if phrase in HOME_PHRASES:
+                    self.intent = True
+                    self.destination = "home"
+                    break
+                if phrase in DESTINATION_PHRASES:
+                    self._capture = []
+                    break
+
+        self._tail = window[-_CARRY:]
+        # A destination still being spoken is reported as far as it goes
+        if self._capture:
+            self.destination = " ".join(self._capture)
+        return (self.intent, self.destination) != before
+
+    def _finish_capture(self) -> None:
+        if self._capture:
+            self.destination = " ".join(self._capture)
+        self._capture = None
+
+    def resolve_destination(self) -> Location:
+        """The known location named as destination, or the default destination."""
+        if self.destination:
+            for location in (LocationInput.DESTINATION_LOCATION, LocationInput.START_LOCATION):
+                if location.name.lower() in self.destination or self.destination in location.name.lower():
+                    return location
+        return LocationInput.DESTINATION_LOCATION
+
+    def resolve_trip(self) -> Tuple[Location, Location]:
+        """The (start, destination) of the ride asked for; a ride home starts at the default destination."""
+        destination = self.resolve_destination()
+        if destination == LocationInput.START_LOCATION:
+            # Not a START→START trip: the other known place is where the ride home starts
+            return LocationInput.DESTINATION_LOCATION, destination
+        return LocationInput.START_LOCATION, destination
+
+
+class RealtimeSession:
+    """State of one real-time conversation."""
+
+    __slots__ = ("detector", "segments", "last_end", "updated_at", "prefetched")
+
+    def __init__(self):
+        self.detector = RideIntentDetector()
+        self.segments = 0
+        self.last_end = -1.0
+        self.updated_at = time.monotonic()
+        # Destination whose estimates were last prefetched
+        self.prefetched: Optional[Location] = None
+
+    def add_segments(self, segments: Iterable[dict]) -> bool:
+        """
+        Feed new user segments to the detector; returns True if detection changed.
+
+        Segments ending no later than one already seen are skipped, so a
+        re-sent batch is not counted twice.
+        """
+        changed = False
+        for segment in segments:
+            if not isinstance(segment, dict):
+                continue
+            end = segment.get("end")
+            if isinstance(end, (int, float)):
+                if end <= self.last_end:
+                    continue
+                self.last_end = end
+            self.segments += 1
+            text = segment.get("text")
+            # Only the user's words; text that isn't a string is skipped like a non-dict segment
+            if segment.get("is_user") and isinstance(text, str) and text:
+                changed = self.detector.feed(text) or changed
+        self.updated_at = time.monotonic()
+        return changed
+
+
+class SessionStore:
+    """Bounded LRU of real-time sessions with an idle timeout."""
+
+    def __init__(self, max_sessions: int = REALTIME_MAX_SESSIONS, ttl: float = REALTIME_SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[Tuple[str, str], RealtimeSession]" = OrderedDict()
+
+    def get(self, uid: str, session_id: str) -> RealtimeSession:
+        """The session for (uid, session_id), created if missing or expired."""
+        key = (uid, session_id)
+        session = self._sessions.get(key)
+        if session is None or time.monotonic() - session.updated_at > self.ttl:
+            session = self._sessions[key] = RealtimeSession()
+        self._sessions.move_to_end(key)
+        self._evict()
+        return session
+
+    def _evict(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        # Oldest entries first, so expired sessions are found without a full scan
+        now = time.monotonic()
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.updated_at <= self.ttl:
+                break
+            del self._sessions[key]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+realtime_sessions = SessionStore()
+metrics.gauge("realtime.sessions", lambda: len(realtime_sessions))
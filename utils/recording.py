@@ -0,0 +1,277 @@
+"""
+Opt-in request recording for replay checks.
+
+With RECORD_PATH set, requests to /ride, /api/ride-info and /webhook/omi are
+appended to a JSON-lines log (gzip-compressed if the path ends in .gz): the
+request, the response status and body, the server-side latency, and every
+Uber API response fetched while serving it. benchmarks/replay.py plays a log
+back against another build, serving the Uber calls from the log. Uber calls
+made in the background (prefetching, revalidation) are logged on their own.
+
+Records are sanitized: only a few request headers are kept (no cookies or
+tokens), the Omi uid and the user-entered location names and addresses are
+replaced by keyed hashes (in the query and wherever the response repeats
+them, so a replay renders the same output), and webhook payloads are cut
+down to the memory id and the user's transcript segments, whose text is
+replaced by a keyed placeholder of the same length. The reply doesn't depend
+on what was said, so a replay doesn't need it, and equal texts still get
+equal placeholders, so retried deliveries still dedupe.
+
+Coordinates are not redacted: they stay in the query and in the recorded
+Uber call parameters, since a replay matches Uber calls by them. Treat a log
+as location data. RECORD_SAMPLE_RATE records a share of requests only.
+
+The middleware is only installed when RECORD_PATH is set.
+"""
+import gzip
+import hashlib
+import hmac
+import html
+import json
+import os
+import random
+import secrets
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+RECORD_PATH = os.getenv("RECORD_PATH", "")
+RECORD_SAMPLE_RATE = float(os.getenv("RECORD_SAMPLE_RATE", 1.0))
+# Bodies larger than this are not kept (and such requests can't be replayed)
+RECORD_MAX_BODY_BYTES = int(os.getenv("RECORD_MAX_BODY_BYTES", 256 * 1024))
+# Key for the pseudonyms; set it to keep them stable across restarts
+RECORD_SALT = os.getenv("RECORD_SALT", "") or secrets.token_hex(16)
+
+RECORDED_PATHS = {"/ride", "/api/ride-info", "/webhook/omi"}
+# Free-text query fields that identify the user or where they go; recorded as keyed hashes
+PSEUDONYMIZED_FIELDS = {"uid", "start_name", "start_address", "dest_name", "dest_address"}
+# Request headers that change the response; everything else is dropped
+KEPT_HEADERS = {b"accept", b"content-type", b"if-none-match"}
+
+# Uber responses fetched while serving the request being recorded
+_upstream: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("recorded_upstream", default=None)
+
+
+def recording_enabled() -> bool:
+    return bool(RECORD_PATH)
+
+
+def record_upstream(endpoint: str, params: Dict[str, Any], response: "Any") -> None:
+    """
+    Add an Uber response to the current request's record. Calls made outside
+    a request (prefetching, revalidation) get a record of their own, so a
+    replay can serve them too.
+    """
+    calls = _upstream.get()
+    if calls is None and not RECORD_PATH:
+        return
+    call = {
+        "endpoint": endpoint,
+        "params": {name: str(value) for name, value in params.items()},
+        "status": response.status_code,
+        "body": response.text
+    }
+    if calls is not None:
+        calls.append(call)
+    else:
+        record_log.write({"time": round(time.time(), 3), "upstream": [call]})
+
+
+def pseudonym(value: str) -> str:
+    return "u_" + hmac.new(RECORD_SALT.encode(), value.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def placeholder(text: str) -> str:
+    """A keyed stand-in for free text, as long as the original so payload sizes are kept."""
+    hashed = pseudonym(text)
+    return (hashed * (len(text) // len(hashed) + 1))[:len(text)]
+
+
+def sanitize_query(query: str) -> Tuple[str, Dict[str, str]]:
+    """The query with PSEUDONYMIZED_FIELDS hashed, and the {original: pseudonym} replacements made."""
+    replacements: Dict[str, str] = {}
+    fields = []
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name in PSEUDONYMIZED_FIELDS and value:
+            value = replacements.setdefault(value, pseudonym(value))
+        fields.append((name, value))
+    return urlencode(fields), replacements
+
+
+def redact(text: str, replacements: Dict[str, str]) -> str:
+    """Replace pseudonymized values in a response body, in every encoding the pages and links use."""
+    for original in sorted(replacements, key=len, reverse=True):
+        forms = {original, original.replace(" ", "+")}
+        forms |= {html.escape(form) for form in forms} | {json.dumps(form, ensure_ascii=False)[1:-1] for form in forms}
+        for form in sorted(forms, key=len, reverse=True):
+            text = text.replace(form, replacements[original])
+    return text
+
+
+def sanitize_webhook(body: bytes) -> Optional[str]:
+    """The payload reduced to the shape the webhook reads, without what was said; None if it isn't a JSON object."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    segments = payload.get("transcript")
+    transcript = [
+        {"text": placeholder(segment["text"]) if isinstance(segment.get("text"), str) else "", "is_user": True}
+        for segment in (segments if isinstance(segments, list) else ())
+        if isinstance(segment, dict) and segment.get("is_user")
+    ]
+    return json.dumps({"id": payload.get("id"), "transcript": transcript}, separators=(",", ":"))
+
+
+def decode_body(body: bytes, encoding: Optional[str]) -> Optional[bytes]:
+    """The identity body of an encoded response, or None if it can't be decoded here."""
+    if not encoding:
+        return body
+    if encoding == "gzip":
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(body)
+    return None
+
+
+def body_digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class RecordLog:
+    """Append-only JSON-lines file shared by the worker's requests."""
+
+    def __init__(self, path: str = RECORD_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            if self._file is None:
+                opener = gzip.open if self.path.endswith(".gz") else open
+                self._file = opener(self.path, "ab")
+            self._file.write(line)
+            # A gzip log is readable up to the last flush while the server is still writing it
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Records in a log; a gzip log that is still being written is read up to its last flush."""
+    records = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        try:
+            for line in f:
+                if line.endswith(b"\n"):
+                    records.append(json.loads(line))
+        except EOFError:
+            pass
+    return records
+
+
+class RecordingMiddleware:
+    """ASGI middleware that records sanitized request/response pairs to a RecordLog."""
+
+    def __init__(self, app, log: Optional[RecordLog] = None, sample_rate: float = RECORD_SAMPLE_RATE):
+        self.app = app
+        self.log = log or record_log
+        self.sample_rate = sample_rate
+        print(f"⏺️  Recording {', '.join(sorted(RECORDED_PATHS))} to {self.log.path}", flush=True)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in RECORDED_PATHS
+            or (self.sample_rate < 1 and random.random() >= self.sample_rate)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request_body = bytearray()
+        response: Dict[str, Any] = {"status": 0, "headers": {}}
+        response_body = bytearray()
+        calls: List[Dict[str, Any]] = []
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request" and len(request_body) <= RECORD_MAX_BODY_BYTES:
+                request_body.extend(message.get("body", b""))
+            return message
+
+        async def send_and_keep(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {
+                    name.decode("latin-1").lower(): value.decode("latin-1")
+                    for name, value in message.get("headers", [])
+                }
+            elif message["type"] == "http.response.body" and len(response_body) <= RECORD_MAX_BODY_BYTES:
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        token = _upstream.set(calls)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_keep)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _upstream.reset(token)
+        self._write(scope, bytes(request_body), response, bytes(response_body), elapsed_ms, calls)
+
+    def _write(self, scope, request_body: bytes, response: Dict[str, Any], response_body: bytes,
+               elapsed_ms: float, calls: List[Dict[str, Any]]) -> None:
+        if scope["path"] == "/webhook/omi":
+            body = sanitize_webhook(request_body) if len(request_body) <= RECORD_MAX_BODY_BYTES else None
+        else:
+            body = request_body.decode("utf-8", "replace") if request_body else ""
+
+        query, replacements = sanitize_query(scope.get("query_string", b"").decode("latin-1"))
+        headers = response["headers"]
+        decoded = None
+        if len(response_body) <= RECORD_MAX_BODY_BYTES:
+            try:
+                decoded = decode_body(response_body, headers.get("content-encoding"))
+            except (OSError, zlib.error, ValueError):
+                decoded = None
+        text = None
+        if decoded is not None:
+            text = redact(decoded.decode("utf-8", "replace"), replacements)
+
+        self.log.write({
+            "time": round(time.time(), 3),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": query,
+            "headers": {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope["headers"] if name in KEPT_HEADERS
+            },
+            "body": body,
+            "status": response["status"],
+            "content_type": headers.get("content-type", ""),
+            "response": text,
+            "digest": body_digest(text.encode()) if text is not None else None,
+            "ms": round(elapsed_ms, 3),
+            "upstream": calls
+        })
+
+
+record_log = RecordLog()
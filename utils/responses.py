@@ -0,0 +1,42 @@
+"""
+Fast JSON responses for the API endpoints.
+Uses orjson when it is installed and falls back to the standard json module.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+def _to_json(value: Any) -> Any:
+    """Convert typed values (estimates, locations) through their to_dict()."""
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    return to_dict()
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize already JSON-shaped content to bytes.
+
+    Content must only hold dicts, lists, strings, numbers, booleans, None and
+    objects with a to_dict() method - no generic encoding walk is done.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_to_json)
+    return json.dumps(content, default=_to_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips FastAPI's jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
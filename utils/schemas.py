@@ -0,0 +1,75 @@
+"""
+Schemas for the JSON API.
+
+CompareRequest is validated by FastAPI as the request body of /api/compare.
+
+RideInfoResponse and the models under it only document /api/ride-info in the
+OpenAPI spec; nothing validates responses against them at runtime. The
+handlers build bodies of exactly this shape and return them through
+FastJSONResponse, so FastAPI does not re-validate or re-encode them per
+request. test_schemas.py checks that the bodies still match.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class LocationSchema(BaseModel):
+    """A named pickup or dropoff point."""
+    name: str
+    address: str
+    latitude: float
+    longitude: float
+
+
+class PriceEstimateSchema(BaseModel):
+    """Price estimate for one ride type (Uber API format)."""
+    model_config = ConfigDict(extra="allow")
+
+    localized_display_name: str
+    estimate: str
+    low_estimate: Optional[float] = None
+    high_estimate: Optional[float] = None
+    duration: Optional[int] = None
+    distance: Optional[float] = None
+    display_name: Optional[str] = None
+    product_id: Optional[str] = None
+    currency_code: Optional[str] = None
+
+
+class TimeEstimateSchema(BaseModel):
+    """Pickup time estimate for one ride type (Uber API format)."""
+    model_config = ConfigDict(extra="allow")
+
+    localized_display_name: str
+    estimate: int
+    display_name: Optional[str] = None
+    product_id: Optional[str] = None
+
+
+class RideInfoResponse(BaseModel):
+    """Body of /api/ride-info."""
+    start_location: LocationSchema
+    destination: LocationSchema
+    price_estimates: Optional[List[PriceEstimateSchema]] = None
+    time_estimates: Optional[List[TimeEstimateSchema]] = None
+    deep_link: str
+    web_link: str
+
+
+class StopSchema(BaseModel):
+    """A pickup, candidate destination or stop for /api/compare."""
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    name: Optional[str] = None
+    address: Optional[str] = None
+
+
+class CompareRequest(BaseModel):
+    """Body of /api/compare."""
+    pickup: StopSchema
+    destinations: List[StopSchema] = Field(min_length=1)
+    # Treat destinations as an ordered route (pickup -> first -> second ...) instead of alternatives
+    ordered: bool = False
+    # Ride type the candidates are ranked by
+    ride_type: str = "UberX"
@@ -0,0 +1,82 @@
+"""
+Minimal precompiled templates.
+
+A template is parsed once, at import, into static fragments and named slots
+and compiled into a render function that joins them in a single string build.
+No parsing or formatting of the static text happens per call.
+
+Placeholders are written {{ name }}. Values are HTML-escaped unless the
+template is created with autoescape=False or the value is wrapped in Markup.
+"""
+import re
+from html import escape
+from typing import Any, Callable, Dict, List, Tuple
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Ride names, addresses and price labels repeat across requests, so escaped strings are memoized
+_ESCAPE_CACHE_SIZE = 4096
+_escaped: Dict[str, str] = {}
+
+
+class Markup(str):
+    """A string that is already safe HTML and must not be escaped again."""
+    __slots__ = ()
+
+
+def escape_value(value: Any) -> str:
+    """HTML-escape a slot value, passing Markup and numbers through untouched."""
+    if type(value) is str:
+        escaped = _escaped.get(value)
+        if escaped is None:
+            if len(_escaped) >= _ESCAPE_CACHE_SIZE:
+                _escaped.clear()
+            escaped = _escaped[value] = escape(value)
+        return escaped
+    if isinstance(value, (Markup, int, float)):
+        return value
+    return escape(str(value))
+
+
+class Template:
+    """A template compiled into a render function over static fragments."""
+
+    __slots__ = ("names", "autoescape", "render")
+
+    def __init__(self, source: str, autoescape: bool = True):
+        fragments: List[str] = []
+        slots: List[str] = []
+        position = 0
+
+        for match in _PLACEHOLDER.finditer(source):
+            fragments.append(source[position:match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+        fragments.append(source[position:])
+
+        self.names: Tuple[str, ...] = tuple(slots)
+        self.autoescape = autoescape
+        self.render: Callable[..., str] = self._compile(fragments, slots, autoescape)
+
+    @staticmethod
+    def _compile(fragments: List[str], slots: List[str], autoescape: bool) -> Callable[..., str]:
+        """Generate `def render(*, name, ...)` returning one f-string over the fragments."""
+        namespace: Dict[str, Any] = {"_e": escape_value}
+        pieces = []
+        for index, fragment in enumerate(fragments):
+            if fragment:
+                namespace[f"_s{index}"] = fragment
+                pieces.append(f"{{_s{index}}}")
+            if index < len(slots):
+                name = slots[index]
+                pieces.append(f"{{_e({name})}}" if autoescape else f"{{{name}}}")
+
+        params = ", ".join(dict.fromkeys(slots))
+        signature = f"*, {params}" if params else ""
+        source = f"def render({signature}):\n    return f\"{''.join(pieces)}\"\n"
+        exec(compile(source, "<template>", "exec"), namespace)
+        return namespace["render"]
+
+    def render_markup(self, **values: Any) -> Markup:
+        """Render and mark the result as safe for embedding in another template."""
+        return Markup(self.render(**values))
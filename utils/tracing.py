@@ -0,0 +1,206 @@
+"""
+Lightweight span tracing for the estimate pipeline.
+
+Spans are timed blocks tagged with the current trace id, which is held in a
+context variable so it follows the request through awaits, asyncio tasks and
+asyncio.to_thread. Finished spans go to an in-memory ring buffer and,
+optionally, a local JSONL file - no external collector is needed.
+
+    with span("uber.http", endpoint="price") as s:
+        ...
+        s.set(status_code=200)
+"""
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# memory: ring buffer only, jsonl: ring buffer + TRACE_JSONL_PATH, off: no spans recorded
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory").lower()
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 2048))
+# Token for reading buffered spans over HTTP; the endpoint is hidden when unset
+TRACE_DEBUG_TOKEN = os.getenv("TRACE_DEBUG_TOKEN", "")
+
+TRACE_HEADER = b"x-trace-id"
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+
+class Span:
+    """A timed block within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "_started", "duration_ms", "status", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes to the span."""
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class SpanExporter:
+    """Keeps recent spans in a ring buffer and optionally appends them to a JSONL file."""
+
+    def __init__(self, buffer_size: int = TRACE_BUFFER_SIZE, jsonl_path: Optional[str] = None):
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Span) -> None:
+        record = span.to_dict()
+        self.buffer.append(record)
+        if self.jsonl_path:
+            line = json.dumps(record, default=str, separators=(",", ":"))
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.jsonl_path, "a", buffering=1, encoding="utf-8")
+                self._file.write(line + "\n")
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recent spans, optionally for a single trace, oldest first."""
+        records = list(self.buffer)
+        if trace_id is not None:
+            records = [record for record in records if record["trace_id"] == trace_id]
+        return records
+
+
+class _NoopSpan:
+    """Stands in for a Span when tracing is off."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+exporter = SpanExporter(jsonl_path=TRACE_JSONL_PATH if TRACE_EXPORTER == "jsonl" else None)
+
+
+def tracing_enabled() -> bool:
+    return TRACE_EXPORTER != "off"
+
+
+def debug_token_matches(token: Optional[str]) -> bool:
+    """True if TRACE_DEBUG_TOKEN is set and the given token matches it."""
+    return bool(TRACE_DEBUG_TOKEN) and token is not None and hmac.compare_digest(token, TRACE_DEBUG_TOKEN)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a child of the current span.
+
+    Outside of any trace (e.g. scripts) a new trace is started. Yields a
+    no-op span when tracing is off.
+    """
+    if not tracing_enabled():
+        yield NOOP_SPAN
+        return
+
+    trace_id = _trace_id.get()
+    trace_token = None
+    if trace_id is None:
+        trace_id = new_trace_id()
+        trace_token = _trace_id.set(trace_id)
+
+    current = Span(name, trace_id, _span_id.get(), attributes)
+    span_token = _span_id.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = repr(e)
+        raise
+    finally:
+        current.finish()
+        _span_id.reset(span_token)
+        if trace_token is not None:
+            _trace_id.reset(trace_token)
+        exporter.export(current)
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """Start a new trace (e.g. for background work) with a root span."""
+    trace_token = _trace_id.set(trace_id or new_trace_id())
+    span_token = _span_id.set(None)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _span_id.reset(span_token)
+        _trace_id.reset(trace_token)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that opens a root span per HTTP request.
+
+    Honors an incoming X-Trace-Id and echoes the trace id on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == TRACE_HEADER:
+                incoming = value.decode("latin-1")[:64]
+                break
+
+        with trace(f"{scope['method']} {scope['path']}", trace_id=incoming) as root:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    root.set(status_code=message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (TRACE_HEADER, root.trace_id.encode())
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
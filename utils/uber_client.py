@@ -1,21 +1,114 @@
 """
 Uber API Client for price estimates, time estimates, and deep link generation.
 """
+import contextvars
 import os
-import requests
-from typing import Optional, Dict, List
+import random
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Optional, Dict, List, Set, Tuple, TypeVar
 from dotenv import load_dotenv
+from utils.admission import calculator_only
+from utils.estimate_cache import EstimateCache, estimate_cache, estimate_key
+from utils.estimates import PriceEstimate, TimeEstimate
 from utils.fare_calculator import FareCalculator
+from utils.metrics import metrics
+from utils.quota import BATCH, current_priority, outbound_priority, parse_retry_after, uber_quota
+from utils.recording import record_upstream
+from utils.tracing import span, trace
+
+if TYPE_CHECKING:
+    import requests
 
 load_dotenv()
 
+Estimate = TypeVar("Estimate", PriceEstimate, TimeEstimate)
+
+# Point at a local stand-in (benchmarks/uber_server.py) for load and soak tests
+UBER_API_BASE_URL = os.getenv("UBER_API_BASE_URL", "https://api.uber.com/v1.2").rstrip("/")
+
+# Attempts are cut off at this timeout or the caller's deadline, whichever comes first
+UBER_REQUEST_TIMEOUT = float(os.getenv("UBER_REQUEST_TIMEOUT", 5.0))
+# Retries after a failed attempt (connection error, timeout or 5xx), with full-jitter exponential backoff
+UBER_MAX_RETRIES = int(os.getenv("UBER_MAX_RETRIES", 2))
+UBER_RETRY_BACKOFF = float(os.getenv("UBER_RETRY_BACKOFF", 0.1))
+UBER_RETRY_BACKOFF_MAX = float(os.getenv("UBER_RETRY_BACKOFF_MAX", 1.0))
+# Send a second, hedged attempt when the first hasn't answered by the observed p95 latency
+UBER_HEDGE = os.getenv("UBER_HEDGE", "false").lower() == "true"
+UBER_HEDGE_MIN_DELAY = float(os.getenv("UBER_HEDGE_MIN_DELAY", 0.05))
+# Latencies kept for the p95, and how many are needed before hedging starts
+UBER_LATENCY_WINDOW = int(os.getenv("UBER_LATENCY_WINDOW", 200))
+UBER_LATENCY_MIN_SAMPLES = 20
+
+# Statuses worth another attempt (429 is left to the quota, which pauses for Retry-After)
+RETRY_STATUSES = {500, 502, 503, 504}
+
+# Background refreshes of stale cache entries (pool created on first use)
+_revalidator = None
+_revalidator_lock = threading.Lock()
+
+
+def _revalidator_pool():
+    global _revalidator
+    with _revalidator_lock:
+        if _revalidator is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="uber-revalidate")
+    return _revalidator
+
+
+# Hedged attempts run here, so the first and second attempt can be waited on together
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def _hedger_pool():
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _hedger = ThreadPoolExecutor(max_workers=32, thread_name_prefix="uber-hedge")
+    return _hedger
+
+
+class LatencyWindow:
+    """Recent Uber response times, for the hedging delay."""
+
+    def __init__(self, size: int = UBER_LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """The given percentile of recent latencies, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < UBER_LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+uber_latency = LatencyWindow()
+
+
+def backoff_delay(retry: int) -> float:
+    """Full-jitter exponential backoff before the given retry (1-based)."""
+    return random.uniform(0, min(UBER_RETRY_BACKOFF_MAX, UBER_RETRY_BACKOFF * 2 ** (retry - 1)))
+
 
 class UberClient:
     """Handles Uber API interactions and deep link generation."""
 
-    def __init__(self):
+    def __init__(self, cache: EstimateCache = estimate_cache):
         self.server_token = os.getenv("UBER_SERVER_TOKEN")
-        self.base_url = "https://api.uber.com/v1.2"
+        self.base_url = UBER_API_BASE_URL
+        self.cache = cache
+        self._revalidating: Set[str] = set()
+        self._revalidate_lock = threading.Lock()
 
     def get_price_estimates(
         self,
@@ -23,93 +116,332 @@ class UberClient:
         start_longitude: float,
         end_latitude: float,
         end_longitude: float
-    ) -> Optional[List[Dict]]:
+    ) -> Optional[List[PriceEstimate]]:
         """
         Get price estimates for a trip.
         Falls back to calculator if API token not available.
         Returns list of ride options with pricing.
         """
-        if not self.server_token:
-            print("⚠️  UBER_SERVER_TOKEN not set - using fare calculator", flush=True)
-            return FareCalculator.get_price_estimates(
-                start_latitude, start_longitude,
-                end_latitude, end_longitude
-            )
+        with span("uber.price_estimates"):
+            if not self.server_token:
+                print("⚠️  UBER_SERVER_TOKEN not set - using fare calculator", flush=True)
+                return self._calculator_prices("no_token", start_latitude, start_longitude, end_latitude, end_longitude)
 
-        url = f"{self.base_url}/estimates/price"
-        headers = {
-            "Authorization": f"Token {self.server_token}",
-            "Accept-Language": "en_US",
-            "Content-Type": "application/json"
-        }
-        params = {
-            "start_latitude": start_latitude,
-            "start_longitude": start_longitude,
-            "end_latitude": end_latitude,
-            "end_longitude": end_longitude
-        }
-
-        try:
-            response = requests.get(url, headers=headers, params=params)
-
-            if response.status_code == 200:
-                data = response.json()
-                prices = data.get("prices", [])
-                print(f"✅ Got {len(prices)} price estimates from Uber API", flush=True)
-                return prices
-            else:
-                print(f"❌ Uber API error: {response.status_code} - falling back to calculator", flush=True)
-                return FareCalculator.get_price_estimates(
-                    start_latitude, start_longitude,
-                    end_latitude, end_longitude
-                )
-
-        except Exception as e:
-            print(f"❌ Error fetching price estimates: {e} - falling back to calculator", flush=True)
-            return FareCalculator.get_price_estimates(
-                start_latitude, start_longitude,
-                end_latitude, end_longitude
+            return self._estimates(
+                estimate_key("price", start_latitude, start_longitude, end_latitude, end_longitude),
+                PriceEstimate.from_dict,
+                lambda: self._fetch_price_estimates(start_latitude, start_longitude, end_latitude, end_longitude),
+                lambda reason: self._calculator_prices(reason, start_latitude, start_longitude, end_latitude, end_longitude)
             )
 
     def get_time_estimates(
         self,
         start_latitude: float,
         start_longitude: float
-    ) -> Optional[List[Dict]]:
+    ) -> Optional[List[TimeEstimate]]:
         """
         Get ETA estimates for pickup at start location.
         Falls back to calculator if API token not available.
         Returns list of products with pickup time.
         """
-        if not self.server_token:
-            print("⚠️  UBER_SERVER_TOKEN not set - using fare calculator", flush=True)
-            return FareCalculator.get_time_estimates(start_latitude, start_longitude)
+        with span("uber.time_estimates"):
+            if not self.server_token:
+                print("⚠️  UBER_SERVER_TOKEN not set - using fare calculator", flush=True)
+                return self._calculator_times("no_token", start_latitude, start_longitude)
+
+            return self._estimates(
+                estimate_key("time", start_latitude, start_longitude),
+                TimeEstimate.from_dict,
+                lambda: self._fetch_time_estimates(start_latitude, start_longitude),
+                lambda reason: self._calculator_times(reason, start_latitude, start_longitude)
+            )
+
+    def prefetch(
+        self,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> bool:
+        """
+        Refresh cached estimates for a trip unless they are still fresh.
+
+        Returns True if anything was fetched from Uber.
+        """
+        if not self.server_token or calculator_only():
+            return False
+
+        price_key = estimate_key("price", start_latitude, start_longitude, end_latitude, end_longitude)
+        time_key = estimate_key("time", start_latitude, start_longitude)
+        cached = self.cache.get_many([price_key, time_key])
+
+        fetched = {}
+        for key, fetch in (
+            (price_key, lambda: self._fetch_price_estimates(start_latitude, start_longitude, end_latitude, end_longitude)),
+            (time_key, lambda: self._fetch_time_estimates(start_latitude, start_longitude))
+        ):
+            entry = cached.get(key)
+            if entry is not None and self.cache.is_fresh(entry):
+                continue
+            data, _ = fetch()
+            if data is not None:
+                fetched[key] = data
 
-        url = f"{self.base_url}/estimates/time"
+        self.cache.put_many(fetched)
+        return bool(fetched)
+
+    def _estimates(
+        self,
+        key: str,
+        parse: Callable[[Dict], Estimate],
+        fetch: Callable[[], Tuple[Optional[List[Estimate]], str]],
+        fallback: Callable[[str], List[Estimate]]
+    ) -> List[Estimate]:
+        """Serve from cache (revalidating stale entries in the background), else fetch."""
+        entry = self.cache.get(key)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                metrics.inc("estimate_cache.hit")
+            else:
+                metrics.inc("estimate_cache.stale")
+                self._revalidate(key, fetch)
+            return list(map(parse, entry.value))
+
+        metrics.inc("estimate_cache.miss")
+        if calculator_only():
+            print("⚠️  Degraded mode - using fare calculator", flush=True)
+            return fallback("degraded")
+
+        data, reason = fetch()
+        if data is None:
+            return fallback(reason)
+        self.cache.put(key, data)
+        return data
+
+    def _revalidate(self, key: str, fetch: Callable[[], Tuple[Optional[List[Estimate]], str]]) -> None:
+        """Refresh a stale entry on a background thread, at most once at a time per key."""
+        if calculator_only():
+            return
+        with self._revalidate_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                with trace("estimate_cache.revalidate", key=key), outbound_priority(BATCH):
+                    data, _ = fetch()
+                if data is not None:
+                    self.cache.put(key, data)
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(key)
+
+        _revalidator_pool().submit(run)
+
+    def _fetch_price_estimates(
+        self,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> Tuple[Optional[List[PriceEstimate]], str]:
+        return self._request("estimates/price", "prices", "price", PriceEstimate.from_dict, {
+            "start_latitude": start_latitude,
+            "start_longitude": start_longitude,
+            "end_latitude": end_latitude,
+            "end_longitude": end_longitude
+        })
+
+    def _fetch_time_estimates(self, start_latitude: float, start_longitude: float) -> Tuple[Optional[List[TimeEstimate]], str]:
+        return self._request("estimates/time", "times", "time", TimeEstimate.from_dict, {
+            "start_latitude": start_latitude,
+            "start_longitude": start_longitude
+        })
+
+    def _request(
+        self,
+        endpoint: str,
+        result_key: str,
+        label: str,
+        parse: Callable[[Dict], Estimate],
+        params: Dict
+    ) -> Tuple[Optional[List[Estimate]], str]:
+        """
+        Call an Uber estimates endpoint within the shared quota.
+
+        Failed attempts (connection errors, timeouts, 5xx) are retried with
+        jittered backoff; every attempt and backoff fits in the caller's deadline
+        and takes its own quota token. Quota waits, backoff and hedging block,
+        so async callers run this on a worker thread.
+        Returns (results, "") on success or (None, reason) when the caller should fall back.
+        """
+        priority, deadline = current_priority()
+        if not uber_quota.acquire(priority, deadline):
+            print("⚠️  Uber quota exhausted - using fare calculator", flush=True)
+            return None, "quota"
+
+        url = f"{self.base_url}/{endpoint}"
         headers = {
             "Authorization": f"Token {self.server_token}",
             "Accept-Language": "en_US",
             "Content-Type": "application/json"
         }
-        params = {
-            "start_latitude": start_latitude,
-            "start_longitude": start_longitude
-        }
 
-        try:
-            response = requests.get(url, headers=headers, params=params)
+        attempt = 1
+        while True:
+            response, reason = self._attempt(url, headers, params, endpoint, attempt, priority, deadline)
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                break
+            if attempt > UBER_MAX_RETRIES:
+                break
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                metrics.inc("uber.retries_abandoned")
+                break
+            time.sleep(delay)
+            if not uber_quota.acquire(priority, deadline):
+                break
+            attempt += 1
+            metrics.inc("uber.retries")
+            print(f"🔁 Retrying Uber {label} estimates (attempt {attempt}) after {reason or response.status_code}", flush=True)
+
+        if response is None:
+            print(f"❌ Error fetching {label} estimates: {reason} - falling back to calculator", flush=True)
+            return None, reason
 
+        try:
             if response.status_code == 200:
                 data = response.json()
-                times = data.get("times", [])
-                print(f"✅ Got {len(times)} time estimates from Uber API", flush=True)
-                return times
+                results = list(map(parse, data.get(result_key, [])))
+                print(f"✅ Got {len(results)} {label} estimates from Uber API", flush=True)
+                return results, ""
             else:
                 print(f"❌ Uber API error: {response.status_code} - falling back to calculator", flush=True)
-                return FareCalculator.get_time_estimates(start_latitude, start_longitude)
+                return None, f"http_{response.status_code}"
 
         except Exception as e:
-            print(f"❌ Error fetching time estimates: {e} - falling back to calculator", flush=True)
+            print(f"❌ Error fetching {label} estimates: {e} - falling back to calculator", flush=True)
+            return None, type(e).__name__
+
+    def _attempt(
+        self,
+        url: str,
+        headers: Dict,
+        params: Dict,
+        endpoint: str,
+        attempt: int,
+        priority: int,
+        deadline: float
+    ) -> Tuple[Optional["requests.Response"], str]:
+        """
+        One attempt, hedged when enabled: if the request has been in flight
+        for the p95 latency without an answer, a second request is sent and
+        the first usable answer wins. The hedge only takes a free quota token.
+        """
+        hedge_after = uber_latency.percentile(0.95) if UBER_HEDGE else None
+        if hedge_after is None:
+            return self._send(url, headers, params, endpoint, attempt, deadline)
+
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        pool = _hedger_pool()
+        budget = max(hedge_after, UBER_HEDGE_MIN_DELAY)
+        sent_at: List[float] = []
+
+        def primary() -> Tuple[Optional["requests.Response"], str]:
+            sent_at.append(time.monotonic())
+            return self._send(url, headers, params, endpoint, attempt, deadline)
+
+        # Each thread gets its own copy of the context, so spans nest under this request
+        first = pool.submit(contextvars.copy_context().run, primary)
+        pending = {first}
+        # The budget runs from when the primary was sent, not from when it was queued in the pool
+        hedge_at = time.monotonic() + budget
+        while hedge_at < deadline:
+            done, _ = wait(pending, timeout=hedge_at - time.monotonic())
+            if done:
+                break
+            if sent_at and time.monotonic() >= sent_at[0] + budget:
+                if uber_quota.try_acquire(priority):
+                    metrics.inc("uber.hedges")
+                    pending.add(pool.submit(
+                        contextvars.copy_context().run,
+                        self._send, url, headers, params, endpoint, attempt, deadline, True
+                    ))
+                break
+            hedge_at = (sent_at[0] if sent_at else time.monotonic()) + budget
+
+        outcome: Tuple[Optional["requests.Response"], str] = (None, "Timeout")
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                response = outcome[0]
+                if response is not None and response.status_code not in RETRY_STATUSES:
+                    if future is not first:
+                        metrics.inc("uber.hedge_wins")
+                    # The slower attempt finishes in the background and is dropped
+                    return outcome
+        return outcome
+
+    def _send(
+        self,
+        url: str,
+        headers: Dict,
+        params: Dict,
+        endpoint: str,
+        attempt: int,
+        deadline: float,
+        hedge: bool = False
+    ) -> Tuple[Optional["requests.Response"], str]:
+        """Send one GET, bounded by the deadline; returns (response, "") or (None, error name)."""
+        # requests is the heaviest import in the app, so it is loaded on the first Uber call
+        import requests
+
+        timeout = max(0.05, min(UBER_REQUEST_TIMEOUT, deadline - time.monotonic()))
+        started = time.perf_counter()
+        try:
+            with span("uber.http", endpoint=endpoint, attempt=attempt, hedge=hedge) as http_span:
+                response = requests.get(url, headers=headers, params=params, timeout=timeout)
+                http_span.set(status_code=response.status_code)
+        except requests.RequestException as e:
+            metrics.inc("uber.attempt_errors")
+            return None, type(e).__name__
+        elapsed = time.perf_counter() - started
+        uber_latency.record(elapsed)
+        metrics.observe("uber.http", elapsed * 1000)
+        self._record_quota(response)
+        record_upstream(endpoint, params, response)
+        if response.status_code in RETRY_STATUSES:
+            metrics.inc("uber.attempt_errors")
+        return response, ""
+
+    @staticmethod
+    def _record_quota(response: "requests.Response") -> None:
+        """Feed rate-limit responses back into the shared quota."""
+        if response.status_code == 429:
+            uber_quota.throttled(parse_retry_after(response.headers.get("Retry-After")))
+        elif response.status_code == 200:
+            uber_quota.succeeded()
+
+    @staticmethod
+    def _calculator_prices(
+        reason: str,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> List[PriceEstimate]:
+        with span("calculator.fallback", kind="price", reason=reason):
+            return FareCalculator.get_price_estimates(
+                start_latitude, start_longitude,
+                end_latitude, end_longitude
+            )
+
+    @staticmethod
+    def _calculator_times(reason: str, start_latitude: float, start_longitude: float) -> List[TimeEstimate]:
+        with span("calculator.fallback", kind="time", reason=reason):
             return FareCalculator.get_time_estimates(start_latitude, start_longitude)
 
     @staticmethod